@@ -1,32 +1,47 @@
+import argparse
+import os
+import time
 import pandas as pd
 import plotly.express as px
+import plotly.io as pio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from leitor_sessao import LeitorSessao
+from indice_tempo import carregar_intervalo
 from datetime import datetime
 
 # Aqui temos um objeto que gerará os gráficos a partir do arquivo CSV que é gerado pelo receptor
 
+MEMBROS = ["Coxa", "Canela", "Pe"]
+MAX_PONTOS_IMAGEM = 4000 # pontos por membro no PNG (redução min/max); ~4x a largura da imagem
+
 class Grafico (object):
-    def __init__(self, nome_arquivo: str):
+    def __init__(self, nome_arquivo: str, verboso: bool = True, max_pontos: int = None, intervalo: tuple = None):
         self.membro = ""; # membro inferior da pessoa -> gráfico da coxa / canela / pé
         self.nome_arquivo = nome_arquivo;
-        self.df = pd.read_csv(nome_arquivo);
-        self.colunas = self.df.columns.tolist();
+        self.leitor = LeitorSessao(nome_arquivo); # .hfb se existir; CSV em blocos com float32/int64
+        self.colunas = self.leitor.getColunas();
+        self.max_pontos = max_pontos; # com max_pontos os gráficos usam a vista reduzida (min/max)
+        self.vistas = {};
+        self.intervalo = intervalo; # (início, fim) em s: só esse trecho é lido, pelo índice de tempo (.tidx)
+        if intervalo is not None: self.df = carregar_intervalo(nome_arquivo, *intervalo);
+        else: self.df = self.leitor.Carregar() if max_pontos is None else None;
         match len(self.colunas): # vendo quantas colunas tem, o que indica quantos sensores temos
             case 4: # e consequentemente quantos gráficos serão gerados (o print não é nescessário)
                 self.graficos = 1
                 self.tamanho = 4
-                print("Um gráfico")
+                if verboso: print("Um gráfico")
             case 7:
                 self.graficos = 2
                 self.tamanho = 7
-                print("Dois gráficos")
+                if verboso: print("Dois gráficos")
             case 10:
                 self.graficos = 3
                 self.tamanho = 10
-                print("Três gráficos")
+                if verboso: print("Três gráficos")
             case _:
                 self.graficos = 0
                 self.tamanho = 0
-                print("Erro\nGráficos fora do escopo")
+                if verboso: print("Erro\nGráficos fora do escopo")
     # get e set para o nome do arquivo e membro inferior            
     def getNomeArquivo(self) -> str:
         return self.nome_arquivo;
@@ -37,34 +52,201 @@ class Grafico (object):
     def setMembro(self, membro: str):
         self.membro = membro
     
-    def Tempo(self) -> int: # alterando o tempo de milisegundos para segundos
+    def Tempo(self, membros: list = None) -> int: # alterando o tempo de milisegundos para segundos
         ms = self.colunas[self.tamanho -1]
-        if ms in self.df.columns and not self.df[ms].isnull().all():
+        if self.df is None and self.tamanho > 0: # vista reduzida: o tempo_s sai junto, bloco a bloco
+            self.vistas = self.leitor.VistasPorMembro(self.max_pontos, self.graficos, membros)
+            return 1
+        if self.intervalo is not None: # o trecho já vem com o tempo_s da sessão inteira
+            return 1 if len(self.df) else 0
+        if self.df is not None and ms in self.df.columns and not self.df[ms].isnull().all():
             self.df['tempo_s'] = (self.df[ms] - self.df[ms].iloc[0]) / 1000.0
             return 1
         else:
             print("Erro: Coluna 't_ms' nao encontrada ou esta vazia.")
             return 0
     
+    def ColunasMembro(self, i: int) -> list: # colunas p/r/y do sensor i
+        self.setMembro(MEMBROS[i])
+        return self.colunas[i*3:3 + i*3]
+
+    def DadosMembro(self, i: int) -> pd.DataFrame: # sessão inteira ou a vista reduzida do sensor i
+        return self.vistas[i] if self.df is None else self.df
+
+    def Figura(self, i: int): # figura plotly do sensor i (precisa do Tempo() antes)
+        colunas_plot = self.ColunasMembro(i)
+        fig = px.line(self.DadosMembro(i),
+                    x='tempo_s',
+                    y = colunas_plot,
+                    title=f"Análise do Movimento - {self.membro}",
+                    labels={"value": "Angulo (graus)", "tempo_s": "Tempo (segundos)", "variable": "Eixo"})
+        fig.update_traces(mode="lines", hovertemplate="<b>%{data.name}</b><br>Tempo: %{x:.2f}s<br>Angulo: %{y:.2f}°")
+        fig.update_layout(legend_title_text='Eixo')
+        return fig
+
+    def FiguraMatplotlib(self, i: int): # mesma figura desenhada direto no Agg (sem navegador)
+        from matplotlib.figure import Figure
+        colunas_plot = self.ColunasMembro(i)
+        df = self.DadosMembro(i)
+        fig = Figure(figsize=(10, 5))
+        ax = fig.add_subplot()
+        for c in colunas_plot: ax.plot(df['tempo_s'].values, df[c].values, linewidth=1, label=c)
+        ax.set_title(f"Análise do Movimento - {self.membro}")
+        ax.set_xlabel("Tempo (segundos)"); ax.set_ylabel("Angulo (graus)")
+        ax.legend(title="Eixo"); ax.grid(alpha=0.3)
+        return fig
+
     def GerarGrafico(self) -> int: # função que vai gerar os gráficos fazendo um loop de acordo com o número de sensores
         self.Tempo()
+        figs, nomes = [], []
         for i in range(self.graficos): # número máx de sensores = 3 (é possivel alterar)
-            match i:
-                case 0:
-                    self.setMembro("Coxa")
-                case 1:
-                    self.setMembro("Canela")
-                case 2:
-                    self.setMembro("Pe")
-            coluna_inicio = 0 + i*3
-            coluna_final = 3 + i*3
-            colunas_plot = self.colunas[coluna_inicio:coluna_final]
-            nome_imagem = f"./Dados/{self.membro}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            fig = px.line(self.df,
-                        x='tempo_s',
-                        y = colunas_plot,
-                        title=f"Análise do Movimento - {self.membro}",
-                        labels={"value": "Angulo (graus)", "tempo_s": "Tempo (segundos)", "variable": "Eixo"})
-            fig.update_traces(mode="lines", hovertemplate="<b>%{data.name}</b><br>Tempo: %{x:.2f}s<br>Angulo: %{y:.2f}°")
-            fig.update_layout(legend_title_text='Eixo')
-            fig.write_image(f"{nome_imagem}.png")
\ No newline at end of file
+            figs.append(self.Figura(i))
+            nomes.append(f"./Dados/{self.membro}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
+        exportar_plotly(figs, nomes)
+        return len(figs)
+
+
+# Exportação em lote: o renderizador estático do plotly (kaleido) é iniciado uma vez e
+# reaproveitado, e os membros de cada sessão são enviados juntos. O motor "matplotlib"
+# desenha no Agg, sem navegador, num pool de processos que fica aberto entre as chamadas.
+
+def iniciar_kaleido():
+    # kaleido >= 1 abre um Chromium por write_image, a menos que o servidor fique de pé
+    try:
+        import kaleido
+        kaleido.start_sync_server(silence_warnings=True)
+    except (ImportError, AttributeError, RuntimeError):
+        pass # kaleido 0.x já mantém o processo aberto depois da primeira imagem
+
+def exportar_plotly(figs: list, caminhos: list):
+    if hasattr(pio, "write_images"): pio.write_images(figs, caminhos) # plotly >= 6.1: um lote só
+    else:
+        for fig, caminho in zip(figs, caminhos): fig.write_image(caminho)
+
+def _iniciar_processo_mpl():
+    import matplotlib
+    matplotlib.use("Agg")
+
+def desenhar_membro(tarefa: tuple) -> tuple:
+    # Roda no processo filho: uma figura (sessão, membro) direto para o PNG
+    caminho_csv, i, destino, max_pontos, intervalo = tarefa
+    inicio = time.perf_counter()
+    grafico = Grafico(caminho_csv, verboso=False, max_pontos=max_pontos, intervalo=intervalo)
+    grafico.Tempo([i])
+    grafico.FiguraMatplotlib(i).savefig(destino, dpi=100)
+    return destino, time.perf_counter() - inicio
+
+
+class ExportadorGraficos (object):
+    def __init__(self, pasta_saida: str = "./Dados", motor: str = "plotly", max_processos: int = None,
+                 max_pontos: int = MAX_PONTOS_IMAGEM, intervalo: tuple = None):
+        self.pasta_saida = pasta_saida
+        self.max_pontos = max_pontos # None desenha todas as amostras
+        self.intervalo = intervalo # (início, fim) em s; None: sessão inteira
+        self.motor = motor
+        self.max_processos = max_processos or min(6, os.cpu_count())
+        self.pool = None # criado no primeiro uso e mantido aberto
+        self.fila = ThreadPoolExecutor(1) # exportações em segundo plano, uma por vez e na ordem
+        self.kaleido = False
+
+    def getMotor(self) -> str:
+        return self.motor
+    def setMotor(self, motor: str):
+        self.motor = motor
+
+    def Destinos(self, caminho_csv: str, graficos: int) -> list:
+        base = os.path.splitext(os.path.basename(caminho_csv))[0]
+        if self.intervalo is not None: # trecho não sobrescreve a imagem da sessão inteira
+            base += "_" + "-".join("" if t is None else f"{t:g}" for t in self.intervalo) + "s"
+        return [os.path.join(self.pasta_saida, f"{base}_{MEMBROS[i]}.png") for i in range(graficos)]
+
+    def Exportar(self, arquivos: list) -> list:
+        # Gera os PNGs de todos os arquivos; devolve (e imprime) o tempo de cada um
+        os.makedirs(self.pasta_saida, exist_ok=True)
+        if self.motor == "matplotlib": resultados = self._exportarMatplotlib(arquivos)
+        else: resultados = self._exportarPlotly(arquivos)
+        for r in resultados:
+            if r["erro"] is None: print(f"{r['arquivo']}: {len(r['imagens'])} imagens em {r['tempo']:.2f} s")
+            else: print(f"{r['arquivo']}: ERRO {r['erro']}")
+        return resultados
+
+    def _exportarPlotly(self, arquivos: list) -> list:
+        if not self.kaleido:
+            iniciar_kaleido(); self.kaleido = True
+        resultados = []
+        for arq in arquivos:
+            inicio = time.perf_counter()
+            try:
+                grafico = Grafico(arq, verboso=False, max_pontos=self.max_pontos, intervalo=self.intervalo)
+                grafico.Tempo()
+                destinos = self.Destinos(arq, grafico.graficos)
+                exportar_plotly([grafico.Figura(i) for i in range(grafico.graficos)], destinos)
+                resultados.append({"arquivo": arq, "imagens": destinos, "tempo": time.perf_counter() - inicio, "erro": None})
+            except Exception as e: # um arquivo ruim não derruba o lote
+                resultados.append({"arquivo": arq, "imagens": [], "tempo": time.perf_counter() - inicio, "erro": f"{type(e).__name__}: {e}"})
+        return resultados
+
+    def _exportarMatplotlib(self, arquivos: list) -> list:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.max_processos, initializer=_iniciar_processo_mpl)
+        futuros = {}
+        for arq in arquivos: # todos os membros de todos os arquivos entram no pool de uma vez
+            try:
+                graficos = Grafico(arq, verboso=False, max_pontos=0).graficos # max_pontos != None: só lê o cabeçalho
+            except Exception as e:
+                futuros[arq] = e; continue
+            futuros[arq] = [self.pool.submit(desenhar_membro, (arq, i, d, self.max_pontos, self.intervalo)) for i, d in enumerate(self.Destinos(arq, graficos))]
+        resultados = []
+        for arq, futs in futuros.items():
+            if isinstance(futs, Exception):
+                resultados.append({"arquivo": arq, "imagens": [], "tempo": 0.0, "erro": f"{type(futs).__name__}: {futs}"}); continue
+            try:
+                feitos, erro = [f.result() for f in futs], None
+            except Exception as e:
+                feitos, erro = [], f"{type(e).__name__}: {e}"
+            # tempo do arquivo = soma do desenho dos seus membros (que rodaram em paralelo)
+            resultados.append({"arquivo": arq, "imagens": [d for d, _ in feitos], "tempo": sum(t for _, t in feitos), "erro": erro})
+        return resultados
+
+    def ExportarEmSegundoPlano(self, arquivos):
+        # Não bloqueia: devolve um Future com a lista de resultados do Exportar
+        if isinstance(arquivos, str): arquivos = [arquivos]
+        return self.fila.submit(self.Exportar, list(arquivos))
+
+    def Fechar(self):
+        self.fila.shutdown(wait=True)
+        if self.pool is not None:
+            self.pool.shutdown(wait=True); self.pool = None
+        if self.kaleido:
+            try:
+                import kaleido
+                kaleido.stop_sync_server(silence_warnings=True)
+            except (ImportError, AttributeError, RuntimeError):
+                pass
+            self.kaleido = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os gráficos (PNG) de uma ou mais sessões")
+    parser.add_argument("arquivos", nargs="+", help="arquivos HOMEFISIO_DADOS_*.csv")
+    parser.add_argument("--saida", default="./Dados")
+    parser.add_argument("--motor", choices=["plotly", "matplotlib"], default="plotly")
+    parser.add_argument("--processos", type=int)
+    parser.add_argument("--pontos", type=int, default=MAX_PONTOS_IMAGEM, help="pontos por membro (0 = todos)")
+    parser.add_argument("--inicio", type=float, help="só o trecho a partir deste segundo")
+    parser.add_argument("--fim", type=float, help="só o trecho até este segundo")
+    args = parser.parse_args()
+    intervalo = (args.inicio, args.fim) if args.inicio is not None or args.fim is not None else None
+    with ExportadorGraficos(args.saida, args.motor, args.processos, args.pontos or None, intervalo) as exportador:
+        inicio = time.perf_counter()
+        resultados = exportador.Exportar(args.arquivos)
+        print(f"{sum(r['erro'] is None for r in resultados)}/{len(resultados)} arquivos em {time.perf_counter() - inicio:.2f} s")
+
+if __name__ == "__main__":
+    main()
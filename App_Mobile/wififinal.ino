@@ -58,6 +58,26 @@ float s3_pitch_offset=0, s3_roll_offset=0, s3_yaw_offset=0;
 
 bool isCalibrated = false;
 bool isZeroed = false;
+bool modoBinario = false; // 'b' liga os quadros binários, 'j' volta ao JSON
+uint16_t seqQuadro = 0;
+
+// Quadro binário (46 bytes, little-endian), decodificado por quadro_binario.py
+struct __attribute__((packed)) QuadroBinario {
+  uint16_t sinc;   // 0x5AA5 -> bytes A5 5A
+  uint16_t seq;    // conta quadros perdidos no receptor
+  uint32_t t;      // millis()
+  float ang[9];    // p1,r1,y1,p2,r2,y2,p3,r3,y3
+  uint16_t crc;    // CRC-16/CCITT-FALSE de seq..ang
+};
+
+uint16_t crc16_ccitt(const uint8_t* d, size_t n) {
+  uint16_t crc = 0xFFFF;
+  while (n--) {
+    crc ^= (uint16_t)(*d++) << 8;
+    for (int i = 0; i < 8; i++) crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+  }
+  return crc;
+}
 
 // --- FUNÇÃO HELPER MODIFICADA (COM TIMEOUT) ---
 int16_t read16(TwoWire& bus, uint8_t devAddr, uint8_t reg) {
@@ -166,7 +186,7 @@ void loop() {
     client = server.available();
     if (client && client.connected()) {
       Serial.println("App conectado!");
-      isCalibrated = false; isZeroed = false;
+      isCalibrated = false; isZeroed = false; modoBinario = false;
     }
   }
 
@@ -174,6 +194,8 @@ void loop() {
     char c = client.read();
     if (c == 'c' && !isCalibrated) { calibrate_sensors(); isCalibrated = true; }
     else if (c == 'z' && isCalibrated) { set_zero_offsets(); isZeroed = true; }
+    else if (c == 'b') { modoBinario = true; seqQuadro = 0; }
+    else if (c == 'j') { modoBinario = false; }
   }
 
   unsigned long now = millis();
@@ -241,24 +263,39 @@ void loop() {
 
   if (!isZeroed) return;
 
+  float ang[9] = {
+    p1 - s1_pitch_offset, r1 - s1_roll_offset, y1 - s1_yaw_offset,
+    p2 - s2_pitch_offset, r2 - s2_roll_offset, y2 - s2_yaw_offset,
+    p3 - s3_pitch_offset, r3 - s3_roll_offset, y3 - s3_yaw_offset };
+  unsigned long tAmostra = millis();
+  static unsigned long lp = 0;
+  bool debug = millis() - lp > 1000;
+
+  // Binário: 46 bytes em vez de ~250, sem snprintf
+  if (modoBinario) {
+    QuadroBinario q;
+    q.sinc = 0x5AA5; q.seq = seqQuadro++; q.t = tAmostra;
+    memcpy(q.ang, ang, sizeof(ang));
+    q.crc = crc16_ccitt((const uint8_t*)&q + 2, sizeof(q) - 4);
+    if (client && client.connected()) client.write((const uint8_t*)&q, sizeof(q));
+    if (!debug) return;
+  }
+
   // JSON
   char jbuf[384];
   snprintf(jbuf, sizeof(jbuf),
     "{\"sensor1\":{\"pitch\":%.3f,\"roll\":%.3f,\"yaw\":%.3f},"
     "\"sensor2\":{\"pitch\":%.3f,\"roll\":%.3f,\"yaw\":%.3f},"
     "\"sensor3\":{\"pitch\":%.3f,\"roll\":%.3f,\"yaw\":%.3f},\"t\":%lu}\n",
-    p1 - s1_pitch_offset, r1 - s1_roll_offset, y1 - s1_yaw_offset,
-    p2 - s2_pitch_offset, r2 - s2_roll_offset, y2 - s2_yaw_offset,
-    p3 - s3_pitch_offset, r3 - s3_roll_offset, y3 - s3_yaw_offset, 
-    millis());
+    ang[0], ang[1], ang[2], ang[3], ang[4], ang[5], ang[6], ang[7], ang[8],
+    tAmostra);
   
-  if (client && client.connected()) {
+  if (!modoBinario && client && client.connected()) {
     client.print(jbuf);
   }
   
   // Debug (para ver se não está travando)
-  static unsigned long lp = 0;
-  if (millis() - lp > 1000) {
+  if (debug) {
     Serial.print("Data -> "); Serial.println(jbuf);
     lp = millis();
   }
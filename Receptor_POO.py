@@ -1,5 +1,10 @@
 import serial
 from datetime import datetime
+from diagnostico import DiagnosticoColeta, caminho_diagnostico
+from escritor import EscritorLote
+from formato_binario import EscritorBinario, caminho_binario
+from leitor_serial import LeitorSerialLote
+from reordenacao import BufferReordenacao
 
 class Receptor (object):
     def __init__(self, PORT: str, BAUD: int = 115200):
@@ -18,9 +23,15 @@ class Receptor (object):
     def getSerial(self) -> serial.Serial:
         return self.serial
     
+    def Abrir(self, time_out: float = 1):
+        # Abre a porta sem encerrar o programa: quem chama trata a SerialException (reconexão)
+        self.serial.close()
+        self.serial = serial.Serial(self.PORT, self.BAUD, timeout = time_out)
+        return self.serial
+
     def ConectarESP32(self, time_out: int = 1):
         try:
-            self.serial = serial.Serial(self.PORT, self.BAUD, timeout = time_out)
+            self.Abrir(time_out)
         except serial.SerialException as e:
             print(f"Erro ao conectar a {self.PORT}: {e}")
             print("Verifique se o ESP32 esta ligado e a porta COM esta correta.")
@@ -34,6 +45,11 @@ class SalvarArquivo (object):
         self.qtd_sensores = qtd_sensores
         self.nome_arquivo = f"HOMEFISIO_DADOS_{self.qtd_sensores}_SENSORES_{datetime.now().strftime('%Y%M%d_%H%M%S')}.csv"
         self.header = ""
+        self.binario = False # grava também o .hfb (formato binário) ao lado do CSV
+        self.lote = True # leitura serial em lote (in_waiting + parse vetorizado); False = readline por amostra
+        self.reordenar = True # no modo lote, ordena por t_ms e tira repetidas antes de gravar (segura ~40 ms)
+        self.rejeitadas = 0
+        self.diagnostico = None # DiagnosticoColeta da última gravação (salvo em <arquivo>.diag.json)
     
     def setNomeArquivo(self, nome: str):
         self.nome_arquivo = nome
@@ -56,27 +72,80 @@ class SalvarArquivo (object):
             self.header = header
     def getHeader(self) -> str:
         return self.header
+    def setBinario(self, binario: bool):
+        self.binario = binario
+    def getBinario(self) -> bool:
+        return self.binario
+    def setLote(self, lote: bool):
+        self.lote = lote
+    def getLote(self) -> bool:
+        return self.lote
+    def setReordenar(self, reordenar: bool):
+        self.reordenar = reordenar
+    def getReordenar(self) -> bool:
+        return self.reordenar
+    def getRejeitadas(self) -> int:
+        return self.rejeitadas
+    def getDiagnostico(self) -> DiagnosticoColeta:
+        return self.diagnostico
 
     def EscreverArquivo(self, receptor: Receptor):
-        with open (self.nome_arquivo, "w", encoding="utf-8", newline='') as f:
-            f.write(self.header)
+        # a gravação em disco roda numa thread do EscritorLote, a leitura serial nunca espera o disco
+        fb = None
+        diag = self.diagnostico = DiagnosticoColeta(origem=receptor.getPORT())
+        if self.binario:
+            fb = EscritorBinario(caminho_binario(self.nome_arquivo), self.header.strip().split(","), self.qtd_sensores).Abrir()
+        reord = BufferReordenacao(coluna_t=-1) if self.reordenar else None
+        with EscritorLote(self.nome_arquivo, self.header, diagnostico=diag, indice=True) as f:
+            def gravar(matriz, linhas):
+                if len(matriz) == 0: return
+                f.EscreverBloco("".join(l + "\n" for l in linhas), len(matriz), matriz[:, -1])
+                if fb is not None: fb.EscreverLote(matriz)
+            leitor = LeitorSerialLote(receptor.getSerial(), self.qtd_sensores) # antes do try: usado depois dele
             try:
                 print("Recebendo dados... Pressione Ctrl+C para parar")
                 while True:
                     try:
+                        if self.lote:
+                            r0 = leitor.getRejeitadas()
+                            texto, matriz = leitor.Ler()
+                            if leitor.getRejeitadas() > r0: diag.RegistrarRejeitadas(leitor.getRejeitadas() - r0)
+                            if len(matriz): diag.Registrar(matriz[:, -1]) # t_ms é a última coluna
+                            if reord is not None:
+                                gravar(*reord.Processar(matriz, texto.splitlines())) # chamado também sem dados: solta o que venceu
+                            elif len(matriz):
+                                f.EscreverBloco(texto, len(matriz), matriz[:, -1])
+                                if fb is not None: fb.EscreverLote(matriz)
+                            continue
                         line = receptor.getSerial().readline().decode(errors="ignore").strip()
                         
                         if line and line.count(',') == self.qtd_sensores*3:
-                            f.write(line + "\n")
-                            f.flush()
+                            try:
+                                t_ms = float(line[line.rfind(',') + 1:])
+                                diag.Registrar([t_ms])
+                            except ValueError:
+                                t_ms = None
+                            f.Escrever(line, t_ms)
+                            if fb is not None: fb.EscreverLinha(line)
+                        elif line:
+                            self.rejeitadas += 1
+                            diag.RegistrarRejeitadas()
                     
                     except serial.SerialException as e:
                         print(f"Erro de leitura serial: {e}. Desconectado.")
                         break
             except KeyboardInterrupt:
                 print("\nFinalizando e gerando arquivo...")
+            if reord is not None: gravar(*reord.Esvaziar())
+            self.rejeitadas += leitor.getRejeitadas()
+        if fb is not None: fb.Fechar()
         receptor.getSerial().close()
-        print(f"Arquivo gerado!\nArquivo: {self.nome_arquivo}")
+        diag.Exportar(caminho_diagnostico(self.nome_arquivo))
+        print(f"Arquivo gerado!\nArquivo: {self.nome_arquivo}\nLinhas rejeitadas (boot/corrompidas): {self.rejeitadas}")
+        print(f"Diagnóstico: {diag.Linha()}\n({caminho_diagnostico(self.nome_arquivo)})")
+        if reord is not None:
+            r = reord.Resumo()
+            print(f"Reordenação: {r['reordenadas']} fora de ordem, {r['duplicadas']} repetidas, {r['atrasadas']} atrasadas descartadas, {r['buracos']} buracos")
 
 def main():
     print("Testando conexão e Geração de Arquivo!")
@@ -0,0 +1,336 @@
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from buffers import BufferColunar, COLUNAS_SESSAO
+
+# Benchmarks dos caminhos críticos. Uso: python benchmark.py [nome ...]
+# A suíte "pipeline" passa uma sessão sintética (gerador_imu) por todas as etapas, da
+# serial ao relatório, e mede vazão, latência (p50/p95/p99) e pico de memória de cada
+# uma. --salvar-base guarda o resultado em benchmark_base.json; --comparar roda de novo
+# e aponta as etapas que pioraram mais que LIMITE_REGRESSAO (sai com código 1):
+#   python benchmark.py pipeline --duracao 600 --salvar-base
+#   python benchmark.py pipeline --duracao 600 --comparar
+
+ARQUIVO_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_base.json")
+LIMITE_REGRESSAO = 0.20 # 20% mais lento (ou mais memória) que a base
+TEMPO_MIN_ETAPA = 1.0 # s: etapas rápidas repetem até somar isso (ruído do timer)
+MAX_REPETICOES = 2000
+TAM_LEITURA_SERIAL = 4096 # bytes por read() da porta (~44 ms de UART a 921600 baud)
+
+def bench_buffer_colunar(fs: int = 100, duracao_s: int = 3600, janela_s: int = 300):
+    # Custo por amostra do append na sessão ao vivo, medido janela a janela.
+    # Se o custo é constante, a última janela custa o mesmo que a primeira.
+    buf = BufferColunar()
+    linha = {c: 0.0 for c in COLUNAS_SESSAO}
+    por_janela = fs * janela_s
+    print(f"BufferColunar.append: {fs} Hz, {duracao_s} s ({fs*duracao_s} amostras)")
+    for j in range(duracao_s // janela_s):
+        t0 = time.perf_counter()
+        for i in range(por_janela):
+            linha['t'] = (j*por_janela + i) / fs
+            buf.append(linha)
+        dt = time.perf_counter() - t0
+        print(f"  {(j+1)*janela_s/60:5.0f} min  {dt/por_janela*1e9:8.0f} ns/amostra  (capacidade {buf.getCapacidade()})")
+    t0 = time.perf_counter(); df = buf.paraDataFrame(); dt = time.perf_counter() - t0
+    print(f"  paraDataFrame: {dt*1e3:.2f} ms, sem cópia: {np.shares_memory(df['t'].values, buf.coluna('t'))}")
+
+    # Referência: o pd.concat antigo, só nos primeiros minutos (depois fica impraticável)
+    print("pd.concat por amostra (implementação antiga):")
+    df = pd.DataFrame()
+    for j in range(3):
+        t0 = time.perf_counter()
+        for i in range(fs * 20):
+            df = pd.concat([df, pd.DataFrame([linha])], ignore_index=True)
+        dt = time.perf_counter() - t0
+        print(f"  {(j+1)*20:5d} s    {dt/(fs*20)*1e9:8.0f} ns/amostra")
+
+def sinal_sintetico(fs: int = 50, duracao_s: int = 3600, seed: int = 0):
+    # Flexão/extensão com período variando em torno de 2,5 s, mais ruído de sensor
+    rng = np.random.default_rng(seed)
+    t = np.arange(fs * duracao_s) / fs
+    freq = 0.4 + 0.05 * np.sin(2 * np.pi * t / 300)
+    ang = 45 + 40 * np.sin(2 * np.pi * np.cumsum(freq) / fs) + rng.normal(0, 0.8, len(t))
+    return t, ang
+
+def bench_ensemble(fs: int = 50, duracao_s: int = 3600):
+    # Normalização dos ciclos do relatório: interp1d por ciclo (antigo) x normalizar_ciclos
+    from scipy.interpolate import interp1d
+    from scipy.signal import butter, filtfilt, find_peaks
+    from relatorio import normalizar_ciclos
+    t, ang = sinal_sintetico(fs, duracao_s)
+    b, a = butter(4, 6 / (fs / 2), 'low')
+    y = filtfilt(b, a, ang)
+    picos, _ = find_peaks(y, prominence=np.ptp(y) * 0.25, distance=int(fs * 0.8))
+    print(f"Ensemble: {duracao_s} s a {fs} Hz, {len(picos)-1} ciclos")
+
+    t0 = time.perf_counter()
+    x_norm = np.linspace(0, 100, 100)
+    antigos = []
+    for i in range(len(picos) - 1):
+        ciclo = y[picos[i]:picos[i+1]]
+        if len(ciclo) > 10:
+            antigos.append(interp1d(np.linspace(0, 100, len(ciclo)), ciclo, kind='cubic')(x_norm))
+    antigos = np.array(antigos)
+    media_a, desvio_a = antigos.mean(axis=0), antigos.std(axis=0)
+    dt_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ciclos, media, desvio = normalizar_ciclos(y, picos)
+    dt_vet = time.perf_counter() - t0
+    print(f"  interp1d por ciclo: {dt_loop*1e3:8.1f} ms")
+    print(f"  normalizar_ciclos:  {dt_vet*1e3:8.1f} ms  ({dt_loop/dt_vet:.0f}x)")
+    print(f"  diferença máx.: ciclos {np.max(np.abs(ciclos - antigos)):.2e}, média {np.max(np.abs(media - media_a)):.2e}, "
+          f"desvio {np.max(np.abs(desvio - desvio_a)):.2e}")
+
+def bench_serial(hz: int = 1000, baud: int = 921600, duracao_s: float = 3.0):
+    # readline por amostra (antigo) x LeitorSerialLote, contra a porta falsa (pty) com 3 sensores
+    import serial
+    from serial_falso import SerialFalso
+    from leitor_serial import LeitorSerialLote
+    print(f"Serial: 3 sensores, {hz} Hz, {baud} baud, {duracao_s:.0f} s por modo")
+    for modo in ("readline", "lote"):
+        falso = SerialFalso(3, hz, baud)
+        ser = serial.Serial(falso.Iniciar(), baud, timeout=0.1)
+        lidas = rejeitadas = 0
+        t0, c0 = time.perf_counter(), time.process_time()
+        if modo == "lote":
+            leitor = LeitorSerialLote(ser, 3)
+            while time.perf_counter() - t0 < duracao_s: leitor.Ler()
+            lidas, rejeitadas = leitor.getAmostras(), leitor.getRejeitadas()
+        else:
+            while time.perf_counter() - t0 < duracao_s:
+                linha = ser.readline().decode(errors="ignore").strip()
+                if linha and linha.count(',') == 9: lidas += 1
+                elif linha: rejeitadas += 1
+        cpu = time.process_time() - c0
+        falso.Parar(); ser.close()
+        print(f"  {modo:8s}  enviadas {falso.getEnviadas():6d}  lidas {lidas:6d}  rejeitadas {rejeitadas:4d} "
+              f"(lixo enviado {falso.getCorrompidas() + falso.getLinhasBoot()})  CPU {cpu/max(lidas, 1)*1e6:6.1f} us/amostra")
+
+def bench_quadros(n: int = 50000, tam_leitura: int = 65536):
+    # Mesmas amostras em linhas JSON e em quadros binários, decodificadas em blocos de socket
+    import json
+    from quadro_binario import DecodificadorFluxo, montar_quadro
+    ang = np.random.default_rng(0).normal(0, 60, (n, 9)).round(3)
+    linhas = [json.dumps({f"sensor{s+1}": dict(zip(("pitch", "roll", "yaw"), a[3*s:3*s + 3].tolist())) for s in range(3)} | {"t": 20 * i},
+                         separators=(',', ':')) + "\n" for i, a in enumerate(ang)]
+    fluxos = {"json": "".join(linhas).encode(), "binario": b"".join(montar_quadro(i, 20 * i, a) for i, a in enumerate(ang))}
+    print(f"Decodificação do fluxo do ESP32: {n} amostras, leituras de {tam_leitura} bytes")
+    for nome, fluxo in fluxos.items():
+        dec = DecodificadorFluxo()
+        t0 = time.perf_counter()
+        lidas = sum(len(dec.Processar(fluxo[i:i + tam_leitura])[0]) for i in range(0, len(fluxo), tam_leitura))
+        dt = time.perf_counter() - t0
+        print(f"  {nome:8s}  {len(fluxo)/n:6.1f} bytes/amostra  {dt/n*1e6:6.2f} us/amostra  ({lidas} lidas)")
+
+def bench_espectro(fs: int = 100, duracao_s: int = 3600):
+    # FFT complexa do sinal inteiro (analise_fft antigo) x motor por janelas do espectro.py,
+    # com 5 min de tremor a 5,5 Hz no meio da sessão
+    from scipy.fft import fft, fftfreq
+    from espectro import EspectroOnline, espectro_amplitude, tremor_por_janela, welch, LIMIAR_TREMOR_GRAUS
+    t, ang = sinal_sintetico(fs, duracao_s)
+    trecho = (t >= duracao_s / 2) & (t < duracao_s / 2 + 300)
+    ang[trecho] += 1.5 * np.sin(2 * np.pi * 5.5 * t[trecho])
+    def fft_inteira():
+        yf = fft(ang - np.mean(ang))
+        fftfreq(len(ang), 1 / fs)[:len(ang)//2], 2.0/len(ang) * np.abs(yf[:len(ang)//2])
+    def ao_vivo():
+        # lotes de 0,2 s, como chegam do canal ao vivo
+        estado, tempos = EspectroOnline(fs), []
+        for i in range(0, len(ang), fs // 5):
+            t0 = time.perf_counter(); estado.Alimentar(ang[i:i + fs // 5]); tempos.append(time.perf_counter() - t0)
+        return tempos
+    print(f"Espectro: {duracao_s} s a {fs} Hz ({len(ang)} amostras)")
+    print(f"  {'etapa':22s} {'ms':>9s} {'p99 ms':>9s} {'pico MB':>9s}")
+    for nome, funcao in (("fft inteira (antiga)", fft_inteira), ("espectro_amplitude", lambda: espectro_amplitude(ang, fs) and None),
+                         ("welch", lambda: welch(ang, fs) and None), ("tremor_por_janela", lambda: tremor_por_janela(ang, fs) and None),
+                         ("ao vivo (lotes 0,2 s)", ao_vivo)):
+        r = medir_etapa(nome, funcao, len(ang), 3)
+        total = len(ang) / r["amostras_s"] * 1e3
+        print(f"  {nome:22s} {total:9.1f} {r['p99_ms']:9.2f} {r['pico_mb']:9.1f}")
+    r = tremor_por_janela(ang, fs)
+    marcadas = r["t"][r["rms"] > LIMIAR_TREMOR_GRAUS]
+    if len(marcadas): print(f"  tremor detectado de {marcadas.min():.0f} s a {marcadas.max():.0f} s (inserido em {duracao_s/2:.0f}-{duracao_s/2+300:.0f} s)")
+
+def bench_intervalo(fs: int = 50, duracao_s: int = 3 * 3600, janela_s: float = 10.0):
+    # Trecho de uma sessão longa gravada: leitura do CSV inteiro + filtro x índice .tidx
+    from indice_tempo import carregar_intervalo, construir_indice
+    n = fs * duracao_s
+    rng = np.random.default_rng(0)
+    dados = np.column_stack([rng.normal(0, 30, (n, 9)).round(2), np.arange(n) * (1000 // fs)])
+    with tempfile.TemporaryDirectory() as pasta:
+        csv = os.path.join(pasta, "sessao.csv")
+        pd.DataFrame(dados, columns=[f"{e}{i}" for i in (1, 2, 3) for e in "pry"] + ["t_ms"]).to_csv(csv, index=False, float_format="%.2f")
+        t0 = time.perf_counter(); construir_indice(csv); dt_idx = time.perf_counter() - t0
+        print(f"Intervalo: {duracao_s} s a {fs} Hz ({os.path.getsize(csv) / 2**20:.0f} MB), índice em {dt_idx:.2f} s")
+        meio = duracao_s / 2
+        def inteiro():
+            df = pd.read_csv(csv)
+            t = (df["t_ms"] - df["t_ms"].iloc[0]) / 1000.0
+            df[(t >= meio) & (t <= meio + janela_s)]
+        def trecho(): carregar_intervalo(csv, meio, meio + janela_s)
+        for nome, funcao in (("csv inteiro + filtro", inteiro), (f"carregar_intervalo {janela_s:.0f} s", trecho)):
+            r = medir_etapa(nome, funcao, n, 3)
+            print(f"  {nome:26s} {n / r['amostras_s'] * 1e3:9.1f} ms  pico {r['pico_mb']:7.1f} MB")
+
+def medir_etapa(nome: str, funcao, n_amostras: int, repeticoes: int = 5) -> dict:
+    # funcao() roda a etapa inteira; se devolver uma lista de tempos (s) por operação
+    # (ex.: cada read da serial), os percentis saem dela, senão de cada repetição.
+    # Roda pelo menos `repeticoes` vezes e até somar TEMPO_MIN_ETAPA; a vazão vem da
+    # melhor execução e a dispersão (mediana/melhor - 1) vai junto para o --comparar.
+    # O pico de memória é medido numa execução à parte, com o tracemalloc ligado
+    # (ele deixa o código bem mais lento, então não entra na conta de tempo).
+    funcao() # aquece caches, imports e o JIT de formatação do pandas
+    totais, latencias = [], []
+    while len(totais) < repeticoes or (sum(totais) < TEMPO_MIN_ETAPA and len(totais) < MAX_REPETICOES):
+        t0 = time.perf_counter()
+        parciais = funcao()
+        totais.append(time.perf_counter() - t0)
+        latencias += parciais if parciais else [totais[-1]]
+    tracemalloc.start()
+    funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    lat = np.array(latencias) * 1e3
+    return {"etapa": nome, "amostras": n_amostras, "amostras_s": n_amostras / min(totais), "repeticoes": len(totais),
+            "dispersao": float(np.median(totais) / min(totais) - 1),
+            "p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95)),
+            "p99_ms": float(np.percentile(lat, 99)), "pico_mb": pico / 2**20}
+
+def etapas_pipeline(gerador, pasta: str) -> dict:
+    # {nome: (função, amostras processadas)} sobre a mesma sessão sintética
+    from leitor_serial import LeitorSerialLote
+    from escritor import EscritorLote
+    from Analise_POO import Grafico
+    from biomecanica import processar_biomecanica, processar_biomecanica_lote, calculate_jerk, analise_fft, analise_tremor
+    from relatorio import gerar_relatorio_octave
+    n = gerador.getAmostras()
+    fluxo = gerador.LinhasCSV()
+    texto = fluxo.decode().replace("\r\n", "\n")
+    header = ",".join(gerador.getColunas()) + "\n"
+    csv = gerador.GravarCSV(os.path.join(pasta, "sessao.csv"))
+    df = gerador.DataFrame()
+    matriz = df[[f"{e}{i}" for i in range(1, gerador.qtd_sensores + 1) for e in "pry"]].to_numpy()
+    t, ang, *_ = processar_biomecanica(df, gerador.exercicio, 70, 1.75, "Masculino")
+
+    def serial():
+        leitor, tempos = LeitorSerialLote(None, gerador.qtd_sensores), []
+        for i in range(0, len(fluxo), TAM_LEITURA_SERIAL):
+            t0 = time.perf_counter()
+            leitor.Processar(fluxo[i:i + TAM_LEITURA_SERIAL])
+            tempos.append(time.perf_counter() - t0)
+        return tempos
+    def gravacao():
+        # blocos do tamanho de uma leitura da serial, com fsync no fechamento
+        with EscritorLote(os.path.join(pasta, "gravacao.csv"), header) as f:
+            for i in range(0, len(texto), TAM_LEITURA_SERIAL): f.EscreverBloco(texto[i:i + TAM_LEITURA_SERIAL])
+    def grafico():
+        g = Grafico(csv, verboso=False)
+        g.Tempo()
+        for i in range(g.graficos): g.FiguraMatplotlib(i).savefig(io.BytesIO(), format="png", dpi=100)
+    def relatorio():
+        gerar_relatorio_octave(t, ang, "Benchmark").savefig(io.BytesIO(), format="png", dpi=100)
+
+    return {"serial": (serial, n), "csv": (gravacao, n), "grafico": (grafico, n),
+            "biomecanica": (lambda: processar_biomecanica(df, gerador.exercicio, 70, 1.75, "Masculino") and None, n),
+            "articulacoes": (lambda: processar_biomecanica_lote(df, 70, 1.75, "Masculino") and None, n), # todas numa passada
+            "matriz": (lambda: processar_biomecanica_lote(matriz, 70, 1.75, "Masculino") and None, n), # [n, 3*sensores], sem t (50 Hz)
+            "jerk": (lambda: calculate_jerk(ang, t) and None, len(t)),
+            "fft": (lambda: analise_fft(ang, 50) and None, len(t)),
+            "tremor": (lambda: analise_tremor(df, gerador.exercicio) and None, len(t)),
+            "relatorio": (relatorio, len(t))}
+
+def chave_base(args) -> str:
+    return f"{args.exercicio}|{args.sensores}s|{args.hz:g}Hz|{args.duracao:g}s"
+
+def comparar_base(resultados: list, base: dict) -> list:
+    # Etapas que perderam vazão ou ganharam memória acima do limite; na vazão o limite
+    # cresce com a dispersão medida na base e agora (máquina ruidosa não vira regressão)
+    regressoes = []
+    for r in resultados:
+        b = base.get(r["etapa"])
+        if b is None: continue
+        limite = LIMITE_REGRESSAO + b.get("dispersao", 0.0) + r.get("dispersao", 0.0)
+        if r["amostras_s"] < b["amostras_s"] / (1 + limite):
+            regressoes.append(f"{r['etapa']}: vazão {r['amostras_s']:.0f} x {b['amostras_s']:.0f} amostras/s")
+        if r["pico_mb"] > b["pico_mb"] * (1 + LIMITE_REGRESSAO) + 0.5: # folga de 0,5 MB para etapas pequenas
+            regressoes.append(f"{r['etapa']}: memória {r['pico_mb']:.1f} x {b['pico_mb']:.1f} MB")
+    return regressoes
+
+def bench_pipeline(args=None):
+    import matplotlib
+    matplotlib.use("Agg")
+    from gerador_imu import GeradorIMU
+    args = args or argumentos([])
+    gerador = GeradorIMU(args.exercicio, args.sensores, args.hz, args.duracao)
+    print(f"Pipeline: {args.exercicio}, {args.sensores} sensor(es), {args.hz:g} Hz, {args.duracao:g} s "
+          f"({gerador.getAmostras()} amostras), ≥{args.repeticoes} repetições e ≥{TEMPO_MIN_ETAPA:g} s por etapa")
+    print(f"  {'etapa':12s} {'amostras/s':>12s} {'disp %':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'pico MB':>9s}")
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, (funcao, n) in etapas_pipeline(gerador, pasta).items():
+            r = medir_etapa(nome, funcao, n, args.repeticoes)
+            resultados.append(r)
+            print(f"  {nome:12s} {r['amostras_s']:12.0f} {100 * r['dispersao']:7.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} {r['pico_mb']:9.1f}")
+    chave = chave_base(args)
+    bases = {}
+    if os.path.exists(args.base):
+        with open(args.base, "r", encoding="utf-8") as f: bases = json.load(f)
+    if args.comparar:
+        if chave not in bases:
+            print(f"Sem base para {chave} em {args.base} (rode com --salvar-base)")
+            return 1
+        regressoes = comparar_base(resultados, {b["etapa"]: b for b in bases[chave]["etapas"]})
+        for r in regressoes: print(f"  REGRESSÃO {r}")
+        if not regressoes: print(f"  Sem regressões em relação à base de {bases[chave]['data']}")
+        return 1 if regressoes else 0
+    if args.salvar_base:
+        bases[chave] = {"data": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+                        "numpy": np.__version__, "pandas": pd.__version__, "etapas": resultados}
+        with open(args.base, "w", encoding="utf-8") as f: json.dump(bases, f, indent=2, ensure_ascii=False)
+        print(f"  Base salva em {args.base} ({chave})")
+    return 0
+
+BENCHMARKS = {
+    "buffer": bench_buffer_colunar,
+    "ensemble": bench_ensemble,
+    "serial": bench_serial,
+    "quadros": bench_quadros,
+    "espectro": bench_espectro,
+    "intervalo": bench_intervalo,
+    "pipeline": bench_pipeline,
+}
+
+def argumentos(argv):
+    from gerador_imu import EXERCICIOS
+    parser = argparse.ArgumentParser(description="Benchmarks do HomeFisio")
+    parser.add_argument("nomes", nargs="*", help=f"padrão: todos ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--exercicio", default="Flexão de Joelho", choices=list(EXERCICIOS))
+    parser.add_argument("--sensores", type=int, default=3)
+    parser.add_argument("--hz", type=float, default=50)
+    parser.add_argument("--duracao", type=float, default=600, help="segundos de sessão sintética")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--base", default=ARQUIVO_BASE)
+    parser.add_argument("--salvar-base", action="store_true")
+    parser.add_argument("--comparar", action="store_true", help="sai com código 1 se alguma etapa regrediu")
+    args = parser.parse_args(argv)
+    for nome in args.nomes:
+        if nome not in BENCHMARKS: parser.error(f"benchmark desconhecido: {nome}")
+    return args
+
+def main():
+    args = argumentos(sys.argv[1:])
+    codigo = 0
+    for nome in args.nomes or list(BENCHMARKS):
+        codigo |= (BENCHMARKS[nome](args) or 0) if nome == "pipeline" else (BENCHMARKS[nome]() or 0)
+    sys.exit(codigo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+from espectro import espectro_amplitude, tremor_por_janela
+from reordenacao import ordem_monotonica
+
+# Núcleo numérico do HomeFisio (sinais + motor biomecânico), sem dependência do
+# Streamlit, para poder ser usado pelo dashboard e por processos em lote.
+
+# ==============================================================================
+# MÓDULO: CÁLCULO NUMÉRICO E SINAIS (BASE)
+# ==============================================================================
+def calculate_jerk(y_values, t_values):
+    try:
+        y = pd.Series(y_values); t = pd.Series(t_values)
+        dt = t.diff().fillna(0.02).replace(0, 0.02)
+        velocity = y.diff() / dt
+        acc = velocity.diff() / dt
+        jerk = acc.diff() / dt
+        rms_jerk = np.sqrt((jerk ** 2).mean())
+        return 0.0 if np.isnan(rms_jerk) else rms_jerk
+    except: return 0.0
+
+def interpret_results(amplitude, jerk_score, forca_kg, torque_max, energia_j, freq_pico):
+    laudo = []
+    if amplitude < 15: laudo.append(f"⚠️ **Amplitude Crítica ({amplitude:.1f}°):** Movimento curto.")
+    elif amplitude < 60: laudo.append(f"ℹ️ **Amplitude Funcional ({amplitude:.1f}°):** Aceitável.")
+    else: laudo.append(f"✅ **Amplitude Excelente ({amplitude:.1f}°):** Ótima excursão.")
+    
+    if freq_pico > 4.0: laudo.append(f"🚨 **Tremor ({freq_pico:.1f} Hz):** Oscilação rápida detectada.")
+    elif jerk_score > 800: laudo.append(f"⚠️ **Instabilidade:** Movimento brusco (Jerk {jerk_score:.0f}).")
+    else: laudo.append(f"✨ **Controle:** Fluido.")
+        
+    laudo.append(f"💪 **Força:** {forca_kg:.1f} kgf ({torque_max:.1f} Nm).")
+    if energia_j > 100: laudo.append(f"🔥 **Alta Demanda:** {energia_j:.1f} J.")
+    
+    return "\n\n".join(laudo)
+
+# As rotinas abaixo operam no último eixo: um vetor é uma série, uma matriz [k, n] são
+# k séries com o mesmo tempo (uma por articulação) processadas juntas.
+def derivacao_numerica_central(y, h):
+    dy = np.zeros_like(y)
+    if np.shape(y)[-1] < 3: return dy
+    dy[..., 1:-1] = (y[..., 2:] - y[..., :-2]) / (2 * h)
+    dy[..., 0], dy[..., -1] = (y[..., 1] - y[..., 0]) / h, (y[..., -1] - y[..., -2]) / h
+    return dy
+
+def integracao_simpson(y, h):
+    if np.shape(y)[-1] < 3: return np.sum(y, axis=-1) * h 
+    soma = y[..., 0] + y[..., -1] + 4*np.sum(y[..., 1:-1:2], axis=-1) + 2*np.sum(y[..., 2:-1:2], axis=-1)
+    return (h / 3) * soma
+
+def filtro_convolucao(sinal, janela=10):
+    if len(sinal) < janela: return sinal
+    h = np.ones(janela) / janela
+    return np.convolve(sinal, h, mode='same')
+
+def filtro_convolucao_series(sinais, janela=10):
+    # filtro_convolucao em cada linha de [k, n]. O np.convolve por série já é um laço em
+    # C e sai mais rápido que qualquer equivalente 2-D (soma acumulada, fatias somadas)
+    if sinais.shape[-1] < janela: return sinais
+    h = np.ones(janela) / janela
+    saida = np.empty_like(sinais)
+    for k in range(len(sinais)): saida[k] = np.convolve(sinais[k], h, mode='same')
+    return saida
+
+def interpolar_series(x, xp, fp):
+    # np.interp de cada linha de fp [k, n] no mesmo xp (idem: a busca incremental do
+    # np.interp ganha de searchsorted + take em 2-D)
+    saida = np.empty((len(fp), len(x)))
+    for k in range(len(fp)): saida[k] = np.interp(x, xp, fp[k])
+    return saida
+
+def analise_fft(sinal, fs):
+    # Espectro de amplitude sem a média; sessões longas saem pela média por janelas (espectro.py)
+    return espectro_amplitude(sinal, fs)
+
+# ==============================================================================
+# MOTOR BIOMECÂNICO
+# ==============================================================================
+def parametros_segmento(exercise_name, peso, altura, genero):
+    # Antropometria do segmento movido: (massa, braço de alavanca, centro de massa)
+    coefs = {"Masculino": {"coxa": 0.105, "perna": 0.0475, "pe": 0.0143},
+             "Feminino":  {"coxa": 0.1175, "perna": 0.0483, "pe": 0.0129}}
+    lens = {"perna": 0.246, "pe": 0.152}
+    c = coefs.get(genero, coefs["Masculino"])
+    
+    if "Joelho" in exercise_name:
+        m_seg = peso * (c["perna"] + c["pe"])
+        l_tibia = altura * lens["perna"]
+        l_alavanca = l_tibia + (altura * lens["pe"] * 0.5)
+        r_com = l_tibia * 0.606 
+    elif "Quadril" in exercise_name:
+        m_seg = peso * (c["coxa"] + c["perna"] + c["pe"])
+        l_alavanca = altura * 0.53 
+        r_com = l_alavanca * 0.45 
+    else:
+        m_seg = peso * c["pe"]
+        l_alavanca = altura * lens["pe"]
+        r_com = l_alavanca * 0.5
+    return m_seg, l_alavanca, r_com
+
+# Articulação -> exercício que a move (define o segmento em parametros_segmento)
+ARTICULACOES = {"Joelho": "Flexão de Joelho", "Quadril": "Abdução de Quadril", "Tornozelo": "Dorsiflexão"}
+
+def angulo_exercicio(df, exercise_name):
+    # Ângulo bruto que cada exercício analisa (coluna pronta ou diferença entre sensores)
+    if "Joelho" in exercise_name:
+        if 'Angulo_Joelho' in df.columns: return df['Angulo_Joelho']
+        elif 'p2' in df.columns and 'p1' in df.columns: return df['p2'] - df['p1']
+        else: return df.iloc[:, 0]
+    elif "Quadril" in exercise_name:
+        return df['r1'] if 'r1' in df.columns else df.iloc[:, 0]
+    else:
+        return df['p3'] - df['p2'] if 'p3' in df.columns else df.iloc[:, 0]
+
+def angulos_articulares(sensores):
+    # Sensores (DataFrame com p1,r1,y1,... ou matriz [n, 3*qtd_sensores] nessa ordem) ->
+    # (nomes, ângulos [k, n]) das articulações que os sensores presentes permitem calcular
+    if hasattr(sensores, 'columns'):
+        qtd = sum(1 for i in (1, 2, 3) if f"p{i}" in sensores.columns)
+        col = lambda nome: sensores[nome].to_numpy(dtype=np.float64)
+    else:
+        sensores = np.asarray(sensores, dtype=np.float64)
+        qtd = sensores.shape[1] // 3
+        col = lambda nome: sensores[:, 3*(int(nome[1]) - 1) + "pry".index(nome[0])]
+    series = {"Joelho": (("p2", "p1"), 2), "Quadril": (("r1",), 1), "Tornozelo": (("p3", "p2"), 3)}
+    nomes = [a for a, (_, minimo) in series.items() if qtd >= minimo]
+    angulos = np.empty((len(nomes), len(sensores)))
+    for k, a in enumerate(nomes):
+        cols = series[a][0]
+        if len(cols) == 2: np.subtract(col(cols[0]), col(cols[1]), out=angulos[k])
+        else: angulos[k] = col(cols[0])
+    return nomes, angulos
+
+def tempo_sessao(df, dt=0.02):
+    return df['tempo_s'] if 'tempo_s' in df.columns else (df['t'] if 't' in df.columns else np.arange(len(df))*dt)
+
+def processar_articulacoes(t_orig, angulos, exercicios, peso, altura, genero, fs=50.0):
+    """
+    Motor biomecânico para k séries de ângulo com o mesmo tempo, todas de uma vez:
+    reamostragem a fs, média móvel, derivadas, torque/força/energia em matrizes [k, m].
+    exercicios: um nome por série (escolhe o segmento e a antropometria).
+    Devolve {"t" ([m]), "ang", "omega", "alpha", "torque", "forca" ([k, m]), "energia", "m_seg" ([k])}.
+    """
+    g = 9.81
+    dt = 1.0/fs
+    segmentos = np.array([parametros_segmento(e, peso, altura, genero) for e in exercicios], dtype=np.float64).reshape(-1, 3)
+    m_seg, l_alavanca, r_com = (c[:, None] for c in segmentos.T) # [k, 1]: uma constante por série
+    # o np.interp exige tempo crescente: amostras invertidas/repetidas são ordenadas/removidas
+    t_orig = np.asarray(t_orig, dtype=np.float64)
+    angulos = np.asarray(angulos, dtype=np.float64).reshape(-1, len(t_orig))
+    ordem = ordem_monotonica(t_orig)
+    t_orig, angulos = t_orig[ordem], angulos[:, ordem]
+    t_novo = np.arange(t_orig.min(), t_orig.max(), dt)
+
+    ang_filt = filtro_convolucao_series(interpolar_series(t_novo, t_orig, angulos), 10)
+
+    theta_rad = np.radians(ang_filt)
+    omega = derivacao_numerica_central(theta_rad, dt)
+    alpha = derivacao_numerica_central(omega, dt)
+
+    # mesma conta do caminho de uma série, em [k, m] e sem temporários extras
+    I_seg = m_seg * (r_com ** 2)
+    torque = np.sin(theta_rad)
+    torque *= m_seg * g * r_com
+    torque += I_seg * alpha
+    forca = torque / l_alavanca
+    potencia = np.multiply(torque, omega)
+    energia = integracao_simpson(np.abs(potencia, out=potencia), dt)
+    return {"t": t_novo, "ang": ang_filt, "omega": omega, "alpha": alpha, "torque": torque, "forca": forca,
+            "energia": energia, "m_seg": m_seg[:, 0]}
+
+def processar_biomecanica_lote(sensores, peso, altura, genero, t=None):
+    # Todas as articulações da sessão numa passada. sensores: DataFrame do receptor
+    # (p1..y3 + tempo_s/t) ou matriz [n, 3*qtd_sensores]; t em segundos (padrão: 50 Hz).
+    # O resultado do processar_articulacoes ganha "articulacoes" (nome de cada linha).
+    if t is None and hasattr(sensores, 'columns'): t = tempo_sessao(sensores)
+    nomes, angulos = angulos_articulares(sensores)
+    if t is None: t = np.arange(angulos.shape[1]) * 0.02 # angulos é [k, n]: n amostras
+    res = processar_articulacoes(t, angulos, [ARTICULACOES[a] for a in nomes], peso, altura, genero)
+    res["articulacoes"] = nomes
+    return res
+
+def resultado_articulacao(res, articulacao):
+    # Uma articulação do resultado em lote no formato do processar_biomecanica
+    k = res["articulacoes"].index(articulacao)
+    return res["t"], res["ang"][k], res["torque"][k], res["forca"][k], res["energia"][k], res["m_seg"][k]
+
+def analise_tremor(df, exercise_name, fs=50.0):
+    # Tremor por janela no ângulo do exercício reamostrado a fs, antes da média móvel
+    # (a média de 10 amostras a 50 Hz zera justamente os 5 Hz). Mesma grade do motor.
+    t = np.asarray(tempo_sessao(df), dtype=np.float64)
+    y = np.asarray(angulo_exercicio(df, exercise_name), dtype=np.float64)
+    ordem = ordem_monotonica(t)
+    t, y = t[ordem], y[ordem]
+    if len(t) < 2: return tremor_por_janela(np.zeros(0), fs)
+    t_novo = np.arange(t.min(), t.max(), 1.0/fs)
+    return tremor_por_janela(np.interp(t_novo, t, y), fs, t0=t_novo[0])
+
+def processar_biomecanica(df, exercise_name, peso, altura, genero):
+    # Uma articulação (a do exercício): o motor em lote com uma coluna só
+    try:
+        res = processar_articulacoes(tempo_sessao(df), angulo_exercicio(df, exercise_name), [exercise_name], peso, altura, genero)
+        return res["t"], res["ang"][0], res["torque"][0], res["forca"][0], res["energia"][0], res["m_seg"][0]
+    except: return [], [], [], [], 0, 0
+
+
+# ==============================================================================
+# MÉTRICAS DO DASHBOARD
+# ==============================================================================
+def calcular_metricas(t_reg, ang, torque, forca_n, energia, fs=50):
+    # Indicadores mostrados no painel (os mesmos que o renderizar_dashboard calculava)
+    if len(t_reg) == 0: return None
+    xf, yf = analise_fft(ang, fs)
+    return {
+        "amplitude": float(np.max(ang) - np.min(ang)),
+        "jerk": float(calculate_jerk(ang, t_reg)),
+        "forca_kg": float(np.max(np.abs(forca_n)) / 9.81),
+        "torque_max": float(np.max(np.abs(torque))),
+        "energia": float(energia),
+        "freq_pico": float(xf[np.argmax(yf[1:]) + 1]) if xf is not None and len(xf) > 1 else 0.0,
+        "xf": xf, "yf": yf,
+    }
@@ -0,0 +1,207 @@
+import numpy as np
+from buffers import BufferColunar
+from biomecanica import parametros_segmento, analise_fft
+from espectro import EspectroOnline
+
+# Versão incremental (causal, com estado) do processar_biomecanica + calcular_metricas.
+# Cada lote que chega do canal ao vivo passa pelas mesmas etapas do caminho em lote,
+# só que guardando o estado entre lotes: reamostragem a 50 Hz, média móvel de 10
+# amostras, derivadas centrais, torque/força e os acumuladores de energia (Simpson),
+# jerk RMS, amplitude e máximos. O custo é O(1) por amostra; a série filtrada sai com
+# 6 amostras de atraso (4 da média móvel centrada + 1 de cada derivada), que são
+# fechadas no Finalizar() com as mesmas bordas do caminho em lote.
+#
+# Tolerância: para t crescente o resultado bate com o caminho em lote a menos do
+# arredondamento das somas (diferença relativa < 1e-12 em séries e escalares). O tremor
+# por janela (espectro.EspectroOnline) acompanha a série reamostrada, antes do filtro;
+# a única etapa feita no fim é o espectro de amplitude da série filtrada.
+
+FS = 50.0
+JANELA_FILTRO = 10
+ATRASO_FILTRO = 4 # np.convolve(..., mode='same') com janela 10: f[i] = soma(x[i-5..i+4]) / 10
+G = 9.81
+
+
+class _DerivadaCentral (object):
+    # derivacao_numerica_central em fluxo: a derivada em i sai quando chega o valor i+1
+    def __init__(self, h: float):
+        self.h = h
+        self.hist = np.zeros(0) # até 2 últimos valores
+        self.n = 0
+
+    def Alimentar(self, y: np.ndarray) -> np.ndarray:
+        if len(y) == 0: return np.zeros(0)
+        cat = np.concatenate((self.hist, y))
+        out = (cat[2:] - cat[:-2]) / (2 * self.h) # centrais para os índices n-1 .. n+m-2
+        if self.n < 2 <= self.n + len(y):
+            out = np.concatenate(([(cat[1] - cat[0]) / self.h], out)) # borda inicial
+        self.n += len(y)
+        self.hist = cat[-2:]
+        return out
+
+    def Finalizar(self) -> np.ndarray:
+        if self.n < 2: return np.zeros(0)
+        return np.array([(self.hist[-1] - self.hist[-2]) / self.h]) # borda final
+
+
+class BiomecanicaOnline (object):
+    def __init__(self, exercise_name: str, peso: float, altura: float, genero: str, fs: float = FS):
+        self.parametros = (exercise_name, peso, altura, genero)
+        self.m_seg, self.l_alavanca, self.r_com = parametros_segmento(exercise_name, peso, altura, genero)
+        self.I_seg = self.m_seg * (self.r_com ** 2)
+        self.fs = fs; self.dt = 1.0 / fs
+        # reamostragem
+        self.t0 = None; self.passo = None
+        self.k = 0 # próximo ponto da grade
+        self.ult_t = None; self.ult_v = None
+        self.inicio_bruto = [] # lotes brutos do início (sessões curtas demais p/ o filtro)
+        # média móvel
+        self.hist_filtro = np.zeros(JANELA_FILTRO - 1)
+        self.n_bruto = 0; self.n_filtrado = 0
+        # derivadas e alinhamento theta/omega/alpha
+        self.d_omega = _DerivadaCentral(self.dt); self.d_alpha = _DerivadaCentral(self.dt)
+        self.theta_pend = np.zeros(0); self.omega_pend = np.zeros(0)
+        # acumuladores
+        self.n_din = 0; self.p0 = 0.0; self.p_ult = 0.0; self.soma_par = 0.0; self.soma_impar = 0.0
+        self.ang_min = np.inf; self.ang_max = -np.inf; self.torque_max = 0.0; self.forca_max = 0.0
+        self.jerk_t = np.zeros(0); self.jerk_y = np.zeros(0); self.jerk_soma = 0.0; self.jerk_n = 0
+        self.serie = BufferColunar(["t", "ang"], capacidade=1 << 14)
+        self.dinamica = BufferColunar(["torque", "forca"], capacidade=1 << 14)
+        self.espectro = EspectroOnline(fs)
+        self.resultado = None
+
+    def getParametros(self) -> tuple:
+        return self.parametros
+
+    def getAmostras(self) -> int:
+        return len(self.serie)
+
+    # --- etapas -------------------------------------------------------------
+    def _reamostrar(self, t: np.ndarray, v: np.ndarray):
+        # Mesma grade do np.arange(t.min(), t.max(), dt): t0 + k*passo, com
+        # k < ceil((t_max - t0)/dt). Amostras fora de ordem (t não crescente) são descartadas.
+        if self.t0 is None:
+            self.t0 = float(t[0]); self.passo = (self.t0 + self.dt) - self.t0
+            self.ult_t, self.ult_v = self.t0, float(v[0])
+            self.espectro.t0 = self.t0
+            t, v = t[1:], v[1:]
+        ok = t > np.maximum.accumulate(np.concatenate(([self.ult_t], t)))[:-1]
+        t, v = t[ok], v[ok]
+        if len(t) == 0: return np.zeros(0)
+        k_fim = int(np.ceil((t[-1] - self.t0) / self.dt))
+        grade = self.t0 + np.arange(self.k, k_fim) * self.passo
+        xp = np.concatenate(([self.ult_t], t)); fp = np.concatenate(([self.ult_v], v))
+        self.k = max(self.k, k_fim)
+        self.ult_t, self.ult_v = float(t[-1]), float(v[-1])
+        return np.interp(grade, xp, fp)
+
+    def _filtrar(self, x: np.ndarray) -> np.ndarray:
+        # Soma móvel de 10 sobre o histórico (zeros antes do início, como o 'same' do np.convolve)
+        cat = np.concatenate((self.hist_filtro, x))
+        f = np.convolve(cat, np.ones(JANELA_FILTRO) / JANELA_FILTRO, mode='valid')
+        self.hist_filtro = cat[-(JANELA_FILTRO - 1):]
+        descartar = max(0, ATRASO_FILTRO - self.n_bruto) # janelas que terminam antes do índice 4
+        self.n_bruto += len(x)
+        return f[descartar:]
+
+    def _dinamica(self, ang: np.ndarray, final: bool = False):
+        theta = np.radians(ang)
+        omega = self.d_omega.Alimentar(theta)
+        if final: omega = np.concatenate((omega, self.d_omega.Finalizar()))
+        alpha = self.d_alpha.Alimentar(omega)
+        if final: alpha = np.concatenate((alpha, self.d_alpha.Finalizar()))
+        self.theta_pend = np.concatenate((self.theta_pend, theta))
+        self.omega_pend = np.concatenate((self.omega_pend, omega))
+        m = len(alpha)
+        if m == 0: return
+        th, om = self.theta_pend[:m], self.omega_pend[:m]
+        self.theta_pend, self.omega_pend = self.theta_pend[m:], self.omega_pend[m:]
+        torque = (self.I_seg * alpha) + (self.m_seg * G * self.r_com * np.sin(th))
+        forca = torque / self.l_alavanca
+        self.dinamica.appendLote({"torque": torque, "forca": forca})
+        self.torque_max = max(self.torque_max, float(np.max(np.abs(torque))))
+        self.forca_max = max(self.forca_max, float(np.max(np.abs(forca))))
+        # Simpson: somas por paridade do índice; pesos das pontas acertados no fim
+        p = np.abs(torque * om)
+        idx = self.n_din + np.arange(m)
+        if self.n_din == 0: self.p0 = float(p[0])
+        self.soma_par += float(np.sum(p[idx % 2 == 0])); self.soma_impar += float(np.sum(p[idx % 2 == 1]))
+        self.p_ult = float(p[-1])
+        self.n_din += m
+
+    def _acumularAngulo(self, t: np.ndarray, ang: np.ndarray):
+        self.serie.appendLote({"t": t, "ang": ang})
+        self.ang_min = min(self.ang_min, float(np.min(ang))); self.ang_max = max(self.ang_max, float(np.max(ang)))
+        # calculate_jerk em fluxo: 3ª diferença com o dt de cada amostra (o 1º dt vale 0.02)
+        ct = np.concatenate((self.jerk_t, t)); cy = np.concatenate((self.jerk_y, ang))
+        if len(cy) >= 4:
+            dt = np.diff(ct)
+            dt[dt == 0] = 0.02
+            vel = np.diff(cy) / dt
+            acc = np.diff(vel) / dt[1:]
+            jerk = np.diff(acc) / dt[2:]
+            self.jerk_soma += float(np.sum(jerk ** 2)); self.jerk_n += len(jerk)
+        self.jerk_t, self.jerk_y = ct[-3:], cy[-3:]
+
+    def _processarFiltrado(self, ang: np.ndarray, final: bool = False):
+        i0 = self.n_filtrado
+        self.n_filtrado += len(ang)
+        t = self.t0 + np.arange(i0, self.n_filtrado) * self.passo
+        if len(ang): self._acumularAngulo(t, ang)
+        self._dinamica(ang, final)
+
+    # --- interface ----------------------------------------------------------
+    def Alimentar(self, t, ang):
+        # Lote de amostras brutas (tempo em s, ângulo do exercício em graus)
+        t = np.asarray(t, dtype=np.float64); ang = np.asarray(ang, dtype=np.float64)
+        if len(t) == 0 or self.resultado is not None: return
+        if self.n_bruto < JANELA_FILTRO: self.inicio_bruto.append((t, ang))
+        x = self._reamostrar(t, ang)
+        if len(x) == 0: return
+        self.espectro.Alimentar(x)
+        self._processarFiltrado(self._filtrar(x))
+
+    def Parcial(self) -> dict:
+        # Indicadores até agora (sem o espectro e sem as últimas 6 amostras) + tremor da última janela
+        ultima = self.espectro.Ultima()
+        return {"amplitude": self.ang_max - self.ang_min if len(self.serie) else 0.0,
+                "jerk": float(np.sqrt(self.jerk_soma / self.jerk_n)) if self.jerk_n else 0.0,
+                "torque_max": self.torque_max, "forca_kg": self.forca_max / G,
+                "tremor_rms": ultima["rms"] if ultima else 0.0, "tremor_freq": ultima["freq_tremor"] if ultima else 0.0}
+
+    def Finalizar(self) -> dict:
+        # Fecha as bordas e devolve o mesmo dicionário do metricas_sessao.calcular_resultado
+        from metricas_sessao import resultado_tremor
+        if self.resultado is not None: return self.resultado
+        if self.n_bruto < JANELA_FILTRO:
+            # curta demais: o filtro em lote devolve o sinal sem filtrar; refaz pelo caminho em lote
+            self.resultado = self._emLote()
+            return self.resultado
+        self._processarFiltrado(self._filtrar(np.zeros(ATRASO_FILTRO)), final=True)
+        t, ang = self.serie.coluna("t"), self.serie.coluna("ang")
+        torque, forca = self.dinamica.coluna("torque"), self.dinamica.coluna("forca")
+        h, n = self.dt, self.n_din
+        ult_par = n % 2 == 1 # índice n-1 é par?
+        soma = (self.p0 + self.p_ult + 4 * (self.soma_impar - (0 if ult_par else self.p_ult))
+                + 2 * (self.soma_par - self.p0 - (self.p_ult if ult_par else 0)))
+        energia = (h / 3) * soma
+        xf, yf = analise_fft(ang, self.fs)
+        self.resultado = {
+            "t": t, "ang": ang, "torque": torque, "forca": forca, "energia": float(energia), "m_seg": float(self.m_seg),
+            "amplitude": self.ang_max - self.ang_min,
+            "jerk": float(np.sqrt(self.jerk_soma / self.jerk_n)) if self.jerk_n else 0.0,
+            "forca_kg": self.forca_max / G, "torque_max": self.torque_max,
+            "freq_pico": float(xf[np.argmax(yf[1:]) + 1]) if xf is not None and len(xf) > 1 else 0.0,
+            "xf": xf, "yf": yf,
+        }
+        self.resultado.update(resultado_tremor(self.espectro.Resultado()))
+        return self.resultado
+
+    def _emLote(self) -> dict:
+        import pandas as pd
+        from metricas_sessao import calcular_resultado
+        ex, peso, altura, genero = self.parametros
+        t = np.concatenate([l[0] for l in self.inicio_bruto]) if self.inicio_bruto else np.zeros(0)
+        x = np.concatenate([l[1] for l in self.inicio_bruto]) if self.inicio_bruto else np.zeros(0)
+        df = pd.DataFrame({"val": x, "t": t, "Angulo_Joelho": x, "r1": x})
+        return calcular_resultado(df, ex, peso, altura, genero)
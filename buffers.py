@@ -0,0 +1,143 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# Estruturas de memória compartilhadas entre quem recebe as amostras (socket, serial)
+# e quem consome (dashboard Streamlit, gravação em disco)
+
+# Layout de uma amostra completa: tempo do ESP32 + pitch/roll/yaw dos 3 sensores
+COLUNAS_AMOSTRA = ["t_ms", "p1", "r1", "y1", "p2", "r2", "y2", "p3", "r3", "y3"]
+
+
+class AnelAmostras (object):
+    """
+    Buffer circular de tamanho fixo, pré-alocado, com um escritor e vários leitores.
+    Cada leitor guarda o seu próprio cursor (contador absoluto de amostras), então
+    ninguém consome a amostra de ninguém. Se um leitor ficar mais de `capacidade`
+    amostras para trás, as mais antigas são sobrescritas e contadas como perdidas.
+    """
+    def __init__(self, capacidade: int = 65536, colunas: list = COLUNAS_AMOSTRA):
+        self.capacidade = capacidade
+        self.colunas = list(colunas)
+        self.dados = np.zeros((capacidade, len(self.colunas)), dtype=np.float64)
+        self.escritos = 0 # total de amostras já publicadas desde a criação
+        self.cond = threading.Condition()
+
+    def getCapacidade(self) -> int:
+        return self.capacidade
+    def getColunas(self) -> list:
+        return self.colunas
+    def getEscritos(self) -> int:
+        return self.escritos
+
+    def publicar(self, amostra):
+        self.publicarLote(np.asarray(amostra, dtype=np.float64).reshape(1, -1))
+
+    def publicarLote(self, lote: np.ndarray):
+        n = len(lote)
+        if n == 0: return
+        if n > self.capacidade: # só as últimas cabem no anel
+            lote = lote[-self.capacidade:]
+        with self.cond:
+            inicio = (self.escritos + n - len(lote)) % self.capacidade
+            fim = inicio + len(lote)
+            if fim <= self.capacidade:
+                self.dados[inicio:fim] = lote
+            else:
+                corte = self.capacidade - inicio
+                self.dados[inicio:] = lote[:corte]
+                self.dados[:fim - self.capacidade] = lote[corte:]
+            self.escritos += n
+            self.cond.notify_all()
+
+    def lerDesde(self, cursor: int):
+        """
+        Devolve (lote, novo_cursor) com todas as amostras publicadas desde `cursor`.
+        O lote é uma cópia, o escritor pode continuar sobrescrevendo o anel.
+        Amostras perdidas por estouro = (novo_cursor - cursor) - len(lote).
+        """
+        with self.cond:
+            fim = self.escritos
+            cursor = max(cursor, fim - self.capacidade)
+            n = fim - cursor
+            if n <= 0:
+                return np.empty((0, len(self.colunas))), fim
+            inicio = cursor % self.capacidade
+            if inicio + n <= self.capacidade:
+                lote = self.dados[inicio:inicio + n].copy()
+            else:
+                lote = np.concatenate((self.dados[inicio:], self.dados[:inicio + n - self.capacidade]))
+            return lote, fim
+
+    def esperar(self, cursor: int, timeout: float = None, interromper=None) -> bool:
+        # Bloqueia até existir amostra nova além de `cursor`, ou até `interromper()`
+        # ficar verdadeiro (quem muda o estado deve chamar notificar())
+        with self.cond:
+            return self.cond.wait_for(lambda: self.escritos > cursor or (interromper is not None and interromper()), timeout)
+
+    def notificar(self):
+        with self.cond:
+            self.cond.notify_all()
+
+
+# Colunas que a sessão ao vivo do stream.py guarda por amostra
+COLUNAS_SESSAO = ["t", "val", "p1", "p2", "p3", "r1"]
+
+
+class BufferColunar (object):
+    """
+    Acumulador de sessão em colunas: um np.ndarray pré-alocado por canal que dobra de
+    capacidade quando enche. O append custa O(1) amortizado (o pd.concat por amostra
+    copiava a sessão inteira a cada linha). paraDataFrame() não copia os dados.
+    """
+    def __init__(self, colunas: list = COLUNAS_SESSAO, capacidade: int = 4096, dtype=np.float64):
+        self.colunas = list(colunas)
+        self.capacidade = max(1, capacidade)
+        self.tamanho = 0
+        self.dados = {c: np.empty(self.capacidade, dtype=dtype) for c in self.colunas}
+
+    def __len__(self) -> int:
+        return self.tamanho
+
+    def getColunas(self) -> list:
+        return self.colunas
+    def getCapacidade(self) -> int:
+        return self.capacidade
+
+    def _reservar(self, n: int):
+        if self.tamanho + n <= self.capacidade: return
+        nova = self.capacidade
+        while nova < self.tamanho + n: nova *= 2
+        for c in self.colunas:
+            arr = np.empty(nova, dtype=self.dados[c].dtype)
+            arr[:self.tamanho] = self.dados[c][:self.tamanho]
+            self.dados[c] = arr
+        self.capacidade = nova
+
+    def append(self, linha: dict):
+        self._reservar(1)
+        for c in self.colunas:
+            self.dados[c][self.tamanho] = linha[c]
+        self.tamanho += 1
+
+    def appendLote(self, lote):
+        # lote: dict/DataFrame com um vetor por coluna, todos do mesmo tamanho
+        n = len(lote[self.colunas[0]])
+        if n == 0: return
+        self._reservar(n)
+        for c in self.colunas:
+            self.dados[c][self.tamanho:self.tamanho + n] = lote[c]
+        self.tamanho += n
+
+    def limpar(self):
+        self.tamanho = 0
+
+    def coluna(self, nome: str) -> np.ndarray:
+        # Visão (sem cópia) só da parte preenchida
+        return self.dados[nome][:self.tamanho]
+
+    def paraDataFrame(self) -> pd.DataFrame:
+        # As colunas do DataFrame apontam para a mesma memória do buffer. Um append
+        # posterior que precise crescer realoca o buffer, e o DataFrame continua válido
+        # (fica com os arrays antigos).
+        return pd.DataFrame({c: self.coluna(c) for c in self.colunas}, copy=False)
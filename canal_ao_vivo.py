@@ -0,0 +1,281 @@
+import argparse
+import http.server
+import json
+import socket
+import socketserver
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+from buffers import AnelAmostras, COLUNAS_AMOSTRA
+from diagnostico import DiagnosticoColeta, PERIODO_ESP32_MS
+from reordenacao import BufferReordenacao, ATRASO_MS
+
+# Canal de ingestão ao vivo: um socket local que recebe linhas JSON (o mesmo formato
+# que o ESP32 manda pelo TCP) e empurra TODAS as amostras para um AnelAmostras.
+# Substitui o antigo live_data.json / status.json, que era relido a cada 50 ms e só
+# guardava a última amostra.
+#
+# Protocolo (uma mensagem JSON por linha):
+#   {"sensor1": {...}, "sensor2": {...}, "sensor3": {...}, "t": 1234}  -> amostra
+#   {"collecting": true} / {"collecting": false}                      -> status da coleta
+#
+# Cada coleta tem o seu DiagnosticoColeta (recebidas, rejeitadas, buracos no t_ms e
+# latência de chegada). O período esperado é o do firmware, então amostras que o App
+# ou o relay deixam de repassar aparecem como perdidas. Os POSTs do App podem chegar
+# fora de ordem, então as amostras passam por um BufferReordenacao (~40 ms) antes do anel.
+#
+# O App posta em http://<pc>:5000/data (JSON do ESP32) e /status ({"collecting": ..}).
+# O RelayHTTP (python canal_ao_vivo.py) escuta nessa porta e repassa as duas rotas para
+# o canal com o ClienteCanal; as outras (ex.: /save_session) vão para --encaminhar, onde
+# o servidor que grava as sessões passa a escutar. Quem preferir manter o próprio
+# servidor na 5000 troca nele a escrita do live_data.json/status.json por
+# ClienteCanal.EnviarAmostra(d) / EnviarStatus(coletando).
+#   python canal_ao_vivo.py --encaminhar http://127.0.0.1:5002
+
+HOST = "127.0.0.1"
+PORTA = 5001
+PORTA_HTTP = 5000 # a do App (main.dart)
+ROTAS_CANAL = ("/data", "/status")
+
+def amostra_de_json(d: dict) -> list:
+    # Converte o dicionário do ESP32 na linha do anel (ordem de COLUNAS_AMOSTRA)
+    linha = [float(d['t'])]
+    for i in range(1, 4):
+        s = d.get(f'sensor{i}', {})
+        linha += [float(s.get('pitch', 0.0)), float(s.get('roll', 0.0)), float(s.get('yaw', 0.0))]
+    return linha
+
+
+class _ManipuladorCanal (socketserver.StreamRequestHandler):
+    def handle(self):
+        canal = self.server.canal
+        for raw in self.rfile:
+            # uma linha ruim (JSON inválido, t não numérico, sensor que não é objeto) é
+            # rejeitada sem derrubar a conexão nem as amostras seguintes
+            try:
+                d = json.loads(raw)
+                if 'collecting' in d:
+                    canal.setColetando(bool(d['collecting']))
+                elif 'sensor1' in d and d.get('t') is not None:
+                    amostra = amostra_de_json(d)
+                    canal.diagnostico.Registrar([amostra[0]])
+                    canal.Publicar(amostra)
+                else:
+                    canal.diagnostico.RegistrarRejeitadas()
+            except (ValueError, TypeError, AttributeError, KeyError):
+                canal.diagnostico.RegistrarRejeitadas()
+
+
+class _ServidorCanal (socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class CanalAoVivo (object):
+    def __init__(self, host: str = HOST, porta: int = PORTA, capacidade: int = 65536):
+        self.host = host
+        self.porta = porta
+        self.anel = AnelAmostras(capacidade, COLUNAS_AMOSTRA)
+        self.coletando = False
+        self.sessao = 0 # incrementa a cada início de coleta
+        self.inicio_sessao = 0 # posição do anel em que a coleta atual começou
+        self.diagnostico = DiagnosticoColeta(PERIODO_ESP32_MS, origem=f"canal {host}:{porta}")
+        self.reordenacao = BufferReordenacao(coluna_t=0, periodo_ms=PERIODO_ESP32_MS)
+        self.trava = threading.Lock() # produtores concorrentes dividem o buffer de reordenação
+        self.servidor = None
+
+    def getAnel(self) -> AnelAmostras:
+        return self.anel
+    def getColetando(self) -> bool:
+        return self.coletando
+    def getSessao(self) -> int:
+        return self.sessao
+    def getInicioSessao(self) -> int:
+        return self.inicio_sessao
+    def getDiagnostico(self) -> DiagnosticoColeta:
+        return self.diagnostico
+    def getReordenacao(self) -> BufferReordenacao:
+        return self.reordenacao
+
+    def Publicar(self, amostra: list):
+        # Passa pelo buffer de reordenação; o anel só recebe t_ms crescente
+        with self.trava:
+            lote, _ = self.reordenacao.Processar([amostra])
+            if len(lote): self.anel.publicarLote(lote)
+
+    def Vencer(self):
+        # Solta as amostras cujo prazo no buffer venceu sem chegar outra depois (App pausado)
+        with self.trava:
+            if self.reordenacao.getPendentes() == 0: return
+            lote, _ = self.reordenacao.Processar(np.zeros((0, len(COLUNAS_AMOSTRA))))
+            if len(lote): self.anel.publicarLote(lote)
+
+    def setColetando(self, coletando: bool):
+        if not coletando:
+            with self.trava: # fim da coleta: o que o buffer segurava entra antes do aviso
+                lote, _ = self.reordenacao.Esvaziar()
+                if len(lote): self.anel.publicarLote(lote)
+        with self.anel.cond:
+            if coletando and not self.coletando:
+                self.sessao += 1
+                self.inicio_sessao = self.anel.escritos
+                self.diagnostico = DiagnosticoColeta(PERIODO_ESP32_MS, origem=f"canal {self.host}:{self.porta}")
+                self.reordenacao = BufferReordenacao(coluna_t=0, periodo_ms=PERIODO_ESP32_MS)
+            self.coletando = coletando
+            self.anel.cond.notify_all()
+
+    def Iniciar(self):
+        if self.servidor is not None: return
+        self.servidor = _ServidorCanal((self.host, self.porta), _ManipuladorCanal)
+        self.servidor.canal = self
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def Parar(self):
+        if self.servidor is None: return
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        self.servidor = None
+
+    def Esperar(self, cursor: int, timeout: float = 0.5) -> bool:
+        # Dorme até chegar amostra nova ou a coleta ser encerrada. Com amostras presas no
+        # buffer de reordenação a espera é curta e, sem nada novo, elas saem por prazo
+        if self.reordenacao.getPendentes():
+            timeout = min(timeout, 2 * ATRASO_MS / 1000)
+        if self.anel.esperar(cursor, timeout, interromper=lambda: not self.coletando): return True
+        self.Vencer()
+        return self.anel.escritos > cursor
+
+    def LerLote(self, cursor: int):
+        return self.anel.lerDesde(cursor)
+
+
+class ClienteCanal (object):
+    # Lado produtor: usado por quem recebe os dados do App/ESP32 (ex.: o RelayHTTP)
+    def __init__(self, host: str = HOST, porta: int = PORTA):
+        self.host = host
+        self.porta = porta
+        self.sock = None
+
+    def Conectar(self, time_out: float = 1.0):
+        self.sock = socket.create_connection((self.host, self.porta), timeout=time_out)
+
+    def _enviar(self, msgs: list):
+        if self.sock is None: self.Conectar()
+        dados = "".join(json.dumps(m) + "\n" for m in msgs).encode()
+        try:
+            self.sock.sendall(dados)
+        except OSError:
+            self.Conectar() # uma tentativa de reconexão
+            self.sock.sendall(dados)
+
+    def EnviarAmostras(self, amostras: list):
+        self._enviar(amostras)
+    def EnviarAmostra(self, amostra: dict):
+        self._enviar([amostra])
+    def EnviarStatus(self, coletando: bool):
+        self._enviar([{"collecting": coletando}])
+
+    def Fechar(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class _ManipuladorRelay (http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        relay = self.server.relay
+        if self.path in ROTAS_CANAL:
+            try:
+                relay.Repassar(self.path, json.loads(corpo))
+                self._responder(200, b'{"ok": true}')
+            except ValueError:
+                self._responder(400, b'{"ok": false}')
+            except OSError: # monitor (stream.py) fora do ar
+                self._responder(503, b'{"ok": false}')
+        elif relay.getEncaminhar():
+            self._responder(*relay.Encaminhar(self.path, corpo, self.headers.get('Content-Type', 'application/json')))
+        else:
+            self._responder(404, b'{"ok": false}')
+
+    def _responder(self, codigo: int, corpo: bytes):
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args): # um POST por amostra: sem log por requisição
+        pass
+
+
+class RelayHTTP (object):
+    """
+    Ponte entre o App e o canal: recebe os POSTs /data e /status na porta do App e
+    repassa para o CanalAoVivo (ClienteCanal, uma conexão compartilhada). Outras rotas
+    são encaminhadas como vieram para `encaminhar` (URL base), se houver.
+    """
+    def __init__(self, porta_http: int = PORTA_HTTP, host_canal: str = HOST, porta_canal: int = PORTA, encaminhar: str = None):
+        self.porta_http = porta_http
+        self.cliente = ClienteCanal(host_canal, porta_canal)
+        self.encaminhar = encaminhar.rstrip("/") if encaminhar else None
+        self.trava = threading.Lock() # o ClienteCanal não é thread-safe
+        self.repassadas = 0
+        self.servidor = None
+
+    def getEncaminhar(self) -> str:
+        return self.encaminhar
+    def getRepassadas(self) -> int:
+        return self.repassadas
+
+    def Repassar(self, rota: str, d: dict):
+        if not isinstance(d, dict): raise ValueError("corpo não é um objeto JSON") # vira 400
+        with self.trava:
+            try:
+                if rota == "/status": self.cliente.EnviarStatus(bool(d.get('collecting')))
+                else: self.cliente.EnviarAmostra(d)
+            except OSError:
+                self.cliente.Fechar() # a próxima mensagem tenta conectar de novo
+                raise
+            self.repassadas += 1
+
+    def Encaminhar(self, rota: str, corpo: bytes, tipo: str) -> tuple:
+        req = urllib.request.Request(self.encaminhar + rota, data=corpo, headers={'Content-Type': tipo}, method="POST")
+        try:
+            with urllib.request.urlopen(req, timeout=30) as r: return r.status, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except OSError:
+            return 502, b'{"ok": false}'
+
+    def Executar(self, host: str = "0.0.0.0"):
+        self.servidor = http.server.ThreadingHTTPServer((host, self.porta_http), _ManipuladorRelay)
+        self.servidor.daemon_threads = True
+        self.servidor.relay = self
+        self.servidor.serve_forever()
+
+    def Parar(self):
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+        self.cliente.Fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay HTTP do App para o canal ao vivo do stream.py")
+    parser.add_argument("--porta", type=int, default=PORTA_HTTP, help="porta HTTP onde o App posta")
+    parser.add_argument("--canal-host", default=HOST)
+    parser.add_argument("--canal-porta", type=int, default=PORTA)
+    parser.add_argument("--encaminhar", help="URL base para as outras rotas (ex.: http://127.0.0.1:5002)")
+    args = parser.parse_args()
+    relay = RelayHTTP(args.porta, args.canal_host, args.canal_porta, args.encaminhar)
+    print(f"Relay em :{args.porta} -> canal {args.canal_host}:{args.canal_porta}" + (f", demais rotas -> {args.encaminhar}" if args.encaminhar else ""))
+    try:
+        relay.Executar()
+    except KeyboardInterrupt:
+        print(f"\nFinalizando... {relay.getRepassadas()} mensagens repassadas")
+    relay.Parar()
+
+if __name__ == "__main__":
+    main()
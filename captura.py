@@ -0,0 +1,234 @@
+import queue
+import threading
+import numpy as np
+import pandas as pd
+import serial
+from buffers import BufferColunar
+from diagnostico import DiagnosticoColeta, caminho_diagnostico
+from escritor import EscritorLote
+from formato_binario import EscritorBinario, caminho_binario
+from leitor_serial import LeitorSerialLote
+from reordenacao import BufferReordenacao
+from Receptor_POO import Receptor, SalvarArquivo
+
+# Captura concorrente (produtor/consumidor) em volta do Receptor e do SalvarArquivo.
+# Uma thread lê a serial em lote e distribui cada bloco por duas filas limitadas:
+#   disco   -> EscritorLote (+ .tidx e .hfb); a fila cheia segura a leitura (nada se perde).
+#              Um erro de gravação para a captura: a leitura sai, a fila é esvaziada e o
+#              Parar() levanta o erro
+#   análise -> AnaliseAoVivo (tempo_s, séries por membro, estatísticas acumuladas);
+#              é opcional, então com a fila cheia o bloco é pulado e contado
+# O laço principal fica livre: mostra o andamento, espera o Enter e, enquanto a
+# próxima sessão grava, os gráficos da anterior saem no ExportadorGraficos.
+
+TAM_FILA = 256 # blocos (~1 leitura da serial cada)
+MEMBROS = ["Coxa", "Canela", "Pe"] # mesma ordem do Analise_POO
+FIM = None # sentinela das filas
+
+
+class AnaliseAoVivo (object):
+    """
+    Estágio de análise: recebe as matrizes do receptor (p/r/y por sensor + t_ms) e
+    mantém o tempo em segundos, as séries de cada membro e média/desvio/mín/máx de
+    cada eixo (Welford por bloco), sem reler o CSV no fim.
+    """
+    def __init__(self, colunas: list):
+        self.colunas = list(colunas) # cabeçalho do CSV, t_ms por último
+        self.angulos = self.colunas[:-1]
+        self.qtd_sensores = len(self.angulos) // 3
+        self.buffer = BufferColunar(self.angulos + ["tempo_s"])
+        self.trava = threading.Lock()
+        self.t0 = None
+        self.n = 0
+        self.media = np.zeros(len(self.angulos))
+        self.m2 = np.zeros(len(self.angulos))
+        self.minimo = np.full(len(self.angulos), np.inf)
+        self.maximo = np.full(len(self.angulos), -np.inf)
+
+    def getAmostras(self) -> int:
+        return self.n
+    def getDuracao(self) -> float:
+        with self.trava:
+            return float(self.buffer.coluna("tempo_s")[-1]) if self.n else 0.0
+
+    def Alimentar(self, matriz: np.ndarray):
+        if len(matriz) == 0: return
+        ang = matriz[:, :-1]
+        if self.t0 is None: self.t0 = matriz[0, -1]
+        n_b = len(matriz)
+        media_b = ang.mean(axis=0)
+        m2_b = ((ang - media_b) ** 2).sum(axis=0)
+        with self.trava:
+            lote = {c: ang[:, j] for j, c in enumerate(self.angulos)}
+            lote["tempo_s"] = (matriz[:, -1] - self.t0) / 1000.0
+            self.buffer.appendLote(lote)
+            total = self.n + n_b
+            delta = media_b - self.media
+            self.media += delta * n_b / total
+            self.m2 += m2_b + delta ** 2 * self.n * n_b / total
+            self.n = total
+            self.minimo = np.minimum(self.minimo, ang.min(axis=0))
+            self.maximo = np.maximum(self.maximo, ang.max(axis=0))
+
+    def Serie(self, i: int) -> pd.DataFrame:
+        # tempo_s + p/r/y do membro i (cópia: a thread de análise continua escrevendo)
+        with self.trava:
+            cols = ["tempo_s"] + self.angulos[i*3:3 + i*3]
+            return pd.DataFrame({c: self.buffer.coluna(c).copy() for c in cols})
+
+    def Estatisticas(self) -> dict:
+        # {membro: {eixo: {media, desvio, min, max, amplitude}}}
+        with self.trava:
+            desvio = np.sqrt(self.m2 / self.n) if self.n else np.full(len(self.angulos), np.nan)
+            est = {}
+            for i in range(self.qtd_sensores):
+                est[MEMBROS[i]] = {c: {"media": float(self.media[j]), "desvio": float(desvio[j]), "min": float(self.minimo[j]),
+                                       "max": float(self.maximo[j]), "amplitude": float(self.maximo[j] - self.minimo[j])}
+                                   for j, c in enumerate(self.angulos) if i*3 <= j < 3 + i*3}
+            return est
+
+    def Linha(self) -> str:
+        # Amplitude do pitch de cada membro, para o terminal
+        est = self.Estatisticas()
+        amp = "  ".join(f"{m} {e[f'p{i+1}']['amplitude']:5.1f}°" for i, (m, e) in enumerate(est.items()) if self.n)
+        return f"{self.getDuracao():6.1f} s  {self.n} amostras  {amp}"
+
+
+class CapturaConcorrente (object):
+    """
+    Grava uma sessão em segundo plano: Iniciar() abre os arquivos e sobe as threads de
+    leitura, disco e análise; Parar() encerra a leitura, esvazia as filas e fecha tudo.
+    Usa a configuração do SalvarArquivo (nome, cabeçalho, qtd_sensores, .hfb,
+    reordenação) e sempre lê em lote.
+    """
+    def __init__(self, receptor: Receptor, arquivo: SalvarArquivo, tam_fila: int = TAM_FILA, analise: bool = True):
+        self.receptor = receptor
+        self.arquivo = arquivo
+        self.tam_fila = tam_fila
+        self.analise = AnaliseAoVivo(arquivo.getHeader().strip().split(",")) if analise else None
+        self.fila_disco = queue.Queue(tam_fila)
+        self.fila_analise = queue.Queue(tam_fila)
+        self.parar = threading.Event()
+        self.threads = []
+        self.leitor = None
+        self.escritor = None
+        self.binario = None
+        self.diagnostico = None
+        self.reordenacao = None
+        self.puladas_analise = 0 # blocos que a análise não acompanhou
+        self.erro = None # SerialException que encerrou a leitura ou OSError da gravação
+
+    def getAnalise(self) -> AnaliseAoVivo:
+        return self.analise
+    def getDiagnostico(self) -> DiagnosticoColeta:
+        return self.diagnostico
+    def getErro(self):
+        return self.erro
+    def getPuladasAnalise(self) -> int:
+        return self.puladas_analise
+    def getAtiva(self) -> bool:
+        return bool(self.threads) and self.threads[0].is_alive()
+
+    def Iniciar(self):
+        arq = self.arquivo
+        self.diagnostico = arq.diagnostico = DiagnosticoColeta(origem=self.receptor.getPORT())
+        self.escritor = EscritorLote(arq.getNomeArquivo(), arq.getHeader(), diagnostico=self.diagnostico, indice=True).Abrir()
+        if arq.getBinario():
+            self.binario = EscritorBinario(caminho_binario(arq.getNomeArquivo()), arq.getHeader().strip().split(","), arq.getQtdSensores()).Abrir()
+        self.reordenacao = BufferReordenacao(coluna_t=-1) if arq.getReordenar() else None
+        self.leitor = LeitorSerialLote(self.receptor.getSerial(), arq.getQtdSensores())
+        alvos = [("leitura", self._ler), ("disco", self._gravar)]
+        if self.analise is not None: alvos.append(("analise", self._analisar))
+        self.threads = [threading.Thread(target=f, name=f"captura-{nome}", daemon=True) for nome, f in alvos]
+        for t in self.threads: t.start()
+        return self
+
+    def _distribuir(self, matriz, linhas):
+        if len(matriz) == 0: return
+        self.fila_disco.put((matriz, linhas)) # bloqueia se o disco ficou para trás
+        if self.analise is not None:
+            try:
+                self.fila_analise.put_nowait(matriz)
+            except queue.Full:
+                self.puladas_analise += 1
+
+    def _ler(self):
+        diag, reord = self.diagnostico, self.reordenacao
+        try:
+            while not self.parar.is_set():
+                r0 = self.leitor.getRejeitadas()
+                texto, matriz = self.leitor.Ler()
+                if self.leitor.getRejeitadas() > r0: diag.RegistrarRejeitadas(self.leitor.getRejeitadas() - r0)
+                if len(matriz): diag.Registrar(matriz[:, -1])
+                if reord is not None: self._distribuir(*reord.Processar(matriz, texto.splitlines()))
+                else: self._distribuir(matriz, texto.splitlines())
+        except serial.SerialException as e:
+            self.erro = e
+            print(f"Erro de leitura serial: {e}. Desconectado.")
+        finally:
+            if reord is not None: self._distribuir(*reord.Esvaziar())
+            self.fila_disco.put(FIM)
+            if self.analise is not None: self.fila_analise.put(FIM)
+
+    def _gravar(self):
+        falhou = False
+        while (item := self.fila_disco.get()) is not FIM:
+            if falhou: continue # só esvazia: a leitura não pode travar no put
+            matriz, linhas = item
+            try:
+                self.escritor.EscreverBloco("".join(l + "\n" for l in linhas), len(matriz), matriz[:, -1])
+                if self.binario is not None: self.binario.EscreverLote(matriz)
+            except OSError as e:
+                falhou, self.erro = True, e
+                self.parar.set()
+                print(f"Erro de gravação: {e}. Captura interrompida.")
+
+    def _analisar(self):
+        while (matriz := self.fila_analise.get()) is not FIM:
+            self.analise.Alimentar(matriz)
+
+    def Parar(self) -> dict:
+        # Espera a leitura sair (no máximo um timeout da serial) e as filas esvaziarem
+        # e fecha tudo; um erro de gravação é levantado no fim
+        self.parar.set()
+        for t in self.threads: t.join()
+        for escritor in (self.escritor, self.binario):
+            if escritor is None: continue
+            try:
+                escritor.Fechar()
+            except OSError as e:
+                if self.erro is None: self.erro = e
+        self.receptor.getSerial().close()
+        self.arquivo.rejeitadas += self.leitor.getRejeitadas()
+        self.diagnostico.Exportar(caminho_diagnostico(self.arquivo.getNomeArquivo()))
+        if self.erro is not None and not isinstance(self.erro, serial.SerialException): raise self.erro
+        return self.Resumo()
+
+    def Resumo(self) -> dict:
+        r = {"arquivo": self.arquivo.getNomeArquivo(), "linhas": self.escritor.getLinhas(),
+             "rejeitadas": self.leitor.getRejeitadas(), "puladas_analise": self.puladas_analise,
+             "diagnostico": self.diagnostico.Linha()}
+        if self.reordenacao is not None: r["reordenacao"] = self.reordenacao.Resumo()
+        if self.analise is not None: r["estatisticas"] = self.analise.Estatisticas()
+        return r
+
+    def __enter__(self):
+        return self.Iniciar()
+
+    def __exit__(self, *exc):
+        self.Parar()
+
+
+def capturar_ate_enter(captura: CapturaConcorrente, intervalo: float = 1.0) -> dict:
+    # Mostra o andamento a cada `intervalo` s até o Enter (ou a serial cair)
+    enter = threading.Event()
+    threading.Thread(target=lambda: (input(), enter.set()), daemon=True).start()
+    print("Gravando... Pressione Enter para parar")
+    while not enter.wait(intervalo) and captura.getAtiva():
+        analise = captura.getAnalise()
+        if analise is not None: print(f"\r{analise.Linha()}", end="", flush=True)
+    print()
+    if not enter.is_set(): # a serial caiu (ou o disco): o input() pendente ainda é dono do teclado
+        print(f"Captura interrompida ({captura.getErro()}). Pressione Enter para continuar")
+        enter.wait()
+    return captura.Parar()
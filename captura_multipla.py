@@ -0,0 +1,293 @@
+import argparse
+import glob
+import os
+import re
+import threading
+import time
+from datetime import datetime
+import serial
+import serial.tools.list_ports
+from diagnostico import DiagnosticoColeta, caminho_diagnostico
+from escritor import PoolEscritores
+from leitor_serial import LeitorSerialLote
+from reordenacao import BufferReordenacao
+from Receptor_POO import Receptor, SalvarArquivo
+
+# Captura de vários ESP32 (uma estação de paciente por porta) num processo só.
+# Cada porta tem uma thread de leitura em lote; a gravação vai para um PoolEscritores
+# compartilhado (poucas threads para todos os CSVs). O nº de sensores de cada porta
+# pode ser dado (PORTA:SENSORES) ou detectado pelas primeiras linhas válidas, e o
+# cabeçalho do CSV sai do SalvarArquivo. Uma porta que cai (SerialException, cabo
+# solto, ESP32 reiniciando) volta a ser aberta com espera crescente e continua no
+# mesmo arquivo; portas novas que casam com os padrões (--procurar, --usb) entram
+# sozinhas (hot-plug). Um erro de gravação (disco cheio) não é queda de porta: a
+# porta para com o estado "erro de gravação" e o Parar() levanta o erro.
+#   python captura_multipla.py /dev/ttyUSB0 /dev/ttyUSB1:2 --procurar "/dev/ttyACM*" --pasta Dados
+
+BAUD = 921600
+TIMEOUT_LEITURA = 0.2 # s; limita quanto o Parar() espera cada porta
+ESPERA_MIN, ESPERA_MAX = 0.5, 5.0 # reconexão: espera dobra a cada falha
+LINHAS_DETECCAO = 5 # linhas seguidas com o mesmo nº de campos para decidir os sensores
+MAX_DETECCAO = 64 * 1024 # bytes guardados enquanto detecta
+INTERVALO_PROCURA = 1.0
+
+def detectar_sensores(bruto: bytes):
+    # (qtd_sensores, offset da primeira linha da sequência) ou (None, None)
+    inicio, seguidas, campos_ant, pos = None, 0, None, 0
+    for linha in bruto.split(b"\n")[:-1]:
+        campos = linha.strip().split(b",")
+        try:
+            valida = len(campos) in (4, 7, 10) and len([float(c) for c in campos]) > 0
+        except ValueError:
+            valida = False
+        if valida and len(campos) == campos_ant:
+            seguidas += 1
+        elif valida:
+            inicio, seguidas, campos_ant = pos, 1, len(campos)
+        else:
+            seguidas, campos_ant = 0, None
+        if seguidas >= LINHAS_DETECCAO: return (campos_ant - 1) // 3, inicio
+        pos += len(linha) + 1
+    return None, None
+
+
+class PortaCaptura (object):
+    """
+    Uma porta do gerenciador: abre, detecta os sensores, lê em lote, reordena e manda
+    para o pool; em erro de serial fecha e tenta de novo até o Parar().
+    """
+    def __init__(self, porta: str, pool: PoolEscritores, pasta: str = ".", baud: int = BAUD, qtd_sensores: int = None):
+        self.receptor = Receptor(porta, baud)
+        self.pool = pool
+        self.pasta = pasta
+        self.qtd_sensores = qtd_sensores # None: detectado
+        self.arquivo = None # SalvarArquivo, criado quando os sensores são conhecidos
+        self.ident = None # arquivo no pool
+        self.diagnostico = DiagnosticoColeta(origem=porta)
+        self.reordenacao = BufferReordenacao(coluna_t=-1)
+        self.leitor = None
+        self.estado = "conectando"
+        self.reconexoes = 0
+        self.erro = None # última falha da serial (ou da gravação)
+        self.erro_gravacao = None # OSError do pool: para a porta
+        self.parar = threading.Event()
+        self.thread = None
+
+    def getPorta(self) -> str:
+        return self.receptor.getPORT()
+    def getEstado(self) -> str:
+        return self.estado
+    def getArquivo(self) -> SalvarArquivo:
+        return self.arquivo
+    def getReconexoes(self) -> int:
+        return self.reconexoes
+    def getDiagnostico(self) -> DiagnosticoColeta:
+        return self.diagnostico
+    def getErroGravacao(self):
+        return self.erro_gravacao
+    def getLinhas(self) -> int:
+        return 0 if self.ident is None else self.pool.getLinhas(self.ident)
+
+    def Iniciar(self):
+        self.thread = threading.Thread(target=self._executar, name=f"porta-{self.getPorta()}", daemon=True)
+        self.thread.start()
+        return self
+
+    def _executar(self):
+        espera = ESPERA_MIN
+        while not self.parar.is_set():
+            try:
+                self.receptor.Abrir(TIMEOUT_LEITURA)
+            except (serial.SerialException, OSError) as e:
+                self.estado, self.erro = "desconectada", str(e)
+                self.parar.wait(espera)
+                espera = min(espera * 2, ESPERA_MAX)
+                continue
+            if self.estado == "desconectada" and self.ident is not None:
+                # o ESP32 pode ter reiniciado (millis() zerado): a ordem por t_ms recomeça
+                self.reconexoes += 1
+                self._gravar(*self.reordenacao.NovaSequencia())
+            espera = ESPERA_MIN
+            try:
+                self._ler()
+            except serial.SerialException as e:
+                self.estado, self.erro = "desconectada", str(e)
+                self.receptor.getSerial().close()
+                print(f"{self.getPorta()}: {e}. Tentando reconectar...")
+        self.receptor.getSerial().close()
+
+    def _ler(self):
+        ser = self.receptor.getSerial()
+        bruto = b""
+        if self.qtd_sensores is None or self.leitor is None: self.estado = "detectando"
+        while self.qtd_sensores is None and not self.parar.is_set():
+            bruto = (bruto + self._serial(lambda: ser.read(max(ser.in_waiting, 1))))[-MAX_DETECCAO:]
+            qtd, inicio = detectar_sensores(bruto)
+            if qtd is not None: self.qtd_sensores = qtd # o leitor em lote descarta o que não for linha válida
+        if self.parar.is_set(): return
+        if self.ident is None: self._abrirArquivo()
+        if self.leitor is None: self.leitor = LeitorSerialLote(ser, self.qtd_sensores)
+        self.leitor.serial = ser # nova conexão, mesmo leitor (contadores da sessão)
+        self.leitor.resto = b"" # meia linha da conexão anterior não fecha com a nova
+        self.estado = "gravando"
+        self._publicar(*self.leitor.Processar(bruto))
+        while not self.parar.is_set():
+            self._publicar(*self._serial(self.leitor.Ler))
+
+    def _serial(self, leitura):
+        # Falha da porta vira SerialException (o in_waiting com o cabo solto levanta
+        # OSError cru); erros de disco ficam no _gravar e não passam por aqui
+        try:
+            return leitura()
+        except serial.SerialException:
+            raise
+        except OSError as e:
+            raise serial.SerialException(str(e)) from e
+
+    def _abrirArquivo(self):
+        self.arquivo = SalvarArquivo(self.qtd_sensores)
+        self.arquivo.setHeader()
+        nome = re.sub(r"[^A-Za-z0-9]+", "_", self.getPorta()).strip("_")
+        self.arquivo.setNomeArquivo(os.path.join(self.pasta, f"HOMEFISIO_DADOS_{self.qtd_sensores}_SENSORES_{nome}_"
+                                                              f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"))
+        self.arquivo.diagnostico = self.diagnostico
+        self.ident = self.pool.Abrir(self.arquivo.getNomeArquivo(), self.arquivo.getHeader(), self.diagnostico, indice=True)
+
+    def _publicar(self, texto: str, matriz):
+        r0 = self.diagnostico.getRejeitadas()
+        if self.leitor.getRejeitadas() > r0: self.diagnostico.RegistrarRejeitadas(self.leitor.getRejeitadas() - r0)
+        if len(matriz): self.diagnostico.Registrar(matriz[:, -1])
+        self._gravar(*self.reordenacao.Processar(matriz, texto.splitlines()))
+
+    def _gravar(self, matriz, linhas):
+        if len(matriz) == 0 or self.erro_gravacao is not None: return
+        try:
+            self.pool.EscreverBloco(self.ident, "".join(l + "\n" for l in linhas), len(matriz), matriz[:, -1])
+        except OSError as e:
+            self.erro_gravacao, self.erro = e, str(e)
+            self.estado = "erro de gravação"
+            self.parar.set()
+            print(f"{self.getPorta()}: erro de gravação ({e}). Porta parada.")
+
+    def Parar(self):
+        # Fecha o arquivo e exporta o diagnóstico; um erro de gravação é levantado no fim
+        self.parar.set()
+        if self.thread is not None: self.thread.join()
+        if self.erro_gravacao is None: self.estado = "parada"
+        if self.ident is None: return
+        self._gravar(*self.reordenacao.Esvaziar())
+        try:
+            self.pool.FecharArquivo(self.ident)
+        except OSError as e:
+            if self.erro_gravacao is None: self.erro_gravacao, self.estado = e, "erro de gravação"
+        if self.leitor is not None: self.arquivo.rejeitadas = self.leitor.getRejeitadas()
+        self.diagnostico.Exportar(caminho_diagnostico(self.arquivo.getNomeArquivo()))
+        if self.erro_gravacao is not None: raise self.erro_gravacao
+
+    def Linha(self) -> str:
+        r = self.diagnostico.Resumo()
+        sensores = "?" if self.qtd_sensores is None else self.qtd_sensores
+        return (f"{self.getPorta():16s} {self.estado:12s} {sensores} sensores  {self.getLinhas():8d} linhas  "
+                f"perdidas {r['perdidas']}  rejeitadas {r['rejeitadas']}  reconexões {self.reconexoes}")
+
+
+class GerenciadorCaptura (object):
+    """
+    Várias PortaCaptura com um PoolEscritores comum. Adicionar(porta) entra com uma porta
+    a qualquer momento; com padrões (glob) ou usb=True uma thread procura portas novas.
+    """
+    def __init__(self, pasta: str = ".", baud: int = BAUD, padroes: list = None, usb: bool = False, threads_escrita: int = 2):
+        self.pasta = pasta
+        self.baud = baud
+        self.padroes = padroes or []
+        self.usb = usb
+        self.pool = PoolEscritores(threads_escrita)
+        self.portas = {}
+        self.trava = threading.Lock()
+        self.parar = threading.Event()
+        self.thread = None
+
+    def getPortas(self) -> dict:
+        return self.portas
+
+    def Adicionar(self, porta: str, qtd_sensores: int = None) -> PortaCaptura:
+        with self.trava:
+            if porta in self.portas: return self.portas[porta]
+            os.makedirs(self.pasta, exist_ok=True)
+            self.portas[porta] = PortaCaptura(porta, self.pool, self.pasta, self.baud, qtd_sensores).Iniciar()
+            print(f"{porta}: captura iniciada")
+            return self.portas[porta]
+
+    def Procurar(self) -> list:
+        # Portas que casam com os padrões (ou USB-serial) e ainda não estão no gerenciador
+        encontradas = [p for padrao in self.padroes for p in sorted(glob.glob(padrao))]
+        if self.usb: encontradas += [p.device for p in serial.tools.list_ports.comports() if p.vid is not None]
+        return [p for p in dict.fromkeys(encontradas) if p not in self.portas]
+
+    def Iniciar(self):
+        if self.padroes or self.usb:
+            self.thread = threading.Thread(target=self._procurar, name="procura-portas", daemon=True)
+            self.thread.start()
+        return self
+
+    def _procurar(self):
+        while True:
+            for p in self.Procurar(): self.Adicionar(p)
+            if self.parar.wait(INTERVALO_PROCURA): return
+
+    def Status(self) -> str:
+        return "\n".join(p.Linha() for p in list(self.portas.values()))
+
+    def Parar(self):
+        # Cada porta fecha mesmo que outra falhe; o primeiro erro é levantado no fim
+        self.parar.set()
+        if self.thread is not None: self.thread.join()
+        erro = None
+        for p in list(self.portas.values()):
+            try:
+                p.Parar()
+            except OSError as e:
+                erro = erro or e
+        self.pool.Encerrar()
+        if erro is not None: raise erro
+
+    def __enter__(self):
+        return self.Iniciar()
+
+    def __exit__(self, *exc):
+        self.Parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grava vários ESP32 (portas seriais) ao mesmo tempo")
+    parser.add_argument("portas", nargs="*", help="PORTA ou PORTA:SENSORES (ex.: /dev/ttyUSB0:3, COM4)")
+    parser.add_argument("--procurar", action="append", default=[], help="padrão glob de portas novas (ex.: '/dev/ttyUSB*')")
+    parser.add_argument("--usb", action="store_true", help="entra com toda porta USB-serial que aparecer")
+    parser.add_argument("--baud", type=int, default=BAUD)
+    parser.add_argument("--pasta", default="Dados")
+    parser.add_argument("--threads-escrita", type=int, default=2)
+    parser.add_argument("--intervalo", type=float, default=2.0, help="segundos entre as linhas de status")
+    args = parser.parse_args()
+    if not (args.portas or args.procurar or args.usb): parser.error("informe portas, --procurar ou --usb")
+    gerenciador = GerenciadorCaptura(args.pasta, args.baud, args.procurar, args.usb, args.threads_escrita)
+    for p in args.portas:
+        # só o último ':N' é o nº de sensores (COM3 e /dev/ttyUSB0 não têm ':')
+        porta, _, sensores = p.rpartition(":") if re.search(r":[123]$", p) else (p, "", "")
+        gerenciador.Adicionar(porta, int(sensores) if sensores else None)
+    gerenciador.Iniciar()
+    print("Gravando... Ctrl+C para parar")
+    try:
+        while True:
+            time.sleep(args.intervalo)
+            print(gerenciador.Status() + "\n")
+    except KeyboardInterrupt:
+        print("\nFinalizando...")
+    try:
+        gerenciador.Parar()
+    except OSError as e:
+        print(f"Erro de gravação: {e}")
+    for p in gerenciador.getPortas().values():
+        if p.getArquivo() is not None: print(f"{p.getArquivo().getNomeArquivo()}: {p.getDiagnostico().Linha()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+
+# Instrumentação da ingestão: contadores de amostras recebidas, rejeitadas e perdidas
+# (buracos no t_ms), histograma do intervalo entre amostras (jitter) e latência do
+# millis() do dispositivo até a chegada no PC, a gravação em disco e o gráfico.
+# O relógio do ESP32 não tem a mesma origem do PC, então a latência é medida acima do
+# menor atraso visto na sessão (o piso do enlace): é o atraso extra, o que cresce
+# quando uma fila enche. Tudo é acumulado em histogramas de bordas fixas (memória
+# constante) e sai em JSON por sessão (caminho_diagnostico).
+
+EXTENSAO = ".diag.json"
+BORDAS_INTERVALO_MS = np.array([0, 1, 2, 5, 10, 15, 18, 19, 20, 21, 22, 25, 30, 40, 50, 75, 100, 200, 500, 1000, 5000])
+BORDAS_LATENCIA_MS = np.array([0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000])
+ETAPAS = ("chegada", "disco", "grafico")
+TOLERANCIA_BURACO = 1.5 # intervalo > 1.5 período conta como amostra(s) perdida(s)
+MIN_INTERVALOS_PERIODO = 20
+PERIODO_ESP32_MS = 20.0 # SAMPLE_MS do wififinal.ino (50 Hz)
+
+def caminho_diagnostico(caminho_csv: str) -> str:
+    return os.path.splitext(caminho_csv)[0] + EXTENSAO
+
+
+class Histograma (object):
+    # Contagens por faixa [bordas[i], bordas[i+1]) mais uma faixa aberta no fim
+    def __init__(self, bordas):
+        self.bordas = np.asarray(bordas, dtype=np.float64)
+        self.contagens = np.zeros(len(self.bordas), dtype=np.int64)
+        self.n = 0
+        self.maximo = None
+
+    def Adicionar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        if len(valores) == 0: return
+        faixa = np.searchsorted(self.bordas, valores, side='right') - 1
+        self.contagens += np.bincount(np.clip(faixa, 0, len(self.bordas) - 1), minlength=len(self.bordas))
+        self.n += len(valores)
+        m = float(valores.max())
+        self.maximo = m if self.maximo is None else max(self.maximo, m)
+
+    def Percentil(self, q: float):
+        # Borda superior da faixa que contém o percentil (limitada ao máximo visto)
+        if self.n == 0: return None
+        i = int(np.searchsorted(np.cumsum(self.contagens), q / 100 * self.n, side='left'))
+        return float(min(self.bordas[i + 1], self.maximo)) if i + 1 < len(self.bordas) else self.maximo
+
+    def Resumo(self) -> dict:
+        return {"n": self.n, "p50": self.Percentil(50), "p95": self.Percentil(95), "p99": self.Percentil(99),
+                "max": self.maximo, "bordas": self.bordas.tolist(), "contagens": self.contagens.tolist()}
+
+
+class DiagnosticoColeta (object):
+    """
+    Métricas de uma sessão de coleta. Registrar(t_ms) recebe o t_ms (millis do ESP32)
+    de cada lote que chegou; RegistrarEtapa("disco" | "grafico", t_ms) marca quando as
+    mesmas amostras foram gravadas ou desenhadas. Seguro para chamar de threads
+    diferentes (leitura, gravação e interface).
+    """
+    def __init__(self, periodo_ms: float = None, origem: str = ""):
+        self.periodo_ms = periodo_ms # None: estimado pela mediana dos primeiros intervalos
+        self.primeiros = [] # intervalos guardados até estimar o período
+        self.origem = origem
+        self.trava = threading.Lock()
+        self.inicio = time.time()
+        self.recebidas = 0
+        self.rejeitadas = 0
+        self.perdidas = 0 # estimadas pelos buracos no t_ms
+        self.perdidas_seq = 0 # contadas pela sequência dos quadros binários
+        self.duplicadas = 0
+        self.fora_de_ordem = 0
+        self.ultimo_t = None
+        self.piso = None # menor (relógio do PC - millis) visto
+        self.intervalos = Histograma(BORDAS_INTERVALO_MS)
+        self.latencias = {e: Histograma(BORDAS_LATENCIA_MS) for e in ETAPAS}
+
+    def getRecebidas(self) -> int:
+        return self.recebidas
+    def getRejeitadas(self) -> int:
+        return self.rejeitadas
+    def getPerdidas(self) -> int:
+        return self.perdidas + self.perdidas_seq
+    def getPeriodo(self) -> float:
+        return self.periodo_ms
+
+    def RegistrarRejeitadas(self, n: int = 1):
+        with self.trava: self.rejeitadas += n
+    def RegistrarPerdidasSeq(self, n: int):
+        with self.trava: self.perdidas_seq += n
+
+    def Registrar(self, t_ms, agora: float = None):
+        t_ms = np.asarray(t_ms, dtype=np.float64).ravel()
+        if len(t_ms) == 0: return
+        agora_ms = (time.time() if agora is None else agora) * 1000
+        with self.trava:
+            self.recebidas += len(t_ms)
+            t = t_ms if self.ultimo_t is None else np.concatenate(([self.ultimo_t], t_ms))
+            dt = np.diff(t)
+            self.ultimo_t = float(t_ms[-1])
+            self.duplicadas += int(np.count_nonzero(dt == 0))
+            self.fora_de_ordem += int(np.count_nonzero(dt < 0))
+            dt = dt[dt > 0]
+            self.intervalos.Adicionar(dt)
+            if self.periodo_ms is None:
+                self.primeiros.append(dt)
+                dt = np.concatenate(self.primeiros)
+                if len(dt) >= MIN_INTERVALOS_PERIODO: self.periodo_ms, self.primeiros = float(np.median(dt)), []
+            if self.periodo_ms:
+                buracos = dt[dt > TOLERANCIA_BURACO * self.periodo_ms]
+                self.perdidas += int(np.rint(buracos / self.periodo_ms).sum()) - len(buracos)
+            atraso = agora_ms - t_ms
+            m = float(atraso.min())
+            if self.piso is None or m < self.piso: self.piso = m
+            self.latencias["chegada"].Adicionar(atraso - self.piso)
+
+    def RegistrarEtapa(self, etapa: str, t_ms, agora: float = None):
+        t_ms = np.asarray(t_ms, dtype=np.float64).ravel()
+        if len(t_ms) == 0 or self.piso is None: return
+        agora_ms = (time.time() if agora is None else agora) * 1000
+        with self.trava:
+            self.latencias[etapa].Adicionar(np.maximum(agora_ms - t_ms - self.piso, 0))
+
+    def Resumo(self) -> dict:
+        with self.trava:
+            duracao = time.time() - self.inicio
+            esperadas = self.recebidas + self.perdidas + self.perdidas_seq
+            return {"origem": self.origem, "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.inicio)),
+                    "duracao_s": round(duracao, 3), "recebidas": self.recebidas, "rejeitadas": self.rejeitadas,
+                    "perdidas": self.perdidas, "perdidas_seq": self.perdidas_seq, "duplicadas": self.duplicadas,
+                    "fora_de_ordem": self.fora_de_ordem,
+                    "perda_pct": round(100 * (esperadas - self.recebidas) / esperadas, 4) if esperadas else 0.0,
+                    "periodo_ms": self.periodo_ms, "intervalo_ms": self.intervalos.Resumo(),
+                    "latencia_ms": {e: h.Resumo() for e, h in self.latencias.items()}}
+
+    def Linha(self) -> str:
+        # Uma linha para o terminal
+        r = self.Resumo()
+        lat = r["latencia_ms"]
+        fmt = lambda v: "-" if v is None else f"{v:.0f}"
+        return (f"recebidas {r['recebidas']}  rejeitadas {r['rejeitadas']}  perdidas {r['perdidas'] + r['perdidas_seq']} ({r['perda_pct']:.2f}%)  "
+                f"intervalo p95 {fmt(r['intervalo_ms']['p95'])} ms  latência p95 chegada/disco/gráfico "
+                f"{fmt(lat['chegada']['p95'])}/{fmt(lat['disco']['p95'])}/{fmt(lat['grafico']['p95'])} ms")
+
+    def Exportar(self, caminho: str):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.Resumo(), f, indent=2, ensure_ascii=False)
+        return caminho
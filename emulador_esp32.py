@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+from quadro_binario import montar_quadro
+
+# Emulador do firmware wififinal.ino para testar o servidor_ingestao.py sem hardware.
+# Cada instância escuta numa porta TCP, aceita um cliente por vez e segue o mesmo
+# protocolo: HEARTBEAT a cada 1 s, 'c' -> CAL_START/CAL_DONE, 'z' -> ZERO_DONE e,
+# depois de calibrado e zerado, uma amostra a cada 1/hz segundos: linha JSON ou, depois
+# do comando 'b' (até um 'j'), quadro binário de quadro_binario.py.
+#
+# Uso: python emulador_esp32.py --n 50 --porta-base 4000 --hz 100
+
+HEART_MS = 1000
+
+class EmuladorESP32 (object):
+    def __init__(self, porta: int, hz: int = 50, host: str = "127.0.0.1", tempo_calibracao: float = 0.1):
+        self.porta = porta
+        self.hz = hz
+        self.host = host
+        self.tempo_calibracao = tempo_calibracao
+        self.enviadas = 0
+        self.servidor = None
+        self.clientes = set()
+        self.t0 = None
+
+    def millis(self) -> int:
+        return int((asyncio.get_running_loop().time() - self.t0) * 1000)
+
+    def _angulos(self, t: int) -> list:
+        # Flexão de joelho sintética (~0.5 Hz) com ruído: p1,r1,y1,...,y3
+        ang = 40 * math.sin(2 * math.pi * 0.5 * t / 1000)
+        return [round(v + random.gauss(0, 0.3), 3) for p in (0, ang, ang * 0.3) for v in (p, 0, 0)]
+
+    def Amostra(self, t: int = None) -> str:
+        # No formato do snprintf do firmware
+        t = self.millis() if t is None else t
+        a = self._angulos(t)
+        s = lambda i: {"pitch": a[i], "roll": a[i + 1], "yaw": a[i + 2]}
+        return json.dumps({"sensor1": s(0), "sensor2": s(3), "sensor3": s(6), "t": t}, separators=(',', ':')) + "\n"
+
+    def Quadro(self, seq: int, t: int = None) -> bytes:
+        t = self.millis() if t is None else t
+        return montar_quadro(seq, t, self._angulos(t))
+
+    async def _cliente(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clientes.add(writer)
+        calibrado = zerado = binario = False
+        seq = 0
+        prox_amostra = prox_heart = asyncio.get_running_loop().time()
+        comando = asyncio.ensure_future(reader.read(1))
+        try:
+            while not writer.is_closing():
+                agora = asyncio.get_running_loop().time()
+                if comando.done():
+                    c = comando.result()
+                    if not c: break
+                    if c == b"c" and not calibrado:
+                        writer.write(b'{"type":"CAL_START"}\n')
+                        await asyncio.sleep(self.tempo_calibracao)
+                        writer.write(b'{"type":"CAL_DONE"}\n'); calibrado = True
+                    elif c == b"z" and calibrado:
+                        writer.write(b'{"type":"ZERO_DONE"}\n'); zerado = True
+                    elif c in (b"b", b"j"):
+                        binario = c == b"b"
+                    comando = asyncio.ensure_future(reader.read(1))
+                if agora >= prox_heart:
+                    writer.write(f'{{"type":"HEARTBEAT","t":{self.millis()}}}\n'.encode())
+                    prox_heart += HEART_MS / 1000
+                if calibrado and zerado and agora >= prox_amostra:
+                    # carimbo do instante de amostragem, não do envio (um atraso do laço não vira buraco no t_ms)
+                    t = int((prox_amostra - self.t0) * 1000)
+                    writer.write(self.Quadro(seq, t) if binario else self.Amostra(t).encode())
+                    seq = (seq + 1) & 0xFFFF
+                    self.enviadas += 1
+                    prox_amostra += 1 / self.hz
+                await writer.drain() # backpressure do lado do "ESP32"
+                espera = min(prox_heart, prox_amostra if calibrado and zerado else prox_heart) - asyncio.get_running_loop().time()
+                await asyncio.wait([comando], timeout=max(espera, 0))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            comando.cancel()
+            writer.close()
+            self.clientes.discard(writer)
+
+    async def Iniciar(self):
+        self.t0 = asyncio.get_running_loop().time()
+        self.servidor = await asyncio.start_server(self._cliente, self.host, self.porta)
+
+    async def Parar(self):
+        # Derruba o servidor e as conexões abertas (simula o ESP32 desligando)
+        self.servidor.close()
+        for w in list(self.clientes): w.close()
+        await self.servidor.wait_closed()
+
+
+async def executar(n: int, porta_base: int, hz: int):
+    emuladores = [EmuladorESP32(porta_base + i, hz) for i in range(n)]
+    for e in emuladores: await e.Iniciar()
+    print(f"{n} ESP32 emulados em 127.0.0.1:{porta_base}..{porta_base + n - 1} a {hz} Hz")
+    while True:
+        await asyncio.sleep(5)
+        print(f"enviadas: {sum(e.enviadas for e in emuladores)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulador de ESP32 HomeFisio (TCP)")
+    parser.add_argument("--n", type=int, default=1)
+    parser.add_argument("--porta-base", type=int, default=3333)
+    parser.add_argument("--hz", type=int, default=50)
+    args = parser.parse_args()
+    try:
+        asyncio.run(executar(args.n, args.porta_base, args.hz))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
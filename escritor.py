@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+import numpy as np
+from indice_tempo import EscritorIndice, caminho_indice, coluna_indice
+
+# Gravação em lote dos CSVs: o laço de leitura serial só empilha a linha em memória
+# e uma thread de fundo descarrega no disco por tamanho (64 KB) ou por tempo (250 ms).
+# Um fsync periódico limita o que se perde numa queda de energia a uma janela de flush.
+# Com binario=True os blocos são bytes (usado pelo formato .hfb). Com um
+# DiagnosticoColeta, o t_ms de cada bloco é marcado na etapa "disco" depois do flush.
+# Com indice=True o índice de tempo (.tidx, indice_tempo.py) é gravado junto, sempre
+# depois do trecho do CSV a que cada entrada aponta.
+# PoolEscritores faz o mesmo para muitos arquivos ao mesmo tempo (captura de várias
+# portas) com poucas threads: cada arquivo fica preso a uma thread, então a ordem das
+# linhas de cada arquivo se mantém.
+
+TAM_LOTE = 64 * 1024
+INTERVALO_FLUSH = 0.25
+INTERVALO_FSYNC = 1.0
+MAX_PENDENTE = 64 * 1024 * 1024 # acima disso Escrever() espera o disco (evita estourar a RAM)
+
+
+class EscritorLote (object):
+    def __init__(self, nome_arquivo: str, header: str = "", tam_lote: int = TAM_LOTE,
+                 intervalo_flush: float = INTERVALO_FLUSH, intervalo_fsync: float = INTERVALO_FSYNC, binario: bool = False, diagnostico=None,
+                 indice: bool = False):
+        self.nome_arquivo = nome_arquivo
+        self.header = header
+        self.tam_lote = tam_lote
+        self.intervalo_flush = intervalo_flush
+        self.intervalo_fsync = intervalo_fsync # None desliga o fsync
+        self.binario = binario
+        self.diagnostico = diagnostico
+        self.indice = EscritorIndice(caminho_indice(nome_arquivo), len(header.encode("utf-8")), coluna=coluna_indice(header.strip().split(","))) if indice else None
+        self.pendente = []
+        self.pendente_t = [] # t_ms dos blocos pendentes (só com diagnostico)
+        self.bytes_pendentes = 0
+        self.linhas = 0
+        self.cond = threading.Condition()
+        self.fechando = False
+        self.erro = None
+        self.thread = None
+        self.f = None
+
+    def getNomeArquivo(self) -> str:
+        return self.nome_arquivo
+    def getLinhas(self) -> int:
+        return self.linhas
+
+    def Abrir(self):
+        if self.binario: self.f = open(self.nome_arquivo, "wb")
+        else: self.f = open(self.nome_arquivo, "w", encoding="utf-8", newline='')
+        if self.header: self.f.write(self.header)
+        if self.indice is not None: self.indice.Abrir()
+        self.thread = threading.Thread(target=self._descarregar, name=f"escritor-{os.path.basename(self.nome_arquivo)}", daemon=True)
+        self.thread.start()
+        return self
+
+    def Escrever(self, linha: str, t_ms=None):
+        self.EscreverBloco(linha + "\n", 1, t_ms)
+
+    def EscreverBloco(self, texto, n_linhas: int = 0, t_ms=None):
+        with self.cond:
+            if self.erro is not None: raise self.erro
+            while self.bytes_pendentes > MAX_PENDENTE and self.erro is None:
+                self.cond.wait()
+            self.pendente.append(texto)
+            if self.diagnostico is not None and t_ms is not None: self.pendente_t.append(t_ms)
+            if self.indice is not None: self.indice.Adicionar(texto, n_linhas, t_ms)
+            self.bytes_pendentes += len(texto)
+            self.linhas += n_linhas
+            if self.bytes_pendentes >= self.tam_lote:
+                self.cond.notify_all()
+
+    def _descarregar(self):
+        ultimo_fsync = time.monotonic()
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.fechando or self.bytes_pendentes >= self.tam_lote, self.intervalo_flush)
+                lote, self.pendente, self.bytes_pendentes = self.pendente, [], 0
+                lote_t, self.pendente_t = self.pendente_t, []
+                entradas = self.indice.Retirar() if self.indice is not None else None
+                fechando = self.fechando
+                self.cond.notify_all() # libera quem estava esperando em MAX_PENDENTE
+            try:
+                if lote:
+                    self.f.write((b"" if self.binario else "").join(lote))
+                    self.f.flush()
+                    if lote_t: self.diagnostico.RegistrarEtapa("disco", np.concatenate([np.ravel(t) for t in lote_t]))
+                if entradas: self.indice.Gravar(entradas)
+                agora = time.monotonic()
+                if self.intervalo_fsync is not None and (fechando or agora - ultimo_fsync >= self.intervalo_fsync):
+                    os.fsync(self.f.fileno())
+                    ultimo_fsync = agora
+            except OSError as e:
+                with self.cond:
+                    self.erro = e
+                    self.cond.notify_all()
+                return
+            if fechando: return
+
+    def Fechar(self):
+        if self.f is None: return
+        with self.cond:
+            self.fechando = True
+            self.cond.notify_all()
+        self.thread.join()
+        self.f.close()
+        self.f = None
+        if self.indice is not None: self.indice.Fechar() # depois do CSV: o índice fica mais novo que ele
+        if self.erro is not None: raise self.erro
+
+    def __enter__(self):
+        return self.Abrir()
+
+    def __exit__(self, *exc):
+        self.Fechar()
+
+
+class PoolEscritores (object):
+    """
+    Threads de gravação compartilhadas. Abrir(nome, header) devolve um identificador;
+    EscreverBloco(ident, texto, ...) só empilha; FecharArquivo(ident) descarrega e fecha
+    aquele arquivo. Mesmos limites do EscritorLote (tamanho, tempo, fsync, MAX_PENDENTE).
+    """
+    def __init__(self, n_threads: int = 2, tam_lote: int = TAM_LOTE, intervalo_flush: float = INTERVALO_FLUSH,
+                 intervalo_fsync: float = INTERVALO_FSYNC):
+        self.tam_lote = tam_lote
+        self.intervalo_flush = intervalo_flush
+        self.intervalo_fsync = intervalo_fsync
+        self.cond = threading.Condition()
+        self.arquivos = {} # ident -> estado do arquivo (dict)
+        self.proximo = 0
+        self.bytes_pendentes = [0] * n_threads # por thread
+        self.fechando = False
+        self.threads = [threading.Thread(target=self._descarregar, args=(i,), name=f"pool-escrita-{i}", daemon=True)
+                        for i in range(n_threads)]
+        for t in self.threads: t.start()
+
+    def getLinhas(self, ident: int) -> int:
+        return self.arquivos[ident]["linhas"]
+    def getArquivos(self) -> int:
+        return len(self.arquivos)
+
+    def Abrir(self, nome_arquivo: str, header: str = "", diagnostico=None, indice: bool = False) -> int:
+        f = open(nome_arquivo, "w", encoding="utf-8", newline='')
+        if header: f.write(header)
+        indice = EscritorIndice(caminho_indice(nome_arquivo), len(header.encode("utf-8")), coluna=coluna_indice(header.strip().split(","))).Abrir() if indice else None
+        with self.cond:
+            ident, self.proximo = self.proximo, self.proximo + 1
+            # a thread com menos arquivos abertos fica com o novo
+            carga = [sum(1 for a in self.arquivos.values() if a["thread"] == i) for i in range(len(self.threads))]
+            self.arquivos[ident] = {"nome": nome_arquivo, "f": f, "thread": carga.index(min(carga)), "pendente": [],
+                                    "pendente_t": [], "bytes": 0, "linhas": 0, "diagnostico": diagnostico, "indice": indice,
+                                    "ultimo_fsync": time.monotonic(), "fechar": False, "erro": None}
+        return ident
+
+    def EscreverBloco(self, ident: int, texto: str, n_linhas: int = 0, t_ms=None):
+        with self.cond:
+            a = self.arquivos[ident]
+            if a["erro"] is not None: raise a["erro"]
+            while self.bytes_pendentes[a["thread"]] > MAX_PENDENTE and a["erro"] is None:
+                self.cond.wait()
+            a["pendente"].append(texto)
+            if a["diagnostico"] is not None and t_ms is not None: a["pendente_t"].append(t_ms)
+            if a["indice"] is not None: a["indice"].Adicionar(texto, n_linhas, t_ms)
+            a["bytes"] += len(texto)
+            a["linhas"] += n_linhas
+            self.bytes_pendentes[a["thread"]] += len(texto)
+            if a["bytes"] >= self.tam_lote: self.cond.notify_all()
+
+    def _descarregar(self, indice: int):
+        while True:
+            with self.cond:
+                meus = lambda: [a for a in self.arquivos.values() if a["thread"] == indice and not a.get("fechado")]
+                self.cond.wait_for(lambda: self.fechando or any(a["fechar"] or a["bytes"] >= self.tam_lote for a in meus()),
+                                   self.intervalo_flush)
+                lotes = []
+                for a in meus():
+                    entradas = a["indice"].Retirar() if a["indice"] is not None else None
+                    lotes.append((a, a["pendente"], a["pendente_t"], entradas, a["fechar"] or self.fechando))
+                    a["pendente"], a["pendente_t"], a["bytes"] = [], [], 0
+                self.bytes_pendentes[indice] = 0
+                encerrar = self.fechando
+                self.cond.notify_all()
+            for a, lote, lote_t, entradas, fechar in lotes:
+                try:
+                    if lote:
+                        a["f"].write("".join(lote))
+                        a["f"].flush()
+                        if lote_t: a["diagnostico"].RegistrarEtapa("disco", np.concatenate([np.ravel(t) for t in lote_t]))
+                    if entradas: a["indice"].Gravar(entradas)
+                    agora = time.monotonic()
+                    if self.intervalo_fsync is not None and (fechar or agora - a["ultimo_fsync"] >= self.intervalo_fsync):
+                        os.fsync(a["f"].fileno())
+                        a["ultimo_fsync"] = agora
+                    if fechar: a["f"].close()
+                except OSError as e:
+                    a["erro"] = e
+                    fechar = True
+                    try:
+                        a["f"].close() # arquivo com erro sai do pool (EscreverBloco passa a levantar)
+                    except OSError:
+                        pass
+                if fechar:
+                    try:
+                        if a["indice"] is not None: a["indice"].Fechar() # depois do CSV
+                    except OSError:
+                        pass # sem índice a sessão continua legível; ele é refeito na 1ª consulta
+                    with self.cond:
+                        a["fechado"] = True
+                        self.cond.notify_all()
+            if encerrar: return
+
+    def FecharArquivo(self, ident: int):
+        # Descarrega o que falta e fecha; o identificador deixa de valer
+        with self.cond:
+            a = self.arquivos[ident]
+            a["fechar"] = True
+            self.cond.notify_all()
+            self.cond.wait_for(lambda: a.get("fechado", False))
+            del self.arquivos[ident]
+        if a["erro"] is not None: raise a["erro"]
+
+    def Encerrar(self):
+        for ident in list(self.arquivos): self.FecharArquivo(ident)
+        with self.cond:
+            self.fechando = True
+            self.cond.notify_all()
+        for t in self.threads: t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Encerrar()
@@ -0,0 +1,164 @@
+from functools import lru_cache
+import numpy as np
+from buffers import BufferColunar
+
+# Motor espectral por janelas (Welch/espectrograma) para sessões longas e para o ao vivo.
+# Em vez de uma FFT complexa do sinal inteiro, o sinal é cortado em janelas Hann com
+# sobreposição; cada janela vira uma densidade espectral (rfft, só frequências >= 0) e
+# dela saem a potência na banda de tremor (4-8 Hz) e as frequências de pico. Janela,
+# eixo de frequências e escala ficam num plano em cache por (nperseg, fs), e as janelas
+# são processadas em blocos de BLOCO_QUADROS (memória limitada, qualquer duração).
+# O EspectroOnline faz a mesma conta em fluxo, e o tremor_por_janela em lote é ele
+# alimentado de uma vez: mesmas janelas, mesmos resultados (a menos do arredondamento
+# das somas, ~1e-16).
+
+BANDA_TREMOR = (4.0, 8.0) # Hz, mesma zona do relatório
+JANELA_S = 2.0 # resolução de 0,5 Hz
+SOBREPOSICAO = 0.5
+BLOCO_QUADROS = 512
+LIMIAR_TREMOR_GRAUS = 0.5 # RMS na banda de tremor acima disso marca a janela
+AMOSTRAS_FFT_INTEIRA = 1 << 16 # acima disso o espectro de amplitude é a média por janelas
+JANELA_AMPLITUDE = 1 << 14 # amostras por janela do espectro de amplitude longo
+
+@lru_cache(maxsize=32)
+def plano_espectral(nperseg: int, fs: float) -> tuple:
+    # (janela Hann periódica, frequências, escala da densidade one-sided); arrays só leitura
+    janela = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(nperseg) / nperseg)
+    freqs = np.fft.rfftfreq(nperseg, 1.0 / fs)
+    escala = np.full(len(freqs), 2.0 / (fs * np.sum(janela ** 2)))
+    escala[0] /= 2
+    if nperseg % 2 == 0: escala[-1] /= 2 # Nyquist também não dobra
+    for a in (janela, freqs, escala): a.setflags(write=False)
+    return janela, freqs, escala
+
+def tamanho_janela(fs: float, janela_s: float = JANELA_S, sobreposicao: float = SOBREPOSICAO) -> tuple:
+    # (nperseg, passo) em amostras
+    nperseg = max(int(round(janela_s * fs)), 4)
+    return nperseg, max(int(round(nperseg * (1 - sobreposicao))), 1)
+
+def psd_quadros(quadros: np.ndarray, fs: float) -> np.ndarray:
+    # [m, nperseg] -> [m, nperseg//2 + 1]: densidade (unidade²/Hz) de cada janela, sem a média
+    janela, _, escala = plano_espectral(quadros.shape[1], float(fs))
+    x = quadros - quadros.mean(axis=1, keepdims=True)
+    x *= janela
+    esp = np.fft.rfft(x, axis=1)
+    psd = esp.real ** 2
+    psd += esp.imag ** 2
+    psd *= escala
+    return psd
+
+def potencia_banda(freqs: np.ndarray, psd: np.ndarray, banda: tuple = BANDA_TREMOR) -> np.ndarray:
+    # Integral da densidade na banda (último eixo)
+    m = (freqs >= banda[0]) & (freqs <= banda[1])
+    return psd[..., m].sum(axis=-1) * (freqs[1] - freqs[0])
+
+def espectrograma(sinal, fs: float, janela_s: float = JANELA_S, sobreposicao: float = SOBREPOSICAO) -> tuple:
+    # (centro de cada janela em s desde a 1ª amostra, frequências, densidade [m, f])
+    sinal = np.asarray(sinal, dtype=np.float64)
+    nperseg, passo = tamanho_janela(fs, janela_s, sobreposicao)
+    freqs = plano_espectral(nperseg, float(fs))[1]
+    if len(sinal) < nperseg: return np.zeros(0), freqs, np.zeros((0, len(freqs)))
+    quadros = np.lib.stride_tricks.sliding_window_view(sinal, nperseg)[::passo]
+    psd = np.concatenate([psd_quadros(quadros[i:i + BLOCO_QUADROS], fs) for i in range(0, len(quadros), BLOCO_QUADROS)])
+    return (np.arange(len(quadros)) * passo + nperseg / 2) / fs, freqs, psd
+
+def welch(sinal, fs: float, janela_s: float = JANELA_S, sobreposicao: float = SOBREPOSICAO) -> tuple:
+    # (frequências, densidade média das janelas): o scipy.signal.welch com Hann e detrend constante
+    estado = EspectroOnline(fs, janela_s, sobreposicao, series=False)
+    estado.Alimentar(sinal)
+    return estado.Welch()
+
+def espectro_amplitude(sinal, fs: float) -> tuple:
+    # (xf, amplitude) como o analise_fft: 2/N·|FFT| do sinal sem a média. Até
+    # AMOSTRAS_FFT_INTEIRA amostras é a FFT do sinal inteiro; acima, a média das
+    # amplitudes de janelas Hann de JANELA_AMPLITUDE com 50% de sobreposição (mesma
+    # escala para uma senoide, memória limitada à janela).
+    sinal = np.asarray(sinal, dtype=np.float64)
+    N = len(sinal)
+    if N == 0: return None, None
+    if N <= AMOSTRAS_FFT_INTEIRA:
+        return np.fft.rfftfreq(N, 1 / fs)[:N//2], 2.0/N * np.abs(np.fft.rfft(sinal - np.mean(sinal))[:N//2])
+    nperseg, passo = JANELA_AMPLITUDE, JANELA_AMPLITUDE // 2
+    janela = plano_espectral(nperseg, float(fs))[0]
+    quadros = np.lib.stride_tricks.sliding_window_view(sinal, nperseg)[::passo]
+    soma = np.zeros(nperseg // 2 + 1)
+    for i in range(0, len(quadros), BLOCO_QUADROS // 16):
+        q = quadros[i:i + BLOCO_QUADROS // 16]
+        soma += np.abs(np.fft.rfft((q - q.mean(axis=1, keepdims=True)) * janela, axis=1)).sum(axis=0)
+    return np.fft.rfftfreq(nperseg, 1 / fs)[:nperseg//2], (2.0 / np.sum(janela) * soma / len(quadros))[:nperseg//2]
+
+
+class EspectroOnline (object):
+    """
+    Espectro por janelas em fluxo: Alimentar(amostras) recebe o sinal já na grade de fs
+    (em lotes de qualquer tamanho) e, a cada `passo` amostras, fecha uma janela com
+    potência e RMS na banda de tremor e as frequências de pico (geral, sem o DC, e
+    dentro da banda). A densidade média (Welch) é acumulada junto. Custo constante
+    por amostra; só guarda as últimas nperseg amostras e uma linha por janela.
+    """
+    def __init__(self, fs: float, janela_s: float = JANELA_S, sobreposicao: float = SOBREPOSICAO,
+                 banda: tuple = BANDA_TREMOR, t0: float = 0.0, series: bool = True):
+        self.fs = float(fs)
+        self.nperseg, self.passo = tamanho_janela(fs, janela_s, sobreposicao)
+        self.freqs = plano_espectral(self.nperseg, self.fs)[1]
+        self.banda = banda
+        self.na_banda = np.flatnonzero((self.freqs >= banda[0]) & (self.freqs <= banda[1]))
+        self.t0 = t0 # tempo da 1ª amostra (s)
+        self.resto = np.zeros(0) # amostras ainda necessárias para as próximas janelas
+        self.inicio = 0 # índice absoluto de resto[0]
+        self.soma_psd = np.zeros(len(self.freqs))
+        self.n_quadros = 0
+        self.janelas = BufferColunar(["t", "potencia", "rms", "freq_pico", "freq_tremor"], capacidade=1 << 10) if series else None
+
+    def getQuadros(self) -> int:
+        return self.n_quadros
+    def getFrequencias(self) -> np.ndarray:
+        return self.freqs
+
+    def Alimentar(self, amostras) -> int:
+        # Devolve quantas janelas novas fecharam
+        cat = np.concatenate((self.resto, np.asarray(amostras, dtype=np.float64)))
+        m = (len(cat) - self.nperseg) // self.passo + 1 if len(cat) >= self.nperseg else 0
+        if m > 0:
+            quadros = np.lib.stride_tricks.sliding_window_view(cat, self.nperseg)[:m * self.passo:self.passo]
+            for i in range(0, m, BLOCO_QUADROS): self._processar(quadros[i:i + BLOCO_QUADROS], self.inicio + i * self.passo)
+        usadas = m * self.passo
+        self.resto = cat[usadas:].copy()
+        self.inicio += usadas
+        return m
+
+    def _processar(self, quadros: np.ndarray, inicio: int):
+        psd = psd_quadros(quadros, self.fs)
+        self.soma_psd += psd.sum(axis=0)
+        self.n_quadros += len(psd)
+        if self.janelas is None: return
+        potencia = potencia_banda(self.freqs, psd, self.banda)
+        banda = psd[:, self.na_banda]
+        self.janelas.appendLote({
+            "t": self.t0 + (inicio + np.arange(len(psd)) * self.passo + self.nperseg / 2) / self.fs,
+            "potencia": potencia, "rms": np.sqrt(potencia),
+            "freq_pico": self.freqs[1 + np.argmax(psd[:, 1:], axis=1)],
+            "freq_tremor": self.freqs[self.na_banda[np.argmax(banda, axis=1)]] if len(self.na_banda) else np.zeros(len(psd)),
+        })
+
+    def Welch(self) -> tuple:
+        return self.freqs, (self.soma_psd / self.n_quadros if self.n_quadros else np.zeros(len(self.freqs)))
+
+    def Ultima(self) -> dict:
+        # Última janela fechada (para o painel ao vivo) ou None
+        if self.janelas is None or len(self.janelas) == 0: return None
+        return {c: float(self.janelas.coluna(c)[-1]) for c in self.janelas.getColunas()}
+
+    def Resultado(self) -> dict:
+        # Séries por janela (cópias) + resumo da sessão
+        cols = {c: self.janelas.coluna(c).copy() for c in self.janelas.getColunas()}
+        cols["tremor_pct"] = float(100 * np.mean(cols["rms"] > LIMIAR_TREMOR_GRAUS)) if len(cols["rms"]) else 0.0
+        return cols
+
+
+def tremor_por_janela(sinal, fs: float, t0: float = 0.0, janela_s: float = JANELA_S, sobreposicao: float = SOBREPOSICAO) -> dict:
+    # Sessão inteira de uma vez pelo mesmo caminho do ao vivo:
+    # {"t", "potencia", "rms", "freq_pico", "freq_tremor" (uma por janela), "tremor_pct"}
+    estado = EspectroOnline(fs, janela_s, sobreposicao, t0=t0)
+    estado.Alimentar(sinal)
+    return estado.Resultado()
@@ -0,0 +1,165 @@
+import argparse
+import os
+import struct
+import numpy as np
+import pandas as pd
+from escritor import EscritorLote
+
+# Formato binário das sessões (.hfb), gravado ao lado do HOMEFISIO_DADOS_*.csv.
+#
+#   cabeçalho: b"HFB1" | u32 tamanho do cabeçalho | u16 versão | u16 qtd_sensores
+#              | u16 qtd_colunas | u16 reservado | nomes das colunas (utf-8, separados
+#              por vírgula) | zeros até múltiplo de 16 bytes
+#   dados:     registros little-endian de tamanho fixo, um por amostra: float32 para
+#              cada ângulo e uint32 para a coluna de tempo (t_ms)
+#
+# Registros de tamanho fixo deixam o arquivo ser gravado em fluxo durante a captura e
+# lido com np.memmap sem nenhum parse: cada coluna vira uma visão do arquivo mapeado.
+
+MAGICO = b"HFB1"
+VERSAO = 1
+EXTENSAO = ".hfb"
+COLUNAS_TEMPO = ("t_ms", "tMs")
+LINHAS_POR_LOTE = 512
+_CABECALHO_FIXO = struct.Struct("<4sIHHHH")
+
+def dtype_registro(colunas: list) -> np.dtype:
+    return np.dtype([(c, "<u4" if c in COLUNAS_TEMPO else "<f4") for c in colunas])
+
+def qtd_sensores_de(colunas: list) -> int:
+    # p/r/y por sensor, mais a coluna de tempo (4 -> 1, 7 -> 2, 10 -> 3)
+    return max(0, (len(colunas) - 1) // 3)
+
+def caminho_binario(caminho_csv: str) -> str:
+    return os.path.splitext(caminho_csv)[0] + EXTENSAO
+
+def montar_cabecalho(colunas: list, qtd_sensores: int) -> bytes:
+    nomes = ",".join(colunas).encode("utf-8")
+    tamanho = _CABECALHO_FIXO.size + len(nomes)
+    tamanho += -tamanho % 16
+    fixo = _CABECALHO_FIXO.pack(MAGICO, tamanho, VERSAO, qtd_sensores, len(colunas), 0)
+    return (fixo + nomes).ljust(tamanho, b"\0")
+
+def ler_cabecalho(caminho: str):
+    # Devolve (colunas, qtd_sensores, tamanho do cabeçalho)
+    with open(caminho, "rb") as f:
+        fixo = f.read(_CABECALHO_FIXO.size)
+        magico, tamanho, versao, qtd_sensores, qtd_colunas, _ = _CABECALHO_FIXO.unpack(fixo)
+        if magico != MAGICO or versao != VERSAO:
+            raise ValueError(f"{caminho} não é um arquivo {EXTENSAO} v{VERSAO}")
+        nomes = f.read(tamanho - _CABECALHO_FIXO.size).rstrip(b"\0").decode("utf-8")
+    colunas = nomes.split(",")
+    if len(colunas) != qtd_colunas:
+        raise ValueError(f"{caminho}: cabeçalho corrompido")
+    return colunas, qtd_sensores, tamanho
+
+
+class EscritorBinario (object):
+    # Grava registros .hfb em fluxo, reaproveitando a thread de disco do EscritorLote
+    def __init__(self, nome_arquivo: str, colunas: list, qtd_sensores: int = None):
+        self.nome_arquivo = nome_arquivo
+        self.colunas = list(colunas)
+        self.qtd_sensores = qtd_sensores if qtd_sensores is not None else qtd_sensores_de(self.colunas)
+        self.dtype = dtype_registro(self.colunas)
+        self.pendentes = []
+        self.escritor = EscritorLote(nome_arquivo, montar_cabecalho(self.colunas, self.qtd_sensores), binario=True)
+
+    def getNomeArquivo(self) -> str:
+        return self.nome_arquivo
+
+    def Abrir(self):
+        self.escritor.Abrir()
+        return self
+
+    def EscreverLinha(self, linha: str):
+        # Linha CSV já validada pelo receptor ("p1,r1,y1,...,t_ms")
+        self.pendentes.append(linha.split(","))
+        if len(self.pendentes) >= LINHAS_POR_LOTE:
+            self._descarregarPendentes()
+
+    def EscreverLote(self, matriz: np.ndarray):
+        # Matriz (n, qtd_colunas) na ordem de self.colunas
+        self._descarregarPendentes()
+        self._escreverMatriz(np.asarray(matriz, dtype=np.float64))
+
+    def _descarregarPendentes(self):
+        if not self.pendentes: return
+        matriz = np.array(self.pendentes, dtype=np.float64)
+        self.pendentes = []
+        self._escreverMatriz(matriz)
+
+    def _escreverMatriz(self, matriz: np.ndarray):
+        if len(matriz) == 0: return
+        registros = np.empty(len(matriz), dtype=self.dtype)
+        for i, c in enumerate(self.colunas):
+            registros[c] = matriz[:, i]
+        self.escritor.EscreverBloco(registros.tobytes(), len(registros))
+
+    def Fechar(self):
+        self._descarregarPendentes()
+        self.escritor.Fechar()
+
+    def __enter__(self):
+        return self.Abrir()
+
+    def __exit__(self, *exc):
+        self.Fechar()
+
+
+def carregar_binario(caminho: str):
+    # Mapeia o arquivo sem ler nada: devolve (registros np.memmap, colunas, qtd_sensores).
+    # Um registro incompleto no fim (queda durante a gravação) é ignorado.
+    colunas, qtd_sensores, inicio = ler_cabecalho(caminho)
+    dtype = dtype_registro(colunas)
+    n = (os.path.getsize(caminho) - inicio) // dtype.itemsize
+    if n == 0:
+        return np.zeros(0, dtype=dtype), colunas, qtd_sensores
+    return np.memmap(caminho, dtype=dtype, mode="r", offset=inicio, shape=(n,)), colunas, qtd_sensores
+
+def binario_para_dataframe(caminho: str) -> pd.DataFrame:
+    registros, colunas, _ = carregar_binario(caminho)
+    # tempo em int64 para que diferenças (t - t0) não dêem a volta no uint32
+    return pd.DataFrame({c: registros[c].astype(np.int64) if c in COLUNAS_TEMPO else registros[c] for c in colunas})
+
+def binario_atualizado(caminho_csv: str) -> bool:
+    hfb = caminho_binario(caminho_csv)
+    return os.path.exists(hfb) and (not os.path.exists(caminho_csv) or os.path.getmtime(hfb) >= os.path.getmtime(caminho_csv))
+
+def carregar_sessao(caminho_csv: str) -> pd.DataFrame:
+    # Ponto único de leitura de sessões: usa o .hfb quando existe e está em dia com o CSV
+    if binario_atualizado(caminho_csv):
+        try:
+            return binario_para_dataframe(caminho_binario(caminho_csv))
+        except ValueError:
+            pass
+    return pd.read_csv(caminho_csv)
+
+def converter_csv(caminho_csv: str, forcar: bool = False) -> str:
+    hfb = caminho_binario(caminho_csv)
+    if not forcar and binario_atualizado(caminho_csv): return hfb
+    df = pd.read_csv(caminho_csv)
+    with EscritorBinario(hfb, df.columns.tolist()) as f:
+        f.EscreverLote(df.to_numpy(dtype=np.float64))
+    return hfb
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Converte CSVs de sessão para o formato binário {EXTENSAO}")
+    parser.add_argument("caminhos", nargs="+", help="arquivos .csv ou pastas (percorridas recursivamente)")
+    parser.add_argument("--forcar", action="store_true", help="reconverte mesmo se o .hfb estiver em dia")
+    args = parser.parse_args()
+    arquivos = []
+    for c in args.caminhos:
+        if os.path.isdir(c):
+            for raiz, _, nomes in os.walk(c):
+                arquivos += [os.path.join(raiz, n) for n in nomes if n.endswith(".csv")]
+        else:
+            arquivos.append(c)
+    for arq in sorted(arquivos):
+        try:
+            hfb = converter_csv(arq, args.forcar)
+            print(f"{arq} -> {hfb} ({os.path.getsize(arq)/1024:.0f} KB -> {os.path.getsize(hfb)/1024:.0f} KB)")
+        except (ValueError, OSError) as e:
+            print(f"Ignorando {arq}: {e}")
+
+if __name__ == "__main__":
+    main()
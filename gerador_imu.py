@@ -0,0 +1,117 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+# Gerador de sessões sintéticas de IMU para benchmarks e testes sem hardware. Produz
+# os ângulos de 1 a 3 sensores (p/r/y por sensor + t_ms, mesma ordem do receptor)
+# para os três exercícios do app, com ciclos de período e amplitude variáveis,
+# tremor fisiológico, ruído de sensor, deriva do yaw (integração do giroscópio) e
+# jitter no millis(). O ângulo do exercício sai onde o processar_biomecanica procura:
+#   Flexão de Joelho   -> p2 - p1 (coxa e canela)
+#   Abdução de Quadril -> r1
+#   Dorsiflexão        -> p3 - p2 (canela e pé)
+#
+# Uso: python gerador_imu.py --exercicio "Flexão de Joelho" --sensores 3 --hz 50 --duracao 600 sessao.csv
+
+EXERCICIOS = {
+    # (ângulo mínimo, ângulo máximo, período médio em s)
+    "Flexão de Joelho": (5.0, 90.0, 2.5),
+    "Abdução de Quadril": (0.0, 35.0, 3.0),
+    "Dorsiflexão": (-15.0, 20.0, 2.0),
+}
+
+def colunas_sensores(qtd_sensores: int) -> list:
+    return [f"{e}{i+1}" for i in range(qtd_sensores) for e in "pry"] + ["t_ms"]
+
+
+class GeradorIMU (object):
+    def __init__(self, exercicio: str = "Flexão de Joelho", qtd_sensores: int = 3, hz: float = 50, duracao_s: float = 60,
+                 tremor_hz: float = 5.5, tremor_graus: float = 0.8, ruido_graus: float = 0.3, seed: int = 0):
+        if exercicio not in EXERCICIOS: raise ValueError(f"exercício desconhecido: {exercicio}")
+        if not 1 <= qtd_sensores <= 3: raise ValueError("qtd_sensores deve ser 1, 2 ou 3")
+        self.exercicio = exercicio
+        self.qtd_sensores = qtd_sensores
+        self.hz = hz
+        self.duracao_s = duracao_s
+        self.tremor_hz = tremor_hz
+        self.tremor_graus = tremor_graus
+        self.ruido_graus = ruido_graus
+        self.seed = seed
+
+    def getColunas(self) -> list:
+        return colunas_sensores(self.qtd_sensores)
+    def getAmostras(self) -> int:
+        return int(round(self.hz * self.duracao_s))
+
+    def Angulo(self, t: np.ndarray, rng) -> np.ndarray:
+        # Ciclos com período e amplitude sorteados por repetição (fadiga/variação natural)
+        minimo, maximo, periodo = EXERCICIOS[self.exercicio]
+        n_ciclos = int(self.duracao_s / periodo * 1.5) + 2
+        periodos = periodo * rng.uniform(0.8, 1.2, n_ciclos)
+        amplitudes = (maximo - minimo) * rng.uniform(0.85, 1.0, n_ciclos)
+        inicios = np.concatenate(([0.0], np.cumsum(periodos)))
+        k = np.minimum(np.searchsorted(inicios, t, side='right') - 1, n_ciclos - 1)
+        fase = (t - inicios[k]) / periodos[k]
+        ang = minimo + amplitudes[k] * 0.5 * (1 - np.cos(2 * np.pi * fase)) # repouso -> pico -> repouso
+        ang += self.tremor_graus * np.sin(2 * np.pi * self.tremor_hz * t + rng.uniform(0, 2 * np.pi))
+        return ang
+
+    def Matriz(self) -> np.ndarray:
+        # [n, 3*qtd_sensores + 1] na ordem do CSV: p1,r1,y1,...,t_ms
+        rng = np.random.default_rng(self.seed)
+        n = self.getAmostras()
+        t = np.arange(n) / self.hz
+        ang = self.Angulo(t, rng)
+        dados = np.empty((n, 3 * self.qtd_sensores + 1))
+        base = rng.normal(0, 2, 3 * self.qtd_sensores) # postura de repouso de cada eixo
+        deriva = rng.normal(0, 0.02, self.qtd_sensores) # graus/s no yaw
+        for c in range(3 * self.qtd_sensores):
+            dados[:, c] = base[c] + rng.normal(0, self.ruido_graus, n)
+        for s in range(self.qtd_sensores): dados[:, 3*s + 2] += deriva[s] * t
+        if self.exercicio == "Flexão de Joelho":
+            alvo = 3 if self.qtd_sensores >= 2 else 0 # p2 (canela) relativo à p1 (coxa)
+            if alvo: dados[:, alvo] += dados[:, 0] - base[0] + ang
+            else: dados[:, 0] = ang + rng.normal(0, self.ruido_graus, n)
+        elif self.exercicio == "Abdução de Quadril":
+            dados[:, 1] = ang + rng.normal(0, self.ruido_graus, n) # r1
+        else:
+            if self.qtd_sensores == 3: dados[:, 6] = dados[:, 3] + ang + rng.normal(0, self.ruido_graus, n) # p3 - p2
+            else: dados[:, 0] = ang + rng.normal(0, self.ruido_graus, n)
+        t0 = int(rng.integers(1000, 600000)) # millis() desde o boot do ESP32
+        dados[:, -1] = t0 + np.floor(t * 1000 + rng.uniform(0, 1.0, n)) # jitter < 1 ms
+        return dados
+
+    def DataFrame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.Matriz(), columns=self.getColunas())
+        df['t_ms'] = df['t_ms'].astype(np.int64)
+        df['tempo_s'] = (df['t_ms'] - df['t_ms'].iloc[0]) / 1000.0
+        return df
+
+    def LinhasCSV(self, fim: str = "\r\n") -> bytes:
+        # Como o ESP32 imprime na serial (println: \r\n), sem cabeçalho
+        m = self.Matriz()
+        angulos = np.char.mod("%.2f", m[:, :-1])
+        linhas = [",".join(a) + f",{int(t)}" for a, t in zip(angulos, m[:, -1])]
+        return (fim.join(linhas) + fim).encode()
+
+    def GravarCSV(self, caminho: str) -> str:
+        df = self.DataFrame().drop(columns=['tempo_s'])
+        df.to_csv(caminho, index=False, float_format="%.2f")
+        return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma sessão sintética de IMU (CSV do receptor)")
+    parser.add_argument("saida")
+    parser.add_argument("--exercicio", default="Flexão de Joelho", choices=list(EXERCICIOS))
+    parser.add_argument("--sensores", type=int, default=3)
+    parser.add_argument("--hz", type=float, default=50)
+    parser.add_argument("--duracao", type=float, default=60, help="segundos")
+    parser.add_argument("--tremor", type=float, default=0.8, help="amplitude do tremor em graus")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    gerador = GeradorIMU(args.exercicio, args.sensores, args.hz, args.duracao, tremor_graus=args.tremor, seed=args.seed)
+    print(f"{gerador.GravarCSV(args.saida)}: {gerador.getAmostras()} amostras, {args.sensores} sensores, {args.hz:g} Hz")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from formato_binario import carregar_sessao, carregar_binario, binario_atualizado, caminho_binario
+from indice_tempo import COLUNAS_TEMPO, carregar_intervalo
+
+# Índice das sessões de um paciente (database_pacientes/<paciente>): guarda um resumo
+# por CSV (duração, nº de amostras e os metadados do .json) chaveado por caminho e
+# mtime. O resumo só é recalculado quando o arquivo muda e fica salvo em disco, então
+# o Histórico lista centenas de sessões sem abrir nenhuma. Os dados em si só são lidos
+# quando um painel/relatório é aberto, e ficam num cache LRU limitado.
+
+ARQUIVO_INDICE = ".indice_sessoes.json"
+VERSAO_INDICE = 1
+MAX_SESSOES_EM_CACHE = 8
+
+def _ler_metadados(caminho_csv: str) -> dict:
+    json_p = os.path.splitext(caminho_csv)[0] + ".json"
+    if not os.path.exists(json_p): return {}
+    try:
+        with open(json_p, 'r') as f: meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {k: meta.get(k) for k in ("exercise", "weight", "height", "gender") if k in meta}
+
+def _resumo_csv(caminho_csv: str) -> dict:
+    # Nº de amostras e duração sem montar o DataFrame: conta as linhas em blocos e lê
+    # só a primeira e a última linha para achar o tempo
+    with open(caminho_csv, 'rb') as f:
+        colunas = f.readline().decode("utf-8", errors="ignore").strip().split(",")
+        inicio = f.tell()
+        primeira = f.readline()
+        f.seek(inicio)
+        n, fim = 0, b""
+        while True:
+            bloco = f.read(1 << 20)
+            if not bloco: break
+            n += bloco.count(b"\n")
+            fim = bloco
+        if fim and not fim.endswith(b"\n"): n += 1 # última linha sem quebra
+        f.seek(max(inicio, f.tell() - 4096))
+        linhas = [l for l in f.read().splitlines() if l.strip()]
+    ultima = linhas[-1] if linhas else b""
+    duracao = None
+    for nome, escala in COLUNAS_TEMPO.items():
+        if nome in colunas and primeira.strip() and ultima.strip():
+            i = colunas.index(nome)
+            try:
+                duracao = (float(ultima.split(b",")[i]) - float(primeira.split(b",")[i])) / escala
+            except (ValueError, IndexError):
+                pass
+            break
+    return {"amostras": n, "duracao_s": duracao, "colunas": colunas}
+
+def _resumo_binario(caminho_csv: str) -> dict:
+    registros, colunas, _ = carregar_binario(caminho_binario(caminho_csv))
+    duracao = None
+    for nome, escala in COLUNAS_TEMPO.items():
+        if nome in colunas and len(registros):
+            duracao = (float(registros[nome][-1]) - float(registros[nome][0])) / escala
+            break
+    return {"amostras": len(registros), "duracao_s": duracao, "colunas": colunas}
+
+def resumir_sessao(caminho_csv: str) -> dict:
+    if binario_atualizado(caminho_csv):
+        try:
+            resumo = _resumo_binario(caminho_csv)
+        except ValueError:
+            resumo = _resumo_csv(caminho_csv)
+    else:
+        resumo = _resumo_csv(caminho_csv)
+    resumo.update(_ler_metadados(caminho_csv))
+    return resumo
+
+
+class IndiceSessoes (object):
+    def __init__(self, pasta: str):
+        self.pasta = pasta
+        self.caminho_indice = os.path.join(pasta, ARQUIVO_INDICE)
+        self.entradas = {} # nome do csv -> resumo (+ "mtime")
+        self._carregarIndice()
+
+    def getPasta(self) -> str:
+        return self.pasta
+
+    def _carregarIndice(self):
+        try:
+            with open(self.caminho_indice, 'r') as f: d = json.load(f)
+            if d.get("versao") == VERSAO_INDICE: self.entradas = d.get("sessoes", {})
+        except (OSError, ValueError):
+            self.entradas = {}
+
+    def _salvarIndice(self):
+        tmp = self.caminho_indice + ".tmp"
+        try:
+            with open(tmp, 'w') as f: json.dump({"versao": VERSAO_INDICE, "sessoes": self.entradas}, f)
+            os.replace(tmp, self.caminho_indice)
+        except OSError:
+            pass # pasta só leitura: o índice continua valendo em memória
+
+    def Atualizar(self) -> list:
+        # Um stat por arquivo; só resume de novo o que é novo ou mudou (mtime do csv ou do .json)
+        vistos, mudou = {}, False
+        with os.scandir(self.pasta) as it:
+            for e in it:
+                if not e.name.endswith(".csv"): continue
+                json_p = os.path.splitext(e.path)[0] + ".json"
+                mtime = max(e.stat().st_mtime, os.path.getmtime(json_p) if os.path.exists(json_p) else 0)
+                atual = self.entradas.get(e.name)
+                if atual is None or atual.get("mtime") != mtime:
+                    try:
+                        atual = resumir_sessao(e.path)
+                    except OSError:
+                        continue
+                    atual["mtime"] = mtime
+                    mudou = True
+                vistos[e.name] = atual
+        if mudou or len(vistos) != len(self.entradas):
+            self.entradas = vistos
+            self._salvarIndice()
+        return self.Listar()
+
+    def Listar(self) -> list:
+        # [(nome do csv, resumo)], mais recentes primeiro (mesma ordem de antes: nome decrescente)
+        return sorted(self.entradas.items(), reverse=True)
+
+    def Resumo(self, nome: str) -> dict:
+        return self.entradas.get(nome)
+
+    def Remover(self, nome: str):
+        base = os.path.join(self.pasta, os.path.splitext(nome)[0])
+        for ext in (".csv", ".json", ".hfb", ".tidx"):
+            try: os.remove(base + ext)
+            except OSError: pass
+        if self.entradas.pop(nome, None) is not None: self._salvarIndice()
+
+    def Carregar(self, nome: str):
+        resumo = self.entradas.get(nome, {})
+        return carregar_sessao_cache(os.path.join(self.pasta, nome), resumo.get("mtime"))
+
+    def CarregarIntervalo(self, nome: str, t_inicio: float = None, t_fim: float = None):
+        # Só o trecho [t_inicio, t_fim] (s desde a 1ª amostra), pelo índice de tempo; não passa pelo cache
+        return carregar_intervalo(os.path.join(self.pasta, nome), t_inicio, t_fim)
+
+
+# Cache LRU dos DataFrames já abertos, chaveado por (caminho, mtime): um arquivo
+# alterado vira outra chave e a versão antiga sai pelo fim da fila
+_cache_sessoes = OrderedDict()
+_trava_cache = threading.Lock() # cada sessão do navegador roda numa thread do Streamlit
+
+def carregar_sessao_cache(caminho_csv: str, mtime: float = None):
+    chave = (caminho_csv, mtime)
+    with _trava_cache:
+        if chave in _cache_sessoes:
+            _cache_sessoes.move_to_end(chave)
+            return _cache_sessoes[chave]
+    df = carregar_sessao(caminho_csv)
+    with _trava_cache:
+        _cache_sessoes[chave] = df
+        while len(_cache_sessoes) > MAX_SESSOES_EM_CACHE:
+            _cache_sessoes.popitem(last=False)
+    return df
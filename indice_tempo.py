@@ -0,0 +1,277 @@
+import argparse
+import io
+import os
+import struct
+import numpy as np
+import pandas as pd
+
+# Índice esparso de tempo das sessões (.tidx, ao lado do HOMEFISIO_DADOS_*.csv): a cada
+# ~LINHAS_POR_ENTRADA linhas do CSV uma entrada com a linha e o byte onde o grupo começa,
+# o tamanho do grupo e o menor/maior t_ms dentro dele. Com isso carregar_intervalo lê
+# só os bytes dos grupos que encostam no trecho pedido, em vez da gravação inteira.
+# Guardar mín/máx por grupo (e não só o t da 1ª linha) mantém a busca correta mesmo com
+# t_ms fora de ordem ou recomeçando (ESP32 reiniciado).
+#
+#   cabeçalho: b"HTI1" | u16 versão | u16 coluna do tempo | u32 linhas por entrada | 4 zeros
+#   entradas:  registros little-endian (linha, offset, linhas, bytes: i8; t_min, t_max: f8)
+#
+# A coluna do tempo é achada pelo nome (COLUNAS_TEMPO, a mesma regra do indice_sessoes)
+# e fica no cabeçalho como posição + 1; 0 é a última coluna (o t_ms do receptor). t_min
+# e t_max ficam na unidade da coluna.
+#
+# O EscritorLote/PoolEscritores gravam o índice durante a captura (indice=True), sempre
+# depois do trecho correspondente do CSV; para CSVs antigos (ou reescritos depois, como
+# pelo reparar_csv) ele é construído numa passada na primeira consulta.
+
+MAGICO = b"HTI1"
+VERSAO = 1
+EXTENSAO = ".tidx"
+LINHAS_POR_ENTRADA = 512 # ~10 s a 50 Hz
+TAM_BLOCO_LEITURA = 1 << 20
+_CABECALHO = struct.Struct("<4sHHI4x")
+COLUNAS_TEMPO = {"t_ms": 1000.0, "tMs": 1000.0, "tempo_s": 1.0, "tempoS": 1.0, "t": 1.0} # nome -> unidades por segundo
+REGISTRO = np.dtype([("linha", "<i8"), ("offset", "<i8"), ("linhas", "<i8"), ("bytes", "<i8"),
+                     ("t_min", "<f8"), ("t_max", "<f8")])
+
+def caminho_indice(caminho_csv: str) -> str:
+    return os.path.splitext(caminho_csv)[0] + EXTENSAO
+
+def coluna_tempo(colunas: list) -> tuple:
+    # (posição, unidades por segundo) da coluna de tempo do cabeçalho, ou (None, None)
+    for nome, escala in COLUNAS_TEMPO.items():
+        if nome in colunas: return colunas.index(nome), escala
+    return None, None
+
+def coluna_indice(colunas: list) -> int:
+    # Coluna de tempo para o EscritorIndice: -1 se for a última (ou se não houver nenhuma)
+    coluna = coluna_tempo(colunas)[0]
+    return -1 if coluna is None or coluna == len(colunas) - 1 else coluna
+
+def _campo(linha: str, coluna: int) -> str:
+    if coluna == -1: return linha.rpartition(",")[2]
+    campos = linha.split(",")
+    return campos[coluna] if coluna < len(campos) else ""
+
+def tempos_linhas(linhas: list, coluna: int = -1) -> np.ndarray:
+    # Tempo (campo `coluna`, por padrão o último) de cada linha de texto; linha vazia ou ruim vira NaN
+    return pd.to_numeric(pd.Series([_campo(l, coluna) for l in linhas], dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+class EscritorIndice (object):
+    """
+    Acumula os blocos escritos no CSV e fecha uma entrada a cada `linhas_por_entrada`
+    linhas. Adicionar() só acumula (é chamado junto com o EscreverBloco); as entradas
+    prontas saem com Retirar() e vão para o disco com Gravar(), depois do flush do CSV.
+    """
+    def __init__(self, nome_arquivo: str, offset: int = 0, linhas_por_entrada: int = LINHAS_POR_ENTRADA, coluna: int = -1):
+        self.nome_arquivo = nome_arquivo
+        self.linhas_por_entrada = linhas_por_entrada
+        self.coluna = coluna # coluna do tempo no CSV (-1: a última)
+        self.offset = offset # byte onde começa o grupo aberto (o cabeçalho do CSV vem antes)
+        self.linha = 0
+        self.grupo_linhas = 0; self.grupo_bytes = 0
+        self.t_min = np.inf; self.t_max = -np.inf
+        self.prontas = []
+        self.entradas = 0
+        self.f = None
+
+    def getNomeArquivo(self) -> str:
+        return self.nome_arquivo
+    def getEntradas(self) -> int:
+        return self.entradas
+
+    def Abrir(self):
+        self.f = open(self.nome_arquivo, "wb")
+        self.f.write(_CABECALHO.pack(MAGICO, VERSAO, self.coluna + 1, self.linhas_por_entrada))
+        return self
+
+    def Adicionar(self, texto, n_linhas: int = None, t_ms=None, tamanhos=None):
+        # texto: o bloco como foi para o CSV (str ou bytes); sem t_ms o tempo sai do texto.
+        # tamanhos (bytes de cada linha) permite cortar o bloco em grupos exatos.
+        if isinstance(texto, str): texto = texto.encode("utf-8") if not texto.isascii() else texto
+        if t_ms is None:
+            linhas = (texto.decode("utf-8", errors="ignore") if isinstance(texto, bytes) else texto).splitlines()
+            t_ms = tempos_linhas(linhas, self.coluna)
+        t = np.asarray(t_ms, dtype=np.float64).ravel()
+        if not n_linhas: n_linhas = len(t)
+        if tamanhos is None:
+            self._acumular(n_linhas, len(texto), t)
+            return
+        tamanhos = np.asarray(tamanhos)
+        i = 0
+        while i < n_linhas:
+            k = min(n_linhas - i, self.linhas_por_entrada - self.grupo_linhas)
+            self._acumular(k, int(tamanhos[i:i + k].sum()), t[i:i + k])
+            i += k
+
+    def _acumular(self, n: int, n_bytes: int, t: np.ndarray):
+        t = t[np.isfinite(t)]
+        if len(t):
+            self.t_min = min(self.t_min, float(t.min())); self.t_max = max(self.t_max, float(t.max()))
+        self.grupo_linhas += n; self.grupo_bytes += n_bytes
+        if self.grupo_linhas >= self.linhas_por_entrada: self._fecharGrupo()
+
+    def _fecharGrupo(self):
+        if self.grupo_linhas == 0: return
+        self.prontas.append((self.linha, self.offset, self.grupo_linhas, self.grupo_bytes, self.t_min, self.t_max))
+        self.linha += self.grupo_linhas; self.offset += self.grupo_bytes
+        self.grupo_linhas = self.grupo_bytes = 0
+        self.t_min, self.t_max = np.inf, -np.inf
+
+    def Retirar(self) -> list:
+        prontas, self.prontas = self.prontas, []
+        return prontas
+
+    def Gravar(self, entradas: list):
+        if not entradas: return
+        self.f.write(np.array(entradas, dtype=REGISTRO).tobytes())
+        self.f.flush()
+        self.entradas += len(entradas)
+
+    def Fechar(self):
+        # Fecha o grupo incompleto do fim; chamar depois do último flush do CSV
+        if self.f is None: return
+        self._fecharGrupo()
+        self.Gravar(self.Retirar())
+        self.f.close()
+        self.f = None
+
+    def __enter__(self):
+        return self.Abrir()
+
+    def __exit__(self, *exc):
+        self.Fechar()
+
+
+def _ler(caminho: str) -> tuple:
+    # (entradas, código da coluna do tempo) do .tidx
+    with open(caminho, "rb") as f: dados = f.read()
+    if len(dados) < _CABECALHO.size: raise ValueError(f"{caminho}: índice truncado")
+    magico, versao, codigo, _ = _CABECALHO.unpack_from(dados)
+    if magico != MAGICO or versao != VERSAO: raise ValueError(f"{caminho} não é um índice {EXTENSAO} v{VERSAO}")
+    corpo = dados[_CABECALHO.size:]
+    return np.frombuffer(corpo[:len(corpo) // REGISTRO.itemsize * REGISTRO.itemsize], dtype=REGISTRO), codigo
+
+def ler_indice(caminho: str) -> np.ndarray:
+    # Entradas do .tidx (ValueError se não for um índice válido); registro incompleto no fim é ignorado
+    return _ler(caminho)[0]
+
+def colunas_csv(caminho_csv: str) -> list:
+    with open(caminho_csv, "rb") as f: return f.readline().decode("utf-8", errors="ignore").strip().split(",")
+
+def tamanho_cabecalho_csv(caminho_csv: str) -> int:
+    with open(caminho_csv, "rb") as f: return len(f.readline())
+
+def indice_atualizado(caminho_csv: str) -> bool:
+    # Mais novo que o CSV e cobrindo o arquivo inteiro (nem CSV reescrito, nem captura pela metade)
+    idx = caminho_indice(caminho_csv)
+    if not os.path.exists(idx) or os.path.getmtime(idx) < os.path.getmtime(caminho_csv): return False
+    try:
+        entradas, codigo = _ler(idx)
+    except (ValueError, OSError):
+        return False
+    colunas = colunas_csv(caminho_csv)
+    if codigo != coluna_indice(colunas) + 1: return False # feito para outra coluna
+    fim = int(entradas["offset"][-1] + entradas["bytes"][-1]) if len(entradas) else tamanho_cabecalho_csv(caminho_csv)
+    return fim == os.path.getsize(caminho_csv)
+
+def construir_indice(caminho_csv: str, linhas_por_entrada: int = LINHAS_POR_ENTRADA) -> str:
+    # Uma passada em blocos de 1 MB (memória constante); grava em .tmp e troca no fim
+    idx = caminho_indice(caminho_csv)
+    tmp = idx + ".tmp"
+    coluna = coluna_indice(colunas_csv(caminho_csv))
+    with open(caminho_csv, "rb") as f, EscritorIndice(tmp, 0, linhas_por_entrada, coluna) as escritor:
+        escritor.offset = len(f.readline()) # cabeçalho
+        resto = b""
+        while True:
+            bloco = f.read(TAM_BLOCO_LEITURA)
+            dados = resto + bloco
+            if not bloco: # última linha sem quebra (gravação interrompida) também entra
+                corte = len(dados)
+            else:
+                corte = dados.rfind(b"\n") + 1
+            parte, resto = dados[:corte], dados[corte:]
+            if parte:
+                fins = np.flatnonzero(np.frombuffer(parte, dtype=np.uint8) == 10) + 1
+                if len(fins) == 0 or fins[-1] != len(parte): fins = np.append(fins, len(parte))
+                tamanhos = np.diff(fins, prepend=0)
+                linhas = parte.decode("utf-8", errors="ignore").split("\n")[:len(tamanhos)]
+                escritor.Adicionar(parte, len(tamanhos), tempos_linhas(linhas, coluna), tamanhos)
+                escritor.Gravar(escritor.Retirar())
+            if not bloco: break
+    os.replace(tmp, idx)
+    return idx
+
+def carregar_indice(caminho_csv: str) -> np.ndarray:
+    # Entradas do índice da sessão; (re)constrói se não existir ou estiver desatualizado
+    if not indice_atualizado(caminho_csv):
+        try:
+            construir_indice(caminho_csv)
+        except OSError:
+            return None # pasta só leitura: quem chama lê o arquivo inteiro
+    return ler_indice(caminho_indice(caminho_csv))
+
+def _primeiro_t(caminho_csv: str, coluna: int):
+    # Tempo da primeira linha válida (origem do tempo_s, como no LeitorSessao)
+    with open(caminho_csv, "r", encoding="utf-8", errors="ignore") as f:
+        f.readline()
+        for linha in f:
+            t = tempos_linhas([linha.strip()], coluna)[0] if linha.count(",") >= coluna else np.nan
+            if np.isfinite(t): return float(t)
+    return None
+
+def carregar_intervalo(caminho_csv: str, t_inicio: float = None, t_fim: float = None) -> pd.DataFrame:
+    """
+    Linhas da sessão com t_inicio <= tempo_s <= t_fim (segundos desde a 1ª amostra, o
+    mesmo eixo do painel), lendo só os grupos do índice que encostam no trecho.
+    Devolve as colunas do CSV mais tempo_s, como o LeitorSessao. A coluna de tempo é
+    achada pelo nome (COLUNAS_TEMPO); sem nenhuma, devolve o arquivo inteiro.
+    """
+    with open(caminho_csv, "rb") as f: header = f.readline()
+    colunas = header.decode("utf-8").strip().split(",")
+    coluna, escala = coluna_tempo(colunas)
+    if coluna is None: return pd.read_csv(caminho_csv, on_bad_lines='skip')
+    t0 = _primeiro_t(caminho_csv, coluna)
+    vazio = pd.DataFrame({c: pd.Series(dtype=np.float64) for c in dict.fromkeys(colunas + ["tempo_s"])})
+    if t0 is None: return vazio
+    lo = -np.inf if t_inicio is None else t0 + t_inicio * escala
+    hi = np.inf if t_fim is None else t0 + t_fim * escala
+    entradas = carregar_indice(caminho_csv)
+    if entradas is None:
+        df = pd.read_csv(caminho_csv, on_bad_lines='skip')
+    else:
+        sel = np.flatnonzero((entradas["t_max"] >= lo) & (entradas["t_min"] <= hi))
+        if len(sel) == 0: return vazio
+        inicio, fim = int(entradas["offset"][sel[0]]), int(entradas["offset"][sel[-1]] + entradas["bytes"][sel[-1]])
+        with open(caminho_csv, "rb") as f:
+            f.seek(inicio)
+            dados = f.read(fim - inicio)
+        df = pd.read_csv(io.BytesIO(header + dados), on_bad_lines='skip')
+    tempo = colunas[coluna]
+    df[tempo] = pd.to_numeric(df[tempo], errors='coerce')
+    df = df[(df[tempo] >= lo) & (df[tempo] <= hi)].reset_index(drop=True)
+    if escala == 1000.0: df[tempo] = df[tempo].astype(np.int64) # t_ms inteiro, como gravado
+    df['tempo_s'] = (df[tempo] - t0) / escala
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Constrói o índice de tempo ({EXTENSAO}) das sessões")
+    parser.add_argument("caminhos", nargs="+", help="arquivos .csv ou pastas (percorridas recursivamente)")
+    parser.add_argument("--forcar", action="store_true", help="reconstrói mesmo se o índice estiver em dia")
+    args = parser.parse_args()
+    arquivos = []
+    for c in args.caminhos:
+        if os.path.isdir(c):
+            for raiz, _, nomes in os.walk(c):
+                arquivos += [os.path.join(raiz, n) for n in nomes if n.endswith(".csv")]
+        else:
+            arquivos.append(c)
+    for arq in sorted(arquivos):
+        try:
+            if args.forcar or not indice_atualizado(arq): construir_indice(arq)
+            print(f"{arq} -> {caminho_indice(arq)} ({len(ler_indice(caminho_indice(arq)))} entradas)")
+        except (ValueError, OSError, UnicodeDecodeError) as e:
+            print(f"Ignorando {arq}: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Leitura serial em lote: em vez de um readline() por amostra (que no pyserial lê byte a
+# byte) e de um decode/strip/count por linha, cada chamada puxa tudo o que está em
+# in_waiting, guarda a linha incompleta do fim para o próximo lote e valida/converte
+# todas as linhas completas de uma vez com NumPy. Linhas de boot, truncadas ou com
+# lixo não entram no arquivo e são contadas como rejeitadas.
+
+MAX_RESTO = 1 << 16 # bytes sem quebra de linha antes de descartar como lixo
+_PERMITIDOS = np.zeros(256, dtype=bool)
+_PERMITIDOS[list(b"0123456789-+.,eE\n")] = True
+_VIRGULA, _FIM = ord(","), ord("\n")
+
+def converter_linhas(bloco: bytes, n_campos: int):
+    # bloco: linhas completas (terminadas em \n). Devolve (texto das linhas válidas,
+    # matriz float64 [n, n_campos], nº de linhas rejeitadas). Linhas vazias são ignoradas.
+    arr = np.frombuffer(bloco, dtype=np.uint8)
+    arr = arr[arr != 13] # \r do println
+    fins = np.flatnonzero(arr == _FIM)
+    if len(fins) == 0: return "", np.zeros((0, n_campos)), 0
+    inicios = np.concatenate(([0], fins[:-1] + 1))
+    tamanhos = fins - inicios
+    # contagens por linha via soma acumulada: vírgulas, bytes inválidos e campos vazios
+    virgula = arr == _VIRGULA
+    proximo = np.concatenate((arr[1:], [_FIM]))
+    vazio = virgula & ((proximo == _VIRGULA) | (proximo == _FIM))
+    vazio[inicios[tamanhos > 0]] |= virgula[inicios[tamanhos > 0]] # vírgula no começo da linha
+    def por_linha(mascara):
+        acum = np.concatenate(([0], np.cumsum(mascara)))
+        return acum[fins] - acum[inicios]
+    validas = (por_linha(virgula) == n_campos - 1) & (por_linha(~_PERMITIDOS[arr]) == 0) & (por_linha(vazio) == 0)
+    validas &= tamanhos > 0
+    rejeitadas = int(np.count_nonzero(~validas & (tamanhos > 0)))
+    if not validas.any(): return "", np.zeros((0, n_campos)), rejeitadas
+    texto = arr[np.repeat(validas, tamanhos + 1)].tobytes().decode()
+    try:
+        matriz = np.array(texto[:-1].replace("\n", ",").split(","), dtype=np.float64).reshape(-1, n_campos)
+    except ValueError:
+        # algum campo passou na triagem mas não é número ("1-2", ".."): separa linha a linha
+        boas, linhas = [], []
+        for linha in texto.splitlines():
+            try:
+                boas.append([float(x) for x in linha.split(",")]); linhas.append(linha)
+            except ValueError:
+                rejeitadas += 1
+        texto = "".join(l + "\n" for l in linhas)
+        matriz = np.array(boas, dtype=np.float64).reshape(-1, n_campos)
+    return texto, matriz, rejeitadas
+
+
+class LeitorSerialLote (object):
+    def __init__(self, serial, qtd_sensores: int = 3):
+        self.serial = serial
+        self.qtd_sensores = qtd_sensores
+        self.n_campos = qtd_sensores * 3 + 1 # p/r/y por sensor + t_ms
+        self.resto = b""
+        self.amostras = 0
+        self.rejeitadas = 0
+        self.bytes = 0
+
+    def getAmostras(self) -> int:
+        return self.amostras
+    def getRejeitadas(self) -> int:
+        return self.rejeitadas
+    def getBytes(self) -> int:
+        return self.bytes
+
+    def Ler(self):
+        # Tudo o que já chegou numa leitura só; sem nada na fila, espera até o timeout da porta
+        n = self.serial.in_waiting
+        dados = self.serial.read(n if n else 1)
+        if not n and dados:
+            dados += self.serial.read(self.serial.in_waiting)
+        return self.Processar(dados)
+
+    def Processar(self, dados: bytes):
+        # Devolve (texto CSV das linhas válidas, matriz [n, n_campos]) do que fechou linha
+        self.bytes += len(dados)
+        bloco = self.resto + dados
+        corte = bloco.rfind(b"\n") + 1
+        self.resto = bloco[corte:]
+        if len(self.resto) > MAX_RESTO: # ruído sem quebra de linha
+            self.resto = b""; self.rejeitadas += 1
+        texto, matriz, rejeitadas = converter_linhas(bloco[:corte], self.n_campos)
+        self.amostras += len(matriz)
+        self.rejeitadas += rejeitadas
+        return texto, matriz
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from formato_binario import COLUNAS_TEMPO, binario_atualizado, carregar_binario, caminho_binario
+from lod import indices_minmax
+
+# Leitura em blocos das sessões (CSV ou .hfb) com tipos compactos: float32 nos ângulos e
+# int64 no t_ms, em vez do float64/object que o pd.read_csv infere. O tempo_s é
+# calculado bloco a bloco e a vista reduzida de cada membro (min/max por balde) é
+# montada sem materializar a sessão, então o pico de memória depende do tamanho do
+# bloco e do número de pontos pedidos, não da duração da gravação.
+
+LINHAS_POR_BLOCO = 65536
+
+def contar_linhas(caminho_csv: str) -> int:
+    # Linhas de dados (sem o cabeçalho), lendo em blocos de 1 MB
+    n, ultimo = 0, b"\n"
+    with open(caminho_csv, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            n += bloco.count(b"\n"); ultimo = bloco[-1:]
+    if ultimo != b"\n": n += 1 # última linha sem quebra
+    return max(0, n - 1)
+
+
+class LeitorSessao (object):
+    def __init__(self, caminho: str, linhas_por_bloco: int = LINHAS_POR_BLOCO):
+        self.caminho = caminho
+        self.linhas_por_bloco = linhas_por_bloco
+        self.binario = binario_atualizado(caminho)
+        if self.binario:
+            try:
+                _, self.colunas, _ = carregar_binario(caminho_binario(caminho))
+            except ValueError:
+                self.binario = False
+        if not self.binario:
+            with open(caminho, 'r') as f: self.colunas = f.readline().strip().split(",")
+        self.coluna_tempo = self.colunas[-1] # o receptor grava o t_ms por último
+
+    def getColunas(self) -> list:
+        return self.colunas
+    def getColunaTempo(self) -> str:
+        return self.coluna_tempo
+
+    def Amostras(self) -> int:
+        if self.binario: return len(carregar_binario(caminho_binario(self.caminho))[0])
+        return contar_linhas(self.caminho)
+
+    def _blocosBrutos(self, tam: int):
+        if self.binario:
+            registros, _, _ = carregar_binario(caminho_binario(self.caminho))
+            for i in range(0, len(registros), tam):
+                fatia = registros[i:i + tam]
+                yield pd.DataFrame({c: fatia[c].astype(np.int64) if c in COLUNAS_TEMPO else np.array(fatia[c]) for c in self.colunas})
+            return
+        # o tempo é lido em float64 para tolerar uma linha truncada (NaN), que é descartada
+        tipos = {c: np.float64 if c == self.coluna_tempo else np.float32 for c in self.colunas}
+        for bloco in pd.read_csv(self.caminho, dtype=tipos, chunksize=tam, on_bad_lines='skip'):
+            bloco = bloco.dropna(subset=[self.coluna_tempo])
+            bloco[self.coluna_tempo] = bloco[self.coluna_tempo].astype(np.int64)
+            yield bloco
+
+    def Blocos(self, tam: int = None):
+        # DataFrames compactos de até `tam` linhas, já com tempo_s (s desde a 1ª amostra)
+        t0 = None
+        for bloco in self._blocosBrutos(tam or self.linhas_por_bloco):
+            if len(bloco) == 0: continue
+            if t0 is None: t0 = int(bloco[self.coluna_tempo].iloc[0])
+            bloco['tempo_s'] = (bloco[self.coluna_tempo] - t0) / 1000.0
+            yield bloco
+
+    def Carregar(self) -> pd.DataFrame:
+        # Sessão inteira com tipos compactos, preenchendo colunas pré-alocadas (sem concat)
+        n = self.Amostras()
+        dados = {c: np.empty(n, dtype=np.int64 if c == self.coluna_tempo else np.float32) for c in self.colunas}
+        dados['tempo_s'] = np.empty(n)
+        i = 0
+        for bloco in self.Blocos():
+            m = min(len(bloco), n - i)
+            for c in dados: dados[c][i:i + m] = bloco[c].values[:m]
+            i += m
+        return pd.DataFrame({c: v[:i] for c, v in dados.items()}, copy=False)
+
+    def VistasPorMembro(self, max_pontos: int, graficos: int, membros: list = None) -> dict:
+        # {membro: DataFrame(tempo_s + p/r/y)} com ~max_pontos pontos, numa passada só
+        membros = range(graficos) if membros is None else membros
+        n_baldes = max(1, max_pontos // 6) # até 6 pontos por balde (min e max de p/r/y)
+        tam_balde = max(1, -(-self.Amostras() // n_baldes))
+        # blocos com um número inteiro de baldes (um balde maior que o bloco é reduzido de novo no fim)
+        tam = max(tam_balde, self.linhas_por_bloco // tam_balde * tam_balde) if tam_balde <= self.linhas_por_bloco else self.linhas_por_bloco
+        partes = {i: [] for i in membros}
+        for bloco in self.Blocos(tam):
+            for i in membros:
+                colunas = ['tempo_s'] + self.colunas[i*3:3 + i*3]
+                sel = indices_minmax(bloco[colunas[1:]].values, -(-len(bloco) // tam_balde))
+                partes[i].append(bloco[colunas].iloc[sel])
+        vistas = {}
+        for i, p in partes.items():
+            df = pd.concat(p, ignore_index=True) if p else pd.DataFrame(columns=['tempo_s'] + self.colunas[i*3:3 + i*3])
+            if tam_balde > self.linhas_por_bloco: # cada bloco virou um balde inteiro: reduz de novo
+                df = df.iloc[indices_minmax(df.iloc[:, 1:].values, n_baldes)].reset_index(drop=True)
+            vistas[i] = df
+        return vistas
@@ -0,0 +1,104 @@
+import numpy as np
+
+# Redução de nível de detalhe (LOD) para os gráficos do Streamlit. Um gráfico de linha
+# não mostra mais pontos do que tem de pixels na horizontal, então cada série é
+# dividida em baldes e de cada balde ficam só o mínimo e o máximo (na ordem do tempo).
+# Picos e espículas de tremor continuam visíveis, ao contrário de uma decimação simples.
+
+PONTOS_TELA = 800 # baldes por gráfico (~ largura útil em pixels)
+QUADROS_POR_S = 10 # taxa de redesenho do gráfico ao vivo
+
+def indices_minmax(y, n_baldes: int, minimos: bool = True) -> np.ndarray:
+    # y: (n,) ou (n, colunas). Devolve os índices, em ordem, do mínimo e do máximo de
+    # cada coluna em cada balde, mais a primeira e a última amostra.
+    # minimos=False guarda só os máximos (espectro de amplitude).
+    y = np.asarray(y)
+    if y.ndim == 1: y = y[:, None]
+    n = len(y)
+    if n <= 2 * max(1, n_baldes): return np.arange(n)
+    tam = -(-n // n_baldes)
+    nb = -(-n // tam)
+    if nb * tam > n: y = np.concatenate((y, np.repeat(y[-1:], nb * tam - n, axis=0))) # completa o último balde
+    blocos = y.reshape(nb, tam, -1)
+    base = (np.arange(nb) * tam)[:, None]
+    partes = [blocos.argmax(axis=1) + base]
+    if minimos: partes.append(blocos.argmin(axis=1) + base)
+    idx = np.minimum(np.concatenate(partes, axis=1).ravel(), n - 1)
+    return np.union1d(idx, [0, n - 1])
+
+
+class PiramideLOD (object):
+    """
+    Níveis de resolução de uma série (x crescente): o nível 0 é a série inteira e cada
+    nível seguinte é a redução min/max do anterior, até caber em ~2 telas. Uma janela
+    de tempo parte do nível mais fino com no máximo fator*max_pontos pontos nela, então
+    aproximar o zoom mostra mais detalhe sem reprocessar a série inteira.
+    """
+    def __init__(self, x, y, fator: int = 8, min_pontos: int = PONTOS_TELA):
+        self.fator = fator
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        if self.y.ndim == 1: self.y = self.y[:, None]
+        self.niveis = [np.arange(len(self.x))]
+        while len(self.niveis[-1]) > 2 * min_pontos:
+            idx = self.niveis[-1]
+            self.niveis.append(idx[indices_minmax(self.y[idx], len(idx) // fator)])
+
+    def getNiveis(self) -> int:
+        return len(self.niveis)
+
+    def Janela(self, x_ini: float = None, x_fim: float = None, max_pontos: int = PONTOS_TELA) -> np.ndarray:
+        # Índices (da série original) a desenhar entre x_ini e x_fim
+        x_ini = self.x[0] if x_ini is None else x_ini
+        x_fim = self.x[-1] if x_fim is None else x_fim
+        for idx in self.niveis:
+            xs = self.x[idx]
+            i0, i1 = np.searchsorted(xs, x_ini, 'left'), np.searchsorted(xs, x_fim, 'right')
+            sel = idx[i0:i1]
+            if len(sel) <= self.fator * max_pontos: break # nível mais fino que ainda é barato reduzir
+        if len(sel) > 2 * max_pontos: sel = sel[indices_minmax(self.y[sel], max_pontos)]
+        return sel
+
+
+class SerieLOD (object):
+    """
+    Série ao vivo já reduzida: recebe lotes, fecha baldes de `tam` amostras em pares
+    min/max e, quando os pontos passam de 2*max_pontos, junta os baldes dois a dois
+    (tam dobra). Memória e custo de desenho ficam limitados a ~max_pontos, qualquer que
+    seja a duração da coleta.
+    """
+    def __init__(self, max_pontos: int = PONTOS_TELA):
+        self.max_pontos = max_pontos
+        self.tam = 1
+        self.x = np.zeros(0); self.y = np.zeros(0) # pontos reduzidos
+        self.px = np.zeros(0); self.py = np.zeros(0) # amostras do balde em aberto
+
+    def limpar(self):
+        self.__init__(self.max_pontos)
+
+    def appendLote(self, x, y):
+        self.px = np.concatenate((self.px, x)); self.py = np.concatenate((self.py, y))
+        self._fecharBaldes()
+        while len(self.x) > 2 * self.max_pontos:
+            self.tam *= 2
+            # cada balde novo = 2 baldes antigos = 4 pontos min/max -> 2 pontos
+            n = len(self.x) - len(self.x) % 4
+            self._reduzir(n)
+
+    def _fecharBaldes(self):
+        n = len(self.px) - len(self.px) % self.tam
+        if n == 0: return
+        bx, by = self.px[:n], self.py[:n]
+        if self.tam > 1:
+            sel = indices_minmax(by, n // self.tam)
+            bx, by = bx[sel], by[sel]
+        self.x = np.concatenate((self.x, bx)); self.y = np.concatenate((self.y, by))
+        self.px, self.py = self.px[n:], self.py[n:]
+
+    def _reduzir(self, n: int):
+        sel = indices_minmax(self.y[:n], n // 4)
+        self.x = np.concatenate((self.x[:n][sel], self.x[n:])); self.y = np.concatenate((self.y[:n][sel], self.y[n:]))
+
+    def Pontos(self):
+        # (x, y) para desenhar: baldes fechados + amostras do balde em aberto
+        return np.concatenate((self.x, self.px)), np.concatenate((self.y, self.py))
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from io import BytesIO as _BytesIO
+import numpy as np
+from biomecanica import processar_biomecanica, calcular_metricas, analise_tremor
+from formato_binario import carregar_sessao
+
+# Armazém de resultados derivados (SQLite): o que o processar_biomecanica e o painel
+# calculam é função determinística do arquivo da sessão + peso/altura/gênero/exercício.
+# A chave é o hash do conteúdo do arquivo mais esses parâmetros (e a versão do
+# algoritmo), então reabrir um painel vira uma consulta e qualquer mudança no arquivo
+# ou nos parâmetros cai numa chave nova e é recalculada.
+
+ARQUIVO_DB = "metricas.sqlite"
+VERSAO_METRICAS = 3 # incrementar quando o motor biomecânico mudar (2: tremor por janela, 3: arrays em float64)
+ESCALARES = ("amplitude", "jerk", "forca_kg", "torque_max", "energia", "freq_pico", "m_seg")
+ARRAYS = ("t", "ang", "torque", "forca", "xf", "yf", "tremor_t", "tremor_rms", "tremor_freq")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    caminho TEXT PRIMARY KEY, mtime REAL, tamanho INTEGER, hash TEXT
+);
+CREATE TABLE IF NOT EXISTS metricas (
+    chave TEXT PRIMARY KEY, hash TEXT, exercicio TEXT, peso REAL, altura REAL, genero TEXT,
+    versao INTEGER, escalares TEXT, amostras INTEGER, arrays BLOB
+);
+"""
+
+def hash_arquivo(caminho: str) -> str:
+    h = hashlib.sha1()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""): h.update(bloco)
+    return h.hexdigest()
+
+def chave_metricas(hash_sessao: str, exercicio: str, peso: float, altura: float, genero: str) -> str:
+    return f"{hash_sessao}|{exercicio}|{float(peso):.3f}|{float(altura):.3f}|{genero}|v{VERSAO_METRICAS}"
+
+def calcular_resultado(df, exercicio: str, peso: float, altura: float, genero: str) -> dict:
+    t, ang, torque, forca, energia, m_seg = processar_biomecanica(df, exercicio, peso, altura, genero)
+    res = {"t": np.asarray(t, dtype=np.float64), "ang": np.asarray(ang, dtype=np.float64),
+           "torque": np.asarray(torque, dtype=np.float64), "forca": np.asarray(forca, dtype=np.float64),
+           "energia": float(energia), "m_seg": float(m_seg)}
+    metricas = calcular_metricas(t, ang, torque, forca, energia)
+    if metricas is None:
+        res.update({k: 0.0 for k in ESCALARES if k not in res})
+        res["xf"] = res["yf"] = np.zeros(0)
+    else:
+        res.update(metricas)
+    res.update(resultado_tremor(analise_tremor(df, exercicio) if metricas is not None else None))
+    return res
+
+def resultado_tremor(tremor: dict) -> dict:
+    # Séries do espectro por janela (espectro.tremor_por_janela) com os nomes do armazém
+    if tremor is None: return {k: np.zeros(0) for k in ("tremor_t", "tremor_rms", "tremor_freq")}
+    return {"tremor_t": tremor["t"], "tremor_rms": tremor["rms"], "tremor_freq": tremor["freq_tremor"]}
+
+
+class ArmazemMetricas (object):
+    def __init__(self, caminho_db: str):
+        self.caminho_db = caminho_db
+        self.trava = threading.Lock()
+        with self._conectar() as con: con.executescript(_SCHEMA)
+        self.Limpar() # versões antigas do algoritmo e arquivos que sumiram
+
+    def getCaminhoDB(self) -> str:
+        return self.caminho_db
+
+    @contextmanager
+    def _conectar(self):
+        # conexão curta por operação (o Streamlit chama de várias threads); commit ao sair
+        con = sqlite3.connect(self.caminho_db, timeout=10)
+        try:
+            with con: yield con
+        finally:
+            con.close()
+
+    def HashSessao(self, caminho: str) -> str:
+        # O hash do conteúdo só é recalculado quando mtime/tamanho mudam
+        st = os.stat(caminho)
+        with self._conectar() as con:
+            row = con.execute("SELECT mtime, tamanho, hash FROM arquivos WHERE caminho = ?", (caminho,)).fetchone()
+            if row and row[0] == st.st_mtime and row[1] == st.st_size: return row[2]
+            h = hash_arquivo(caminho)
+            con.execute("INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?)", (caminho, st.st_mtime, st.st_size, h))
+        return h
+
+    def Buscar(self, chave: str):
+        with self._conectar() as con:
+            row = con.execute("SELECT escalares, arrays FROM metricas WHERE chave = ?", (chave,)).fetchone()
+        if row is None: return None
+        res = json.loads(row[0])
+        with np.load(_BytesIO(row[1])) as npz:
+            for k in ARRAYS: res[k] = npz[k].astype(np.float64, copy=False)
+        return res
+
+    def Guardar(self, chave: str, hash_sessao: str, exercicio: str, peso: float, altura: float, genero: str, res: dict):
+        buf = _BytesIO()
+        np.savez(buf, **{k: np.asarray(res[k], dtype=np.float64) for k in ARRAYS}) # float64: do cache sai o mesmo que do cálculo
+        escalares = json.dumps({k: float(res[k]) for k in ESCALARES})
+        with self.trava, self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO metricas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (chave, hash_sessao, exercicio, float(peso), float(altura), genero,
+                         VERSAO_METRICAS, escalares, len(res["t"]), buf.getvalue()))
+
+    def Obter(self, caminho: str, exercicio: str, peso: float, altura: float, genero: str, carregar=None) -> dict:
+        # Resultado do cache se a chave bater; senão carrega (carregar() ou o arquivo), calcula e guarda
+        hash_sessao = self.HashSessao(caminho)
+        chave = chave_metricas(hash_sessao, exercicio, peso, altura, genero)
+        res = self.Buscar(chave)
+        if res is not None: return res
+        df = carregar() if carregar is not None else carregar_sessao(caminho)
+        res = calcular_resultado(df, exercicio, peso, altura, genero)
+        self.Guardar(chave, hash_sessao, exercicio, peso, altura, genero, res)
+        return res
+
+    def Limpar(self, manter_hashes: set = None):
+        # Remove resultados de arquivos que não existem mais (ou cujo conteúdo mudou) e de
+        # versões antigas do algoritmo; manter_hashes restringe ainda mais
+        with self.trava, self._conectar() as con:
+            con.execute("DELETE FROM metricas WHERE versao != ?", (VERSAO_METRICAS,))
+            for (c,) in con.execute("SELECT caminho FROM arquivos").fetchall():
+                if not os.path.exists(c): con.execute("DELETE FROM arquivos WHERE caminho = ?", (c,))
+            con.execute("DELETE FROM metricas WHERE hash NOT IN (SELECT hash FROM arquivos)")
+            if manter_hashes is not None:
+                for (h,) in con.execute("SELECT DISTINCT hash FROM metricas").fetchall():
+                    if h not in manter_hashes: con.execute("DELETE FROM metricas WHERE hash = ?", (h,))
+
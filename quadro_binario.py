@@ -0,0 +1,164 @@
+import json
+import struct
+import numpy as np
+from buffers import COLUNAS_AMOSTRA
+from canal_ao_vivo import amostra_de_json
+
+# Quadro binário opcional do ESP32 (wififinal.ino, comando 'b'; 'j' volta ao JSON).
+# Cada amostra ocupa 46 bytes em vez de ~250 de texto JSON, little-endian:
+#   u16 sincronismo 0x5AA5 (bytes A5 5A) | u16 sequência | u32 millis |
+#   9 x float32 (p1,r1,y1,p2,r2,y2,p3,r3,y3) | u16 CRC-16/CCITT-FALSE dos bytes 2..43
+# Os ângulos vão em float32 porque o yaw é integrado sem limite e estouraria um int16
+# em centésimos de grau. As mensagens de controle (HEARTBEAT, CAL_*, ZERO_DONE)
+# continuam em JSON, então o mesmo fluxo mistura os dois formatos: o decodificador
+# reconhece cada um pelo primeiro byte e, depois de lixo ou CRC errado, procura o
+# próximo sincronismo ou '{'.
+
+SINC = 0x5AA5
+SINC_BYTES = struct.pack("<H", SINC)
+QUADRO = struct.Struct("<HHI9fH")
+TAM_QUADRO = QUADRO.size # 46
+DTYPE_QUADRO = np.dtype([("sinc", "<u2"), ("seq", "<u2"), ("millis", "<u4"), ("ang", "<f4", (9,)), ("crc", "<u2")])
+MAX_LINHA_JSON = 1024 # '{' sem '\n' depois disso é lixo
+
+def _tabela_crc16() -> np.ndarray:
+    tabela = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8): crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        tabela[i] = crc & 0xFFFF
+    return tabela
+
+_TABELA_CRC = _tabela_crc16()
+
+def crc16(dados: bytes) -> int:
+    # CRC-16/CCITT-FALSE (polinômio 0x1021, início 0xFFFF), o mesmo do firmware
+    crc = 0xFFFF
+    for b in dados:
+        crc = ((crc << 8) & 0xFFFF) ^ int(_TABELA_CRC[(crc >> 8) ^ b])
+    return crc
+
+def crc16_lote(bytes_quadros: np.ndarray) -> np.ndarray:
+    # bytes_quadros: uint8 [n, m]. Um passo da tabela por coluna, todos os quadros juntos
+    crc = np.full(len(bytes_quadros), 0xFFFF, dtype=np.uint16)
+    for j in range(bytes_quadros.shape[1]):
+        crc = (crc << 8) ^ _TABELA_CRC[(crc >> 8) ^ bytes_quadros[:, j]]
+    return crc
+
+def montar_quadro(seq: int, millis: int, angulos) -> bytes:
+    # angulos: 9 valores na ordem p1,r1,y1,...,y3 (usado pelo emulador e nos testes)
+    corpo = QUADRO.pack(SINC, seq & 0xFFFF, millis & 0xFFFFFFFF, *angulos, 0)[2:-2]
+    return SINC_BYTES + corpo + struct.pack("<H", crc16(corpo))
+
+
+class DecodificadorFluxo (object):
+    """
+    Decodifica um fluxo de bytes com linhas JSON e quadros binários misturados.
+    Processar(dados) devolve (amostras [n, len(COLUNAS_AMOSTRA)] na ordem de chegada,
+    lista de mensagens de controle); o que ficou incompleto no fim aguarda o próximo
+    lote. Sequências de quadros colados são validadas (sincronismo + CRC) e convertidas
+    de uma vez com np.frombuffer.
+    """
+    def __init__(self):
+        self.resto = b""
+        self.ultima_seq = None
+        self.amostras_json = 0
+        self.quadros = 0
+        self.crc_invalidos = 0
+        self.json_invalidos = 0
+        self.bytes_descartados = 0
+        self.perdidos = 0 # buracos na sequência dos quadros binários
+
+    def getQuadros(self) -> int:
+        return self.quadros
+    def getAmostrasJson(self) -> int:
+        return self.amostras_json
+    def getRejeitadas(self) -> int:
+        return self.crc_invalidos + self.json_invalidos
+    def getBytesDescartados(self) -> int:
+        return self.bytes_descartados
+    def getPerdidos(self) -> int:
+        return self.perdidos
+
+    def Processar(self, dados: bytes):
+        buf = self.resto + dados
+        n = len(buf)
+        partes, controles = [], []
+        linhas = [] # amostras JSON ainda não juntadas em partes (mantém a ordem)
+        pos = 0
+        while pos < n:
+            c = buf[pos]
+            if c == 0xA5:
+                if n - pos < 2: break
+                if buf[pos + 1] == 0x5A:
+                    k = (n - pos) // TAM_QUADRO
+                    if k == 0: break # quadro incompleto
+                    bons = self._quadros(buf, pos, k)
+                    if bons:
+                        if linhas: partes.append(np.array(linhas, dtype=np.float64)); linhas = []
+                        partes.append(bons[1])
+                        pos += bons[0] * TAM_QUADRO
+                        continue
+                    self.crc_invalidos += 1
+                pos = self._ressincronizar(buf, pos + 1)
+            elif c == 0x7B: # '{'
+                if n - pos < 2: break
+                if buf[pos + 1] != 0x22: # toda linha do firmware começa com {"
+                    pos = self._ressincronizar(buf, pos + 1)
+                    continue
+                fim = buf.find(b"\n", pos)
+                if fim < 0:
+                    if n - pos <= MAX_LINHA_JSON: break # linha ainda chegando
+                    self.json_invalidos += 1
+                    pos = self._ressincronizar(buf, pos + 1)
+                    continue
+                try:
+                    d = json.loads(buf[pos:fim])
+                    if 'type' in d:
+                        controles.append(d)
+                    elif 'sensor1' in d:
+                        linhas.append(amostra_de_json(d)); self.amostras_json += 1
+                    else:
+                        self.json_invalidos += 1
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    # um quadro binário pode ter caído no meio da linha: recomeça depois do '{'
+                    self.json_invalidos += 1
+                    pos = self._ressincronizar(buf, pos + 1)
+                    continue
+                pos = fim + 1
+            elif c in b"\r\n ":
+                pos += 1
+            else:
+                pos = self._ressincronizar(buf, pos)
+        self.resto = buf[pos:]
+        if linhas: partes.append(np.array(linhas, dtype=np.float64))
+        if not partes: return np.zeros((0, len(COLUNAS_AMOSTRA))), controles
+        return np.concatenate(partes), controles
+
+    def _ressincronizar(self, buf: bytes, pos: int) -> int:
+        # Pula até o próximo candidato a início (A5 ou '{'), contando o lixo
+        candidatos = [i for i in (buf.find(b"\xa5", pos), buf.find(b"{", pos)) if i >= 0]
+        prox = min(candidatos) if candidatos else len(buf)
+        self.bytes_descartados += prox - pos
+        return prox
+
+    def _quadros(self, buf: bytes, pos: int, k: int):
+        # Até k quadros colados a partir de pos: devolve (nº de quadros válidos, amostras)
+        # ou None se o primeiro não fecha o CRC
+        brutos = np.frombuffer(buf, dtype=np.uint8, count=k * TAM_QUADRO, offset=pos).reshape(k, TAM_QUADRO)
+        sinc = (brutos[:, 0] == 0xA5) & (brutos[:, 1] == 0x5A)
+        k = int(np.argmin(sinc)) if not sinc.all() else k
+        crc = brutos[:k, 44].astype(np.uint16) | (brutos[:k, 45].astype(np.uint16) << 8)
+        ok = crc16_lote(brutos[:k, 2:44]) == crc
+        k = int(np.argmin(ok)) if not ok.all() else k
+        if k == 0: return None
+        registros = np.frombuffer(buf, dtype=DTYPE_QUADRO, count=k, offset=pos)
+        amostras = np.empty((k, len(COLUNAS_AMOSTRA)))
+        amostras[:, 0] = registros["millis"]
+        amostras[:, 1:] = registros["ang"]
+        seq = registros["seq"].astype(np.int64)
+        if self.ultima_seq is not None: seq = np.concatenate(([self.ultima_seq], seq))
+        self.perdidos += int(((np.diff(seq) - 1) % 65536).sum())
+        self.ultima_seq = int(seq[-1])
+        self.quadros += k
+        return k, amostras
@@ -1,6 +1,8 @@
 import serial
 import time
 from datetime import datetime
+from escritor import EscritorLote
+from leitor_serial import LeitorSerialLote
 
 # --- 1. CONFIGURE A PORTA COM AQUI ---
 # Esta é a porta "Outgoing" do Bluetooth (ex: "COM5")
@@ -22,27 +24,27 @@ except serial.SerialException as e:
 fname = f"HOMEFISIO_DADOS_2_SENSORES_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
 print(f"Salvando dados em: {fname}")
 
-with open(fname, "w", encoding="utf-8", newline='') as f:
+# Gravação em lote numa thread de fundo (flush a cada 64 KB ou 250 ms, fsync a cada 1 s)
+with EscritorLote(fname) as f:
     
     # Cabeçalho correto para 2 sensores
     header = "p1,r1,y1,p2,r2,y2,t_ms\n"
-    f.write(header)
+    f.EscreverBloco(header)
     print(f"Gravando cabeçalho: {header.strip()}")
     print("Ouvindo dados... Pressione Ctrl+C para parar.")
 
+    # Leitura em lote: tudo o que está em in_waiting de uma vez, validado e convertido com NumPy
+    leitor = LeitorSerialLote(ser, qtd_sensores=2)
     try:
         while True:
             try:
-                line = ser.readline().decode(errors="ignore").strip()
+                texto, matriz = leitor.Ler()
                 
-                # Filtro: Só salva linhas que parecem dados (6 vírgulas para 7 colunas)
-                if line and line.count(',') == 6: 
-                    print(line)
-                    f.write(line + "\n")
-                    f.flush()
-                # Opcional: mostra as mensagens de boot que foram ignoradas
-                # elif line:
-                #    print(f"Ignorando linha de boot/lixo: {line}")
+                # Filtro: Só salva linhas que parecem dados (6 vírgulas para 7 colunas);
+                # boot/lixo fica só no contador de rejeitadas
+                if len(matriz):
+                    print(texto.rsplit("\n", 2)[-2]) # última amostra do lote
+                    f.EscreverBloco(texto, len(matriz))
                     
             except serial.SerialException as e:
                 print(f"Erro de leitura serial: {e}. Desconectado.")
@@ -53,4 +55,5 @@ with open(fname, "w", encoding="utf-8", newline='') as f:
 
 ser.close()
 print("Conexao encerrada.")
+print(f"Amostras: {leitor.getAmostras()}  Linhas rejeitadas (boot/lixo): {leitor.getRejeitadas()}")
 print(f"Arquivo salvo em: {fname}")
\ No newline at end of file
@@ -0,0 +1,133 @@
+from functools import lru_cache
+import numpy as np
+
+# Relatório científico em Matplotlib. Usa a API orientada a objetos (Figure) em vez do
+# pyplot: não depende de backend interativo nem de estado global, então serve tanto
+# para o st.pyplot quanto para os processos do gerador em lote.
+# O Matplotlib e o SciPy só são importados quando um relatório é gerado: o dashboard
+# importa este módulo pelas cores e não paga ~1 s de import para mostrar a tela inicial.
+
+# Estilo científico e paleta (as mesmas do dashboard)
+ESTILO_GRAFICOS = 'seaborn-v0_8-whitegrid'
+COLOR_PRIMARY = "#006A6A"
+COLOR_SECONDARY = "#2ecc71"
+
+PONTOS_CICLO = 100 # grade 0-100% do ensemble
+
+@lru_cache(maxsize=None)
+def aplicar_estilo():
+    # Uma vez por processo (as Figures criadas depois herdam o rcParams)
+    import matplotlib.style
+    matplotlib.style.use(ESTILO_GRAFICOS)
+
+@lru_cache(maxsize=64)
+def coeficientes_butter(ordem: int, corte_hz: float, fs: float) -> tuple:
+    # (b, a) do passa-baixas; as sessões repetem a mesma taxa, então o projeto do filtro sai do cache
+    from scipy.signal import butter
+    return butter(ordem, corte_hz / (0.5 * fs), btype='low')
+
+def normalizar_ciclos(y, picos, n_pontos: int = PONTOS_CICLO, min_amostras: int = 10):
+    """
+    Reamostra todos os ciclos (de um pico ao seguinte) para a grade 0-100%.
+    Ciclos com o mesmo nº de amostras compartilham a grade de entrada, então cada
+    grupo vira uma única spline cúbica sobre uma matriz (mesma spline not-a-knot do
+    interp1d(kind='cubic'), sem um objeto por ciclo).
+    Devolve (ciclos [n_ciclos, n_pontos], média, desvio padrão); sem ciclos, matriz vazia e None.
+    """
+    from scipy.interpolate import make_interp_spline
+    y = np.asarray(y, dtype=np.float64)
+    picos = np.asarray(picos, dtype=np.int64)
+    x_norm = np.linspace(0, 100, n_pontos)
+    if len(picos) < 2: return np.empty((0, n_pontos)), None, None
+    inicios, tamanhos = picos[:-1], np.diff(picos)
+    validos = tamanhos > min_amostras
+    inicios, tamanhos = inicios[validos], tamanhos[validos]
+    ciclos = np.empty((len(inicios), n_pontos))
+    if len(inicios) == 0: return ciclos, None, None
+    for n in np.unique(tamanhos):
+        sel = np.flatnonzero(tamanhos == n)
+        bloco = y[inicios[sel, None] + np.arange(n)] # (ciclos do grupo, n)
+        ciclos[sel] = make_interp_spline(np.linspace(0, 100, n), bloco, k=3, axis=1)(x_norm)
+    return ciclos, ciclos.mean(axis=0), ciclos.std(axis=0)
+
+# ==============================================================================
+# MÓDULO NOVO: RELATÓRIO CIENTÍFICO (OCTAVE STYLE)
+# ==============================================================================
+def gerar_relatorio_octave(t_in, y_in, titulo, tremor_rms=None):
+    """
+    Replica a análise avançada do seu script Octave:
+    1. Filtro Butterworth 4ª ordem (Sinais)
+    2. Ensemble Averaging (Consistência de Ciclos)
+    3. Retrato de Fase (Coordenação)
+    4. FFT com Zona de Tremor
+    tremor_rms: RMS na banda de tremor por janela (espectro.py), de preferência do ângulo
+    antes da média móvel; sem ele é calculado sobre y_in.
+    """
+    from matplotlib.figure import Figure
+    from espectro import espectro_amplitude, tremor_por_janela, LIMIAR_TREMOR_GRAUS
+    from scipy.signal import filtfilt, find_peaks
+    aplicar_estilo()
+    
+    # 1. Preparação (Similar ao Octave)
+    t = np.array(t_in); t = t - t[0]
+    dt = np.mean(np.diff(t))
+    fs = 1/dt if dt > 0 else 50
+    y_raw = np.array(y_in)
+
+    # 2. Filtro Butterworth (Igual ao Octave 'butter')
+    b, a = coeficientes_butter(4, 6.0, round(float(fs), 6)) # 6Hz cutoff
+    y_filt = filtfilt(b, a, y_raw)
+    
+    # Velocidade (Gradiente)
+    v = np.gradient(y_filt, dt)
+
+    # 3. Segmentação de Ciclos (FindPeaks)
+    data_range = np.max(y_filt) - np.min(y_filt)
+    peaks, _ = find_peaks(y_filt, prominence=data_range*0.25, distance=int(fs*0.8))
+    
+    # 4. Ensemble (Normalização 0-100%)
+    cycles_norm, mean_c, std_c = normalizar_ciclos(y_filt, peaks)
+
+    # 5. FFT (média por janelas em sessões longas) e tremor por janela
+    freqs, P1 = espectro_amplitude(y_filt, fs)
+    if tremor_rms is None: tremor_rms = tremor_por_janela(y_raw, fs)["rms"]
+
+    # --- PLOTAGEM CIENTÍFICA (MATPLOTLIB) ---
+    fig = Figure(figsize=(12, 8))
+    gs = fig.add_gridspec(2, 2)
+    
+    # G1: Ensemble (Consistência)
+    ax1 = fig.add_subplot(gs[0, :]) # Ocupa topo
+    if len(cycles_norm):
+        ax1.plot(np.linspace(0,100,100), cycles_norm.T, color='gray', alpha=0.1) # todos os ciclos numa chamada
+        ax1.plot(np.linspace(0,100,100), mean_c, color=COLOR_PRIMARY, linewidth=2, label='Média')
+        ax1.fill_between(np.linspace(0,100,100), mean_c-std_c, mean_c+std_c, color=COLOR_PRIMARY, alpha=0.2)
+        ax1.text(50, np.max(mean_c), f"ROM Médio: {np.ptp(mean_c):.1f}°", ha='center', fontweight='bold')
+    else:
+        ax1.plot(t, y_filt, color=COLOR_PRIMARY)
+        ax1.text(np.mean(t), np.mean(y_filt), "Ciclos não detectados (Série Contínua)", ha='center')
+    ax1.set_title(f"1. Padrão Motor e Consistência - {titulo}", fontweight='bold')
+    ax1.set_xlabel("% do Ciclo"); ax1.set_ylabel("Ângulo (°)")
+
+    # G2: Retrato de Fase
+    ax2 = fig.add_subplot(gs[1, 0])
+    sc = ax2.scatter(y_filt, v, c=t, cmap='viridis', s=5, alpha=0.5)
+    ax2.set_title("2. Coordenação (Retrato de Fase)", fontweight='bold')
+    ax2.set_xlabel("Posição (°)"); ax2.set_ylabel("Velocidade (°/s)")
+    fig.colorbar(sc, ax=ax2, label="Tempo")
+
+    # G3: FFT
+    ax3 = fig.add_subplot(gs[1, 1])
+    ax3.plot(freqs, P1, 'k', linewidth=1)
+    ax3.set_xlim(0, 10)
+    # Zona de tremor (4-8Hz) - Igual ao Octave
+    yl = ax3.get_ylim()
+    ax3.fill_between([4, 8], 0, yl[1], color='red', alpha=0.1, label='Tremor')
+    if len(tremor_rms):
+        ax3.text(0.98, 0.95, f"Tremor (> {LIMIAR_TREMOR_GRAUS}° RMS em 4-8 Hz): {100 * np.mean(np.asarray(tremor_rms) > LIMIAR_TREMOR_GRAUS):.0f}% do tempo",
+                 transform=ax3.transAxes, ha='right', va='top', fontsize=8)
+    ax3.set_title("3. Fluidez (FFT)", fontweight='bold')
+    ax3.set_xlabel("Hz"); ax3.set_ylabel("Mag")
+    
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from indice_sessoes import IndiceSessoes
+
+# Gerador de relatórios em lote (sem Streamlit): percorre database_pacientes, gera o
+# relatório científico de cada sessão num pool de processos e grava PNG/PDF em disco.
+# O progresso fica em <saida>/.progresso.json: relatórios já em dia (mesmo mtime de
+# entrada e mesma versão) são pulados, então uma execução interrompida continua de onde
+# parou. Uso: python relatorios_lote.py [--pasta database_pacientes] [--saida relatorios]
+
+DB_FOLDER = "database_pacientes"
+PASTA_SAIDA = "relatorios"
+ARQUIVO_PROGRESSO = ".progresso.json"
+VERSAO_RELATORIO = 1 # incrementar quando o layout/análise do relatório mudar
+FORMATOS = ("png", "pdf")
+PADRAO_PACIENTE = {"weight": 70.0, "height": 1.70, "gender": "Masculino", "exercise": "Geral"}
+
+def _iniciar_processo():
+    # Backend não interativo e estilo aplicados uma vez por processo do pool
+    import matplotlib
+    matplotlib.use("Agg")
+    from relatorio import aplicar_estilo
+    aplicar_estilo()
+
+def gerar_relatorio_sessao(tarefa: dict) -> dict:
+    # Executa no processo filho: carrega, processa, desenha e salva (arquivo temporário + rename)
+    from formato_binario import carregar_sessao
+    from biomecanica import processar_biomecanica, analise_tremor
+    from relatorio import gerar_relatorio_octave
+    inicio = time.perf_counter()
+    try:
+        df = carregar_sessao(tarefa["caminho"])
+        t, ang, _, _, _, _ = processar_biomecanica(df, tarefa["exercise"], tarefa["weight"], tarefa["height"], tarefa["gender"])
+        if len(t) < 3: raise ValueError("sessão curta demais para o relatório")
+        fig = gerar_relatorio_octave(t, ang, tarefa["exercise"], analise_tremor(df, tarefa["exercise"])["rms"])
+        os.makedirs(os.path.dirname(tarefa["destino"]), exist_ok=True)
+        for fmt in tarefa["formatos"]:
+            tmp = f"{tarefa['destino']}.tmp.{fmt}"
+            fig.savefig(tmp, format=fmt, dpi=120)
+            os.replace(tmp, f"{tarefa['destino']}.{fmt}")
+        erro = None
+    except Exception as e: # um arquivo ruim não derruba o lote
+        erro = f"{type(e).__name__}: {e}"
+    return {"chave": tarefa["chave"], "mtime": tarefa["mtime"], "erro": erro, "tempo": time.perf_counter() - inicio}
+
+
+class GeradorRelatorios (object):
+    def __init__(self, pasta: str = DB_FOLDER, saida: str = PASTA_SAIDA, formatos: tuple = FORMATOS, max_processos: int = None):
+        self.pasta = pasta
+        self.saida = saida
+        self.formatos = tuple(formatos)
+        self.max_processos = max_processos or os.cpu_count()
+        self.caminho_progresso = os.path.join(saida, ARQUIVO_PROGRESSO)
+        self.progresso = self._carregarProgresso()
+
+    def _carregarProgresso(self) -> dict:
+        try:
+            with open(self.caminho_progresso, 'r') as f: return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _salvarProgresso(self):
+        os.makedirs(self.saida, exist_ok=True)
+        tmp = self.caminho_progresso + ".tmp"
+        with open(tmp, 'w') as f: json.dump(self.progresso, f)
+        os.replace(tmp, self.caminho_progresso)
+
+    def _emDia(self, chave: str, mtime: float, destino: str) -> bool:
+        feito = self.progresso.get(chave)
+        return (feito is not None and feito.get("mtime") == mtime and feito.get("versao") == VERSAO_RELATORIO
+                and all(os.path.exists(f"{destino}.{fmt}") for fmt in self.formatos))
+
+    def Tarefas(self, forcar: bool = False) -> list:
+        tarefas = []
+        for paciente in sorted(os.listdir(self.pasta)):
+            pasta_p = os.path.join(self.pasta, paciente)
+            if not os.path.isdir(pasta_p): continue
+            for nome, resumo in IndiceSessoes(pasta_p).Atualizar():
+                chave = f"{paciente}/{nome}"
+                destino = os.path.join(self.saida, paciente, os.path.splitext(nome)[0])
+                if not forcar and self._emDia(chave, resumo["mtime"], destino): continue
+                tarefa = {k: resumo.get(k, v) for k, v in PADRAO_PACIENTE.items()}
+                tarefa.update({"chave": chave, "caminho": os.path.join(pasta_p, nome), "mtime": resumo["mtime"],
+                               "destino": destino, "formatos": self.formatos})
+                tarefas.append(tarefa)
+        return tarefas
+
+    def Executar(self, forcar: bool = False) -> dict:
+        tarefas = self.Tarefas(forcar)
+        print(f"{len(tarefas)} relatórios a gerar ({self.max_processos} processos)")
+        ok = falhas = 0
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(self.max_processos, initializer=_iniciar_processo) as pool:
+            futuros = [pool.submit(gerar_relatorio_sessao, t) for t in tarefas]
+            for i, fut in enumerate(as_completed(futuros), 1):
+                r = fut.result()
+                if r["erro"] is None:
+                    ok += 1
+                    self.progresso[r["chave"]] = {"mtime": r["mtime"], "versao": VERSAO_RELATORIO}
+                    self._salvarProgresso() # cada relatório concluído já conta numa retomada
+                    print(f"[{i}/{len(tarefas)}] {r['chave']}  {r['tempo']:.2f} s")
+                else:
+                    falhas += 1
+                    print(f"[{i}/{len(tarefas)}] {r['chave']}  ERRO {r['erro']}")
+        print(f"Concluído em {time.perf_counter() - inicio:.1f} s: {ok} gerados, {falhas} falhas")
+        return {"gerados": ok, "falhas": falhas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os relatórios científicos de todas as sessões")
+    parser.add_argument("--pasta", default=DB_FOLDER)
+    parser.add_argument("--saida", default=PASTA_SAIDA)
+    parser.add_argument("--formatos", nargs="+", default=list(FORMATOS), choices=["png", "pdf", "svg"])
+    parser.add_argument("--processos", type=int)
+    parser.add_argument("--forcar", action="store_true", help="regera mesmo os relatórios em dia")
+    args = parser.parse_args()
+    GeradorRelatorios(args.pasta, args.saida, args.formatos, args.processos).Executar(args.forcar)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Reordenação por t_ms (millis do ESP32) antes da gravação e da análise. Amostras
+# chegam fora de ordem (POSTs HTTP concorrentes do App, reenvio depois de um reset da
+# UART) ou repetidas, e o np.interp do processar_biomecanica assume tempo crescente:
+# uma inversão vira derivada explodindo. Na captura, o BufferReordenacao segura cada
+# amostra por no máximo `atraso_ms` (no relógio do ESP32 ou no do PC, o que vencer
+# primeiro), solta em ordem, descarta duplicadas e as que chegaram tarde demais e
+# marca os buracos. Para o que já foi gravado, reparar_csv faz o mesmo em lote.
+
+ATRASO_MS = 40 # ~2 amostras a 50 Hz
+TOLERANCIA_BURACO = 1.5 # intervalo > 1.5 período é buraco
+MAX_LACUNAS = 1000 # lacunas guardadas para relatório (a contagem continua)
+MIN_AMOSTRAS_PERIODO = 20
+LIMITE_REINICIO_MS = 5000 # t_ms voltando mais que isso: o ESP32 reiniciou (millis() zerou)
+
+def ordem_monotonica(t) -> np.ndarray:
+    # Índices que deixam t estritamente crescente: ordena (estável) e fica com a
+    # primeira ocorrência de cada t repetido
+    t = np.asarray(t)
+    if len(t) < 2 or np.all(t[1:] > t[:-1]): return np.arange(len(t))
+    ordem = np.argsort(t, kind='stable')
+    ts = t[ordem]
+    return ordem[np.concatenate(([True], ts[1:] != ts[:-1]))]
+
+def lacunas(t, periodo: float) -> np.ndarray:
+    # [n, 2] com (t antes, t depois) de cada intervalo maior que TOLERANCIA_BURACO períodos
+    t = np.asarray(t)
+    i = np.flatnonzero(np.diff(t) > TOLERANCIA_BURACO * periodo)
+    return np.column_stack((t[i], t[i + 1]))
+
+
+class BufferReordenacao (object):
+    """
+    Buffer de jitter com atraso limitado. Processar(lote, extra) recebe linhas com o t_ms
+    na coluna `coluna_t` (e, opcionalmente, um array alinhado com elas, ex.: o texto de
+    cada linha do CSV) e devolve o que já pode sair, em ordem crescente de t_ms.
+    Esvaziar() solta o resto no fim da coleta.
+    """
+    def __init__(self, coluna_t: int = 0, atraso_ms: float = ATRASO_MS, periodo_ms: float = None):
+        self.coluna_t = coluna_t
+        self.atraso_ms = atraso_ms
+        self.periodo_ms = periodo_ms # None: estimado pela mediana dos primeiros intervalos liberados
+        self.primeiros = []
+        self.pend = None; self.pend_extra = None; self.pend_chegada = np.zeros(0)
+        self.ultimo_t = None # último t_ms liberado
+        self.t_max = None
+        self.liberadas = 0
+        self.reordenadas = 0
+        self.duplicadas = 0
+        self.atrasadas = 0 # chegaram depois de uma amostra mais nova já ter saído
+        self.buracos = 0
+        self.reinicios = 0
+        self.lacunas = []
+
+    def getLiberadas(self) -> int:
+        return self.liberadas
+    def getReordenadas(self) -> int:
+        return self.reordenadas
+    def getDuplicadas(self) -> int:
+        return self.duplicadas
+    def getAtrasadas(self) -> int:
+        return self.atrasadas
+    def getBuracos(self) -> int:
+        return self.buracos
+    def getReinicios(self) -> int:
+        return self.reinicios
+    def getLacunas(self) -> list:
+        return self.lacunas
+    def getPendentes(self) -> int:
+        return 0 if self.pend is None else len(self.pend)
+
+    def Resumo(self) -> dict:
+        return {"liberadas": self.liberadas, "reordenadas": self.reordenadas, "duplicadas": self.duplicadas,
+                "atrasadas": self.atrasadas, "buracos": self.buracos, "reinicios": self.reinicios, "periodo_ms": self.periodo_ms}
+
+    def Processar(self, lote: np.ndarray, extra=None, agora: float = None):
+        agora = (time.monotonic() if agora is None else agora) * 1000
+        lote = np.asarray(lote, dtype=np.float64)
+        if lote.ndim == 1: lote = lote.reshape(1, -1) if len(lote) else lote.reshape(0, 0)
+        if len(lote) and self.t_max is not None and lote[:, self.coluna_t].max() < self.t_max - LIMITE_REINICIO_MS:
+            # relógio do ESP32 recomeçou: fecha a sequência antiga antes de ordenar a nova
+            antigas, extra_antigas = self.NovaSequencia()
+            novas, extra_novas = self.Processar(lote, extra, agora / 1000)
+            if extra_antigas is None: return np.concatenate((antigas, novas)), None
+            return np.concatenate((antigas, novas)), np.concatenate((extra_antigas, extra_novas))
+        if len(lote):
+            if self.pend is None:
+                self.pend = lote[:0]
+                self.pend_extra = None if extra is None else np.asarray(extra, dtype=object)[:0]
+            t = lote[:, self.coluna_t]
+            # inversão: chegou atrás da maior t já vista (vale também para lotes de uma amostra)
+            maior = np.maximum.accumulate(np.concatenate(([-np.inf if self.t_max is None else self.t_max], t)))[:-1]
+            self.reordenadas += int(np.count_nonzero(t < maior))
+            self.pend = np.concatenate((self.pend, lote))
+            if self.pend_extra is not None: self.pend_extra = np.concatenate((self.pend_extra, np.asarray(extra, dtype=object)))
+            self.pend_chegada = np.concatenate((self.pend_chegada, np.full(len(lote), agora)))
+            self.t_max = float(t.max()) if self.t_max is None else max(self.t_max, float(t.max()))
+        if self.pend is None or len(self.pend) == 0: return self._vazio()
+        self._organizar()
+        # sai o prefixo (em ordem de t) cujo prazo venceu no relógio do ESP32 ou do PC
+        t = self.pend[:, self.coluna_t]
+        vencidas = (t <= self.t_max - self.atraso_ms) | (self.pend_chegada <= agora - self.atraso_ms)
+        n = int(np.flatnonzero(vencidas)[-1]) + 1 if vencidas.any() else 0
+        return self._liberar(n)
+
+    def Esvaziar(self):
+        if self.pend is None or len(self.pend) == 0: return self._vazio()
+        self._organizar()
+        return self._liberar(len(self.pend))
+
+    def NovaSequencia(self):
+        # Solta o pendente e recomeça a ordem do zero (ESP32 reiniciado, porta reconectada)
+        saida = self.Esvaziar()
+        self.ultimo_t = self.t_max = None
+        self.reinicios += 1
+        return saida
+
+    def _vazio(self):
+        largura = 0 if self.pend is None else self.pend.shape[1]
+        return np.zeros((0, largura)), (None if self.pend_extra is None else self.pend_extra[:0])
+
+    def _organizar(self):
+        # ordena o pendente, tira repetidas e as que já perderam a vez
+        t = self.pend[:, self.coluna_t]
+        manter = ordem_monotonica(t)
+        self.duplicadas += len(t) - len(manter)
+        if self.ultimo_t is not None:
+            ts = t[manter]
+            self.duplicadas += int(np.count_nonzero(ts == self.ultimo_t))
+            self.atrasadas += int(np.count_nonzero(ts < self.ultimo_t))
+            manter = manter[ts > self.ultimo_t]
+        self.pend, self.pend_chegada = self.pend[manter], self.pend_chegada[manter]
+        if self.pend_extra is not None: self.pend_extra = self.pend_extra[manter]
+
+    def _liberar(self, n: int):
+        saida, self.pend, self.pend_chegada = self.pend[:n], self.pend[n:], self.pend_chegada[n:]
+        extra = None
+        if self.pend_extra is not None: extra, self.pend_extra = self.pend_extra[:n], self.pend_extra[n:]
+        if n == 0: return saida, extra
+        t = saida[:, self.coluna_t]
+        if self.ultimo_t is not None: t = np.concatenate(([self.ultimo_t], t))
+        if self.periodo_ms is None:
+            self.primeiros.append(saida[:, self.coluna_t])
+            if sum(len(p) for p in self.primeiros) > MIN_AMOSTRAS_PERIODO:
+                t = np.concatenate(self.primeiros); self.primeiros = [] # avalia os buracos desde o início
+                self.periodo_ms = float(np.median(np.diff(t)))
+        if self.periodo_ms:
+            novas = lacunas(t, self.periodo_ms)
+            self.buracos += len(novas)
+            self.lacunas += novas.tolist()[:MAX_LACUNAS - len(self.lacunas)]
+        self.ultimo_t = float(t[-1])
+        self.liberadas += n
+        return saida, extra
+
+
+def reparar_tempo(t) -> tuple:
+    # Índices que deixam a série monotônica (sem t nulo, invertido ou repetido) e o relatório
+    t = np.asarray(t, dtype=np.float64)
+    validas = np.flatnonzero(~np.isnan(t))
+    ordem = validas[ordem_monotonica(t[validas])]
+    t_ok = t[ordem]
+    periodo = float(np.median(np.diff(t_ok))) if len(t_ok) > 1 else 0.0
+    buracos = lacunas(t_ok, periodo) if periodo > 0 else np.zeros((0, 2))
+    relatorio = {"amostras": len(t), "mantidas": len(ordem), "invertidas": int(np.count_nonzero(np.diff(t[validas]) < 0)),
+                 "removidas": len(t) - len(ordem), "periodo_ms": periodo, "buracos": len(buracos),
+                 "lacunas": buracos[:MAX_LACUNAS].tolist()}
+    return ordem, relatorio
+
+def reparar_sessao(df: pd.DataFrame, coluna_t: str = None) -> tuple:
+    # (DataFrame com t estritamente crescente, relatório); por padrão o tempo é a última coluna
+    ordem, relatorio = reparar_tempo(pd.to_numeric(df[coluna_t or df.columns[-1]], errors='coerce'))
+    return df.iloc[ordem].reset_index(drop=True), relatorio
+
+def reparar_csv(caminho_csv: str, saida: str = None) -> dict:
+    # Reescreve o CSV em ordem, guardando o original em <arquivo>.bak (ou grava em `saida`).
+    # As linhas são copiadas como texto, sem reformatar os números.
+    with open(caminho_csv, "r", encoding="utf-8") as f:
+        header, *linhas = f.read().splitlines()
+    linhas = [l for l in linhas if l.strip()]
+    t = pd.to_numeric(pd.Series([l.rsplit(",", 1)[-1] for l in linhas], dtype=object), errors='coerce')
+    ordem, relatorio = reparar_tempo(t)
+    if saida is None:
+        if relatorio["removidas"] == 0 and relatorio["invertidas"] == 0: return relatorio
+        os.replace(caminho_csv, caminho_csv + ".bak")
+        saida = caminho_csv
+    with open(saida, "w", encoding="utf-8", newline='') as f:
+        f.write(header + "\n")
+        f.write("".join(linhas[i] + "\n" for i in ordem))
+    return relatorio
+
+def main():
+    parser = argparse.ArgumentParser(description="Repara sessões gravadas: t_ms crescente, sem repetidas")
+    parser.add_argument("caminhos", nargs="+", help="arquivos .csv ou pastas (percorridas recursivamente)")
+    parser.add_argument("--simular", action="store_true", help="só relata, não reescreve")
+    args = parser.parse_args()
+    arquivos = []
+    for c in args.caminhos:
+        if os.path.isdir(c):
+            for raiz, _, nomes in os.walk(c):
+                arquivos += [os.path.join(raiz, n) for n in nomes if n.endswith(".csv")]
+        else:
+            arquivos.append(c)
+    for arq in sorted(arquivos):
+        try:
+            if args.simular:
+                with open(arq, "r", encoding="utf-8") as f: f.readline(); t = [l.rsplit(",", 1)[-1] for l in f if l.strip()]
+                r = reparar_tempo(pd.to_numeric(pd.Series(t, dtype=object), errors='coerce'))[1]
+            else:
+                r = reparar_csv(arq)
+        except (ValueError, OSError, UnicodeDecodeError) as e:
+            print(f"Ignorando {arq}: {e}")
+            continue
+        print(f"{arq}: {r['invertidas']} inversões, {r['removidas']} removidas, {r['buracos']} buracos "
+              f"(período {r['periodo_ms']:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import threading
+import time
+import tty
+import numpy as np
+
+# Porta serial falsa (pty) que imita o ESP32 ligado por cabo: mensagens de boot,
+# depois linhas "p1,r1,y1,...,t_ms\r\n" na taxa pedida, limitadas à vazão do baud
+# (8N1: baud/10 bytes/s), com uma fração de linhas corrompidas/truncadas misturadas.
+# Serve para testar os receptores sem hardware (só Linux/macOS):
+#   python serial_falso.py --sensores 3 --hz 1000 --baud 921600
+# e apontar o Receptor para a porta impressa (ex.: /dev/pts/5).
+
+BOOT = (b"ets Jun  8 2016 00:22:57\r\n\r\nrst:0x1 (POWERON_RESET),boot:0x13 (SPI_FAST_FLASH_BOOT)\r\n"
+        b"load:0x3fff0030,len:1344\r\nentry 0x400805f0\r\nMPU6050 OK\r\n")
+INTERVALO = 0.005 # escreve em rajadas a cada 5 ms, como a UART esvaziando o buffer
+
+
+class SerialFalso (object):
+    def __init__(self, qtd_sensores: int = 3, hz: float = 1000, baud: int = 921600, lixo: float = 0.01, seed: int = 0):
+        self.qtd_sensores = qtd_sensores
+        self.hz = hz
+        self.baud = baud
+        self.lixo = lixo # fração de linhas corrompidas
+        self.rng = np.random.default_rng(seed)
+        self.mestre = self.escravo = None
+        self.porta = None
+        self.thread = None
+        self.rodando = False
+        self.enviadas = 0 # linhas válidas
+        self.corrompidas = 0 # linhas de lixo (o boot conta à parte)
+
+    def getPorta(self) -> str:
+        return self.porta
+    def getEnviadas(self) -> int:
+        return self.enviadas
+    def getCorrompidas(self) -> int:
+        return self.corrompidas
+    def getLinhasBoot(self) -> int:
+        return sum(1 for l in BOOT.split(b"\r\n") if l)
+
+    def Iniciar(self) -> str:
+        self.mestre, self.escravo = os.openpty()
+        tty.setraw(self.escravo) # sem eco nem tradução de \r\n
+        self.porta = os.ttyname(self.escravo)
+        self.rodando = True
+        self.thread = threading.Thread(target=self._gerar, daemon=True)
+        self.thread.start()
+        return self.porta
+
+    def _linhas(self, inicio: int, n: int) -> bytes:
+        t_ms = (inicio + np.arange(n)) * 1000 // self.hz
+        ang = self.rng.normal(0, 60, (n, self.qtd_sensores * 3))
+        linhas = [",".join(f"{v:.2f}" for v in a) + f",{t}\r\n" for a, t in zip(ang, t_ms)]
+        ruins = np.flatnonzero(self.rng.random(n) < self.lixo)
+        for i in ruins:
+            # linha truncada no meio ou ruído de reset na UART
+            linhas[i] = linhas[i][:len(linhas[i]) // 2] + "\r\n" if i % 2 else "\x00\xff#ruido,,\r\n"
+        self.corrompidas += len(ruins)
+        self.enviadas += n - len(ruins)
+        return "".join(linhas).encode("latin-1")
+
+    def _gerar(self):
+        os.write(self.mestre, BOOT)
+        bytes_s = self.baud / 10
+        inicio, k, total = time.monotonic(), 0, 0
+        while self.rodando:
+            time.sleep(INTERVALO)
+            alvo = int((time.monotonic() - inicio) * self.hz)
+            if alvo <= k: continue
+            dados = self._linhas(k, alvo - k)
+            # não passa da vazão do baud: se a taxa pedida não cabe, as linhas atrasam
+            total += len(dados)
+            espera = inicio + total / bytes_s - time.monotonic()
+            if espera > 0: time.sleep(espera)
+            try:
+                os.write(self.mestre, dados)
+            except OSError:
+                break
+            k = alvo
+
+    def Parar(self):
+        self.rodando = False
+        if self.thread is not None: self.thread.join(1)
+        for fd in (self.mestre, self.escravo):
+            try: os.close(fd)
+            except (OSError, TypeError): pass
+        self.mestre = self.escravo = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32 falso numa pty")
+    parser.add_argument("--sensores", type=int, default=3)
+    parser.add_argument("--hz", type=float, default=1000)
+    parser.add_argument("--baud", type=int, default=921600)
+    parser.add_argument("--lixo", type=float, default=0.01)
+    args = parser.parse_args()
+    falso = SerialFalso(args.sensores, args.hz, args.baud, args.lixo)
+    print(f"Porta: {falso.Iniciar()}  ({args.sensores} sensores, {args.hz:.0f} Hz, {args.baud} baud). Ctrl+C para parar.")
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        falso.Parar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+import numpy as np
+from buffers import AnelAmostras, COLUNAS_AMOSTRA
+from diagnostico import DiagnosticoColeta, caminho_diagnostico
+from quadro_binario import DecodificadorFluxo
+from reordenacao import BufferReordenacao
+
+# Serviço de ingestão assíncrono: conecta direto em vários ESP32 (wififinal.ino, porta
+# TCP_PORT) ao mesmo tempo, lê o protocolo de linhas JSON (ou os quadros binários de
+# quadro_binario.py) e distribui cada fluxo para um anel em memória e um arquivo CSV por
+# dispositivo.
+#
+# Quadros do ESP32 (um JSON por linha):
+#   {"sensor1":{"pitch":..,"roll":..,"yaw":..},"sensor2":{..},"sensor3":{..},"t":millis}
+#   {"type":"HEARTBEAT","t":millis} / {"type":"CAL_START"} / {"type":"CAL_DONE"} / {"type":"ZERO_DONE"}
+# Comandos para o ESP32: 'c' calibra, 'z' zera (só depois de calibrado),
+# 'b' passa as amostras para quadros binários de 46 bytes, 'j' volta ao JSON
+
+TCP_PORT = 3333
+PASTA_SAIDA = "ingestao"
+TAM_LEITURA = 65536
+LOTES_NA_FILA = 64 # fila limitada por dispositivo: cheia -> para de ler o socket (backpressure)
+TIMEOUT_SILENCIO = 5.0 # sem heartbeat nem dados por esse tempo -> reconecta
+RECONEXAO_MIN, RECONEXAO_MAX = 0.5, 30.0
+
+# ordem das colunas no CSV (igual ao receptor serial): p1,r1,y1,...,t_ms
+ORDEM_CSV = list(range(1, len(COLUNAS_AMOSTRA))) + [0]
+HEADER_CSV = ",".join(COLUNAS_AMOSTRA[i] for i in ORDEM_CSV) + "\n"
+FORMATO_CSV = ["%.3f"] * (len(COLUNAS_AMOSTRA) - 1) + ["%d"]
+
+
+class DispositivoESP32 (object):
+    def __init__(self, nome: str, host: str, porta: int = TCP_PORT, calibrar: bool = True, capacidade: int = 3000, binario: bool = False):
+        self.nome = nome
+        self.host = host
+        self.porta = porta
+        self.calibrar = calibrar
+        self.binario = binario
+        self.anel = AnelAmostras(capacidade, COLUNAS_AMOSTRA)
+        self.fila = asyncio.Queue(LOTES_NA_FILA)
+        self.estado = "desconectado"
+        self.recebidas = 0
+        self.rejeitadas = 0
+        self.perdidas = 0
+        self.reconexoes = 0
+        self.ultimo_heartbeat = None
+        self.nome_arquivo = None
+        self.writer = None
+        self.diagnostico = DiagnosticoColeta(origem=f"{host}:{porta}")
+        self.reordenacao = BufferReordenacao(coluna_t=0) # vale entre reconexões: o millis() do ESP32 continua
+
+    def getNome(self) -> str:
+        return self.nome
+    def getAnel(self) -> AnelAmostras:
+        return self.anel
+    def getEstado(self) -> str:
+        return self.estado
+    def getDiagnostico(self) -> DiagnosticoColeta:
+        return self.diagnostico
+
+    def Resumo(self) -> dict:
+        return {"nome": self.nome, "estado": self.estado, "recebidas": self.recebidas,
+                "rejeitadas": self.rejeitadas, "perdidas": self.perdidas, "reconexoes": self.reconexoes, "arquivo": self.nome_arquivo}
+
+    def Comando(self, c: str):
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(c.encode())
+
+    def _tratarControle(self, d: dict):
+        tipo = d.get('type')
+        if tipo == "HEARTBEAT":
+            self.ultimo_heartbeat = d.get('t')
+        elif tipo == "CAL_START":
+            self.estado = "calibrando"
+        elif tipo == "CAL_DONE":
+            self.estado = "calibrado"
+            if self.calibrar: self.Comando("z")
+        elif tipo == "ZERO_DONE":
+            self.estado = "transmitindo"
+
+    async def _ler(self, reader: asyncio.StreamReader):
+        # JSON e binário são reconhecidos byte a byte, então o ESP32 pode trocar de modo a qualquer momento
+        decodificador = DecodificadorFluxo() # a sequência dos quadros recomeça a cada conexão
+        while True:
+            async with asyncio.timeout(TIMEOUT_SILENCIO):
+                bloco = await reader.read(TAM_LEITURA)
+            if not bloco: raise ConnectionError("conexão encerrada pelo ESP32")
+            r0, p0 = decodificador.getRejeitadas(), decodificador.getPerdidos()
+            lote, controles = decodificador.Processar(bloco)
+            for d in controles: self._tratarControle(d)
+            rejeitadas, perdidas = decodificador.getRejeitadas() - r0, decodificador.getPerdidos() - p0
+            self.rejeitadas += rejeitadas; self.perdidas += perdidas
+            if rejeitadas: self.diagnostico.RegistrarRejeitadas(rejeitadas)
+            if perdidas: self.diagnostico.RegistrarPerdidasSeq(perdidas)
+            if len(lote):
+                self.diagnostico.Registrar(lote[:, 0])
+                self.recebidas += len(lote)
+            # o heartbeat (1 s) garante uma chamada mesmo sem amostras: solta o que venceu
+            await self._publicar(self.reordenacao.Processar(lote)[0])
+
+    async def _publicar(self, lote: np.ndarray):
+        if len(lote) == 0: return
+        self.anel.publicarLote(lote)
+        await self.fila.put(lote) # bloqueia se o gravador atrasar
+
+    async def Conectar(self):
+        # Loop de conexão com reconexão exponencial; só termina se a tarefa for cancelada
+        espera = RECONEXAO_MIN
+        while True:
+            try:
+                self.estado = "conectando"
+                async with asyncio.timeout(5.0):
+                    reader, self.writer = await asyncio.open_connection(self.host, self.porta)
+                self.estado = "conectado"
+                espera = RECONEXAO_MIN
+                if self.binario: self.Comando("b")
+                if self.calibrar: self.Comando("c") # o ESP32 zera os estados a cada nova conexão
+                await self._ler(reader)
+            except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                print(f"[{self.nome}] {self.host}:{self.porta} -> {e!r}, reconectando em {espera:.1f} s")
+                await self._publicar(self.reordenacao.Esvaziar()[0]) # o que ficou retido no buffer
+            finally:
+                if self.writer is not None:
+                    self.writer.close()
+                    self.writer = None
+            self.estado = "desconectado"
+            self.reconexoes += 1
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, RECONEXAO_MAX)
+
+    async def Gravar(self, pasta: str = PASTA_SAIDA):
+        os.makedirs(pasta, exist_ok=True)
+        self.nome_arquivo = os.path.join(pasta, f"HOMEFISIO_DADOS_3_SENSORES_{self.nome}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        try:
+            with open(self.nome_arquivo, "w", encoding="utf-8", newline='') as f:
+                f.write(HEADER_CSV)
+                try:
+                    while True:
+                        lotes = [await self.fila.get()]
+                        while not self.fila.empty(): lotes.append(self.fila.get_nowait())
+                        lote = np.concatenate(lotes)[:, ORDEM_CSV]
+                        # disco fora do event loop para não travar os outros dispositivos
+                        await asyncio.to_thread(self._escrever, f, lote)
+                        self.diagnostico.RegistrarEtapa("disco", lote[:, -1])
+                except asyncio.CancelledError:
+                    # parada do serviço: grava o que está na fila e o que o buffer de reordenação segurava
+                    lotes = [self.fila.get_nowait() for _ in range(self.fila.qsize())] + [self.reordenacao.Esvaziar()[0]]
+                    lote = np.concatenate(lotes).reshape(-1, len(COLUNAS_AMOSTRA))
+                    if len(lote): self._escrever(f, lote[:, ORDEM_CSV])
+                    raise
+        finally:
+            self.diagnostico.Exportar(caminho_diagnostico(self.nome_arquivo))
+
+    @staticmethod
+    def _escrever(f, lote: np.ndarray):
+        np.savetxt(f, lote, fmt=FORMATO_CSV, delimiter=",")
+        f.flush()
+
+
+class ServidorIngestao (object):
+    def __init__(self, dispositivos: list, pasta: str = PASTA_SAIDA):
+        self.dispositivos = dispositivos
+        self.pasta = pasta
+        self.tarefas = []
+
+    def getDispositivos(self) -> list:
+        return self.dispositivos
+
+    async def Iniciar(self):
+        for d in self.dispositivos:
+            self.tarefas.append(asyncio.create_task(d.Conectar(), name=f"ler-{d.nome}"))
+            self.tarefas.append(asyncio.create_task(d.Gravar(self.pasta), name=f"gravar-{d.nome}"))
+
+    async def Parar(self):
+        for t in self.tarefas: t.cancel()
+        await asyncio.gather(*self.tarefas, return_exceptions=True)
+        self.tarefas = []
+
+    async def Executar(self, intervalo_status: float = 5.0):
+        await self.Iniciar()
+        try:
+            while True:
+                await asyncio.sleep(intervalo_status)
+                total = sum(d.recebidas for d in self.dispositivos)
+                ativos = sum(d.estado == "transmitindo" for d in self.dispositivos)
+                perdidas = sum(d.diagnostico.getPerdidas() for d in self.dispositivos)
+                rejeitadas = sum(d.rejeitadas for d in self.dispositivos)
+                print(f"{time.strftime('%H:%M:%S')}  {ativos}/{len(self.dispositivos)} transmitindo, {total} amostras, "
+                      f"{perdidas} perdidas, {rejeitadas} rejeitadas")
+        finally:
+            await self.Parar()
+
+
+def ler_dispositivos(enderecos: list, binario: bool = False) -> list:
+    # "host", "host:porta" ou "nome=host:porta"
+    dispositivos = []
+    for i, e in enumerate(enderecos):
+        nome, _, e = e.rpartition("=")
+        host, _, porta = e.partition(":")
+        dispositivos.append(DispositivoESP32(nome or f"esp{i+1}", host, int(porta or TCP_PORT), binario=binario))
+    return dispositivos
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão TCP de vários ESP32 HomeFisio")
+    parser.add_argument("enderecos", nargs="+", help="host, host:porta ou nome=host:porta")
+    parser.add_argument("--pasta", default=PASTA_SAIDA)
+    parser.add_argument("--binario", action="store_true", help="pede ao ESP32 os quadros binários compactos")
+    args = parser.parse_args()
+    servidor = ServidorIngestao(ler_dispositivos(args.enderecos, args.binario), args.pasta)
+    try:
+        asyncio.run(servidor.Executar())
+    except KeyboardInterrupt:
+        print("\nIngestão finalizada.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pandas as pd
+from formato_binario import carregar_sessao
+from indice_sessoes import IndiceSessoes
+from metricas_sessao import calcular_resultado, ESCALARES, VERSAO_METRICAS, ARQUIVO_DB
+
+# Evolução do paciente ao longo das sessões: um resumo escalar por sessão (as mesmas
+# métricas do painel, via processar_biomecanica/calculate_jerk) fica numa tabela do
+# metricas.sqlite. Sessões novas ou alteradas são calculadas em paralelo num pool de
+# processos; com o índice quente a consulta é só um stat por arquivo + um SELECT.
+
+PADRAO_PACIENTE = {"weight": 70.0, "height": 1.70, "gender": "Masculino", "exercise": "Geral"}
+_RE_DATA = re.compile(r"(\d{8})_(\d{6})")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resumos (
+    caminho TEXT PRIMARY KEY, pasta TEXT, mtime REAL, versao INTEGER, data TEXT,
+    exercicio TEXT, peso REAL, altura REAL, genero TEXT,
+    amplitude REAL, jerk REAL, forca_kg REAL, torque_max REAL, energia REAL, freq_pico REAL, m_seg REAL
+);
+CREATE INDEX IF NOT EXISTS resumos_pasta ON resumos (pasta);
+"""
+
+def data_da_sessao(caminho: str, mtime: float) -> datetime:
+    # HOMEFISIO_..._YYYYMMDD_HHMMSS.csv; sem carimbo no nome, usa o mtime
+    m = _RE_DATA.search(os.path.basename(caminho))
+    if m:
+        try: return datetime.strptime(m.group(1) + m.group(2), "%Y%m%d%H%M%S")
+        except ValueError: pass
+    return datetime.fromtimestamp(mtime)
+
+def resumir_arquivo(tarefa: tuple) -> dict:
+    # Roda no processo filho: carrega a sessão e devolve só os escalares
+    caminho, exercicio, peso, altura, genero = tarefa
+    try:
+        res = calcular_resultado(carregar_sessao(caminho), exercicio, peso, altura, genero)
+    except (OSError, ValueError):
+        return None
+    return {k: float(res[k]) for k in ESCALARES}
+
+
+class TendenciasPaciente (object):
+    def __init__(self, caminho_db: str, max_processos: int = None):
+        self.caminho_db = caminho_db
+        self.max_processos = max_processos or os.cpu_count()
+        with self._conectar() as con: con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho_db, timeout=10)
+        try:
+            with con: yield con
+        finally:
+            con.close()
+
+    def Atualizar(self, pasta: str, padrao: dict = PADRAO_PACIENTE) -> int:
+        # Garante um resumo em dia para cada sessão da pasta; devolve quantas foram calculadas
+        sessoes = IndiceSessoes(pasta).Atualizar()
+        with self._conectar() as con:
+            existentes = {r[0]: r[1:] for r in con.execute(
+                "SELECT caminho, mtime, versao, exercicio, peso, altura, genero FROM resumos WHERE pasta = ?", (pasta,))}
+        tarefas, datas = [], {}
+        for nome, resumo in sessoes:
+            caminho = os.path.join(pasta, nome)
+            params = (resumo.get("exercise", padrao["exercise"]), float(resumo.get("weight", padrao["weight"])),
+                      float(resumo.get("height", padrao["height"])), resumo.get("gender", padrao["gender"]))
+            if existentes.get(caminho) == (resumo["mtime"], VERSAO_METRICAS) + params: continue
+            tarefas.append((caminho,) + params)
+            datas[caminho] = (resumo["mtime"], data_da_sessao(caminho, resumo["mtime"]).isoformat())
+        if tarefas:
+            if len(tarefas) > 1 and self.max_processos > 1:
+                # spawn: fork de um processo com threads (o servidor do Streamlit) pode travar
+                with ProcessPoolExecutor(min(self.max_processos, len(tarefas)), mp_context=multiprocessing.get_context("spawn")) as pool:
+                    resultados = list(pool.map(resumir_arquivo, tarefas, chunksize=max(1, len(tarefas) // (4 * self.max_processos))))
+            else:
+                resultados = [resumir_arquivo(t) for t in tarefas]
+            with self._conectar() as con:
+                for t, r in zip(tarefas, resultados):
+                    if r is None: continue
+                    mtime, data = datas[t[0]]
+                    con.execute("INSERT OR REPLACE INTO resumos VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                                (t[0], pasta, mtime, VERSAO_METRICAS, data) + t[1:] + tuple(r[k] for k in ESCALARES))
+        vivos = {os.path.join(pasta, nome) for nome, _ in sessoes}
+        removidos = [c for c in existentes if c not in vivos]
+        if removidos:
+            with self._conectar() as con:
+                con.executemany("DELETE FROM resumos WHERE caminho = ?", [(c,) for c in removidos])
+        return len(tarefas)
+
+    def Consultar(self, pasta: str, metricas: list = ("amplitude", "jerk"), meses: float = None,
+                  exercicio: str = None, padrao: dict = PADRAO_PACIENTE) -> pd.DataFrame:
+        # Série temporal (uma linha por sessão, indexada pela data) das métricas pedidas
+        self.Atualizar(pasta, padrao)
+        sql = f"SELECT data, exercicio, {', '.join(ESCALARES)} FROM resumos WHERE pasta = ?"
+        args = [pasta]
+        if meses is not None:
+            sql += " AND data >= ?"
+            args.append((datetime.now() - timedelta(days=30.44 * meses)).isoformat())
+        if exercicio is not None:
+            sql += " AND exercicio = ?"
+            args.append(exercicio)
+        with self._conectar() as con:
+            df = pd.read_sql_query(sql + " ORDER BY data", con, params=args, parse_dates=["data"])
+        return df.set_index("data")[["exercicio"] + list(metricas)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evolução das métricas de um paciente")
+    parser.add_argument("pasta", help="database_pacientes/<paciente>")
+    parser.add_argument("--metricas", nargs="+", default=["amplitude", "jerk"], choices=ESCALARES)
+    parser.add_argument("--meses", type=float, default=6)
+    parser.add_argument("--exercicio")
+    parser.add_argument("--db", help=f"padrão: {ARQUIVO_DB} na pasta pai")
+    args = parser.parse_args()
+    db = args.db or os.path.join(os.path.dirname(os.path.abspath(args.pasta)), ARQUIVO_DB)
+    print(TendenciasPaciente(db).Consultar(args.pasta, args.metricas, args.meses, args.exercicio).to_string())
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
-import pandas as pd
-import threading
-from Analise_POO import Grafico
+from Analise_POO import ExportadorGraficos
 from Receptor_POO import Receptor, SalvarArquivo
+from captura import CapturaConcorrente, capturar_ate_enter
 
-def main():
+def main(exportador: ExportadorGraficos):
     print("Testando conexão e Geração de Arquivo!")
     esp32 = Receptor("COM3")
     esp32 = Receptor("COM3")
@@ -11,17 +10,23 @@ def main():
     arquivo = SalvarArquivo(qtd_sensores=2)
     arquivo.setHeader()
     input("Pressione enter para iniciar o movimento!")
-    arquivo.EscreverArquivo(esp32)
-    grafico = Grafico(arquivo.getNomeArquivo())
-    grafico.GerarGrafico()
+    Thread(esp32, arquivo, exportador)
 
 
-def Thread():
-    pass
+def Thread(esp32: Receptor, arquivo: SalvarArquivo, exportador: ExportadorGraficos):
+    # leitura, disco e análise em threads separadas; o laço principal só mostra o andamento
+    resumo = capturar_ate_enter(CapturaConcorrente(esp32, arquivo).Iniciar())
+    print(f"Arquivo gerado!\nArquivo: {resumo['arquivo']} ({resumo['linhas']} linhas)\nDiagnóstico: {resumo['diagnostico']}")
+    for membro, eixos in resumo.get("estatisticas", {}).items():
+        print(f"  {membro}: " + "  ".join(f"{c} {e['media']:.1f}±{e['desvio']:.1f}° (amplitude {e['amplitude']:.1f}°)" for c, e in eixos.items()))
+    # os gráficos saem em segundo plano enquanto a próxima captura já pode começar
+    exportador.ExportarEmSegundoPlano(arquivo.getNomeArquivo())
     
 if __name__ == "__main__":
+    exportador = ExportadorGraficos()
     while True:
-        main()
+        main(exportador)
         resposta = input("Deseja realizar outra operação?(s/n)\t")
         if resposta != "s":
+            exportador.Fechar() # espera os gráficos pendentes
             exit()
\ No newline at end of file